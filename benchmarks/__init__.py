@@ -0,0 +1 @@
+"""Benchmarks of the plugin's hot paths, run as modules from the repository root."""
@@ -0,0 +1,138 @@
+"""Microbenchmark of CodeMatcher.validate against the loop over every valid code it replaced.
+
+Run from the repository root, in an environment with QGIS available:
+
+    python -m benchmarks.bench_validate_code [n_descriptions]
+
+Both are checked to give the same results on the generated descriptions before timing them.
+"""
+
+from __future__ import annotations
+
+import random
+import string
+import sys
+from timeit import default_timer as timer
+from typing import Callable
+
+from fieldworkimport.common import CodeMatcher
+
+N_DESCRIPTIONS = 100_000
+N_VALID_CODES = 150
+SEED = 1234
+
+VALID_SPECIAL_CHARACTERS = ["B", "E", "V", "C", "PC", "PT"]
+PARAMETERIZED_SPECIAL_CHARACTERS = ["V"]
+
+
+def _legacy_validate_single_code(
+    code: str,
+    previous_code: str | None,
+    valid_codes: list[str],
+    valid_special_characters: list[str],
+    parameterized_special_characters: list[str],
+) -> bool:
+    if code.upper() in valid_special_characters and previous_code is not None:
+        return True
+    if previous_code and previous_code.upper() in parameterized_special_characters:
+        try:
+            float(code)
+        except ValueError:
+            pass
+        else:
+            return True
+
+    prefix = None
+    for curr_code in valid_codes:
+        if code.upper().startswith(curr_code) and (prefix is None or len(prefix) < len(curr_code)):
+            prefix = curr_code
+
+    if prefix is None:
+        return False
+
+    suffix = code.removeprefix(prefix)
+    return len(suffix) == 0 or suffix[0].isdigit()
+
+
+def legacy_validate_code(
+    mutlicode: str,
+    valid_codes: list[str],
+    valid_special_characters: list[str],
+    parameterized_special_characters: list[str],
+) -> bool:
+    """Multicode validation as it was before the trie, a loop over every valid code."""  # noqa: DOC201
+    previous_code: str | None = None
+    for code in mutlicode.strip().upper().split(" "):
+        if not _legacy_validate_single_code(
+            code,
+            previous_code,
+            valid_codes,
+            valid_special_characters,
+            parameterized_special_characters,
+        ):
+            return False
+        previous_code = code
+    return True
+
+
+def generate_valid_codes(rng: random.Random) -> list[str]:  # noqa: D103
+    codes: set[str] = {"WV", "WVMH", "CP", "MON", "TR", "SMH", "DMH", "CB", "FH", "EP"}
+    while len(codes) < N_VALID_CODES:
+        codes.add("".join(rng.choices(string.ascii_uppercase, k=rng.randint(2, 5))))
+    return sorted(codes)
+
+
+def generate_descriptions(rng: random.Random, valid_codes: list[str], n: int) -> list[str]:
+    """Multicodes like the ones in CRDB files, mostly valid with some typos mixed in."""  # noqa: DOC201
+    descriptions = []
+    for _ in range(n):
+        tokens = []
+        for _ in range(rng.choices((1, 2, 3), weights=(70, 20, 10))[0]):
+            code = rng.choice(valid_codes)
+            roll = rng.random()
+            if roll < 0.2:  # noqa: PLR2004
+                code += str(rng.randint(1, 99))
+            elif roll < 0.25:  # noqa: PLR2004
+                code += rng.choice(string.ascii_uppercase)
+            tokens.append(code)
+            roll = rng.random()
+            if roll < 0.1:  # noqa: PLR2004
+                tokens.extend(("V", f"{rng.uniform(0, 2):.2f}"))
+            elif roll < 0.2:  # noqa: PLR2004
+                tokens.append(rng.choice(VALID_SPECIAL_CHARACTERS))
+        description = " ".join(tokens)
+        descriptions.append(description.lower() if rng.random() < 0.05 else description)  # noqa: PLR2004
+    return descriptions
+
+
+def run(name: str, validate: Callable[[str], bool], descriptions: list[str]) -> float:  # noqa: D103
+    start = timer()
+    for description in descriptions:
+        validate(description)
+    elapsed = timer() - start
+    print(f"{name:<24} {elapsed:8.3f}s  {elapsed / len(descriptions) * 1e6:8.2f}us/description")  # noqa: T201
+    return elapsed
+
+
+def main() -> None:  # noqa: D103
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else N_DESCRIPTIONS
+    rng = random.Random(SEED)  # noqa: S311
+    valid_codes = generate_valid_codes(rng)
+    descriptions = generate_descriptions(rng, valid_codes, n)
+    settings = (valid_codes, VALID_SPECIAL_CHARACTERS, PARAMETERIZED_SPECIAL_CHARACTERS)
+
+    matcher = CodeMatcher(*settings)
+    mismatches = [d for d in descriptions if matcher.validate(d) != legacy_validate_code(d, *settings)]
+    if mismatches:
+        msg = f"CodeMatcher and the legacy loop disagree on {len(mismatches)} descriptions, e.g. {mismatches[0]!r}."
+        raise AssertionError(msg)
+    n_valid = sum(matcher.validate(d) for d in descriptions)
+    print(f"{n} descriptions, {n_valid} valid, {len(valid_codes)} valid codes")  # noqa: T201
+
+    legacy = run("loop over valid codes", lambda d: legacy_validate_code(d, *settings), descriptions)
+    compiled = run("CodeMatcher.validate", matcher.validate, descriptions)
+    print(f"speedup: CodeMatcher.validate {legacy / compiled:.1f}x")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
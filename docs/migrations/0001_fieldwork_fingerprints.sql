@@ -0,0 +1,17 @@
+-- Import fingerprints of sites_fieldwork, used by the duplicate import check (fieldworkimport/fwimport/fingerprint.py).
+--
+-- Each column holds a sha256 hex digest: rw5_fingerprint of the RW5 command blocks without the JB record,
+-- crdb_fingerprint of the CRDB coordinates by point name. The check looks fieldwork up by either one, so both
+-- are indexed. Fieldwork imported before this migration keeps NULL fingerprints and is only matched by name.
+--
+-- Safe to run more than once.
+
+BEGIN;
+
+ALTER TABLE public.sites_fieldwork ADD COLUMN IF NOT EXISTS rw5_fingerprint varchar(64) NULL;
+ALTER TABLE public.sites_fieldwork ADD COLUMN IF NOT EXISTS crdb_fingerprint varchar(64) NULL;
+
+CREATE INDEX IF NOT EXISTS sites_fieldwork_rw5_fingerprint_idx ON public.sites_fieldwork (rw5_fingerprint);
+CREATE INDEX IF NOT EXISTS sites_fieldwork_crdb_fingerprint_idx ON public.sites_fieldwork (crdb_fingerprint);
+
+COMMIT;
@@ -0,0 +1 @@
+"""Headless batch import of job folders."""
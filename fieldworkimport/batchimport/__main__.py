@@ -0,0 +1,61 @@
+"""Run the batch import from the command line.
+
+Run from the directory holding the plugin package, with QGIS' python and QGIS_PREFIX_PATH set:
+``` console
+python -m fieldworkimport.batchimport JOBS_DIR TARGET [--schema SCHEMA] [--rules rules.json] [--workers N] [--verbose]
+```
+TARGET is a GeoPackage path or a PostgreSQL connection string, e.g. "service=fieldwork".
+SCHEMA is the PostgreSQL schema of the sites tables, public by default.
+See `fieldworkimport.batchimport.rules` for the rules file.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from qgis.core import Qgis, QgsApplication
+
+from fieldworkimport.batchimport.batch_import_process import DEFAULT_TARGET_SCHEMA, run_batch_import
+from fieldworkimport.batchimport.rules import load_rules
+from fieldworkimport.plugin import setup_default_settings
+
+
+def _print_message(message: str, tag: str, level: Qgis.MessageLevel) -> None:  # noqa: ARG001
+    print(message, file=sys.stderr)  # noqa: T201
+
+
+def main(argv: list[str] | None = None) -> int:  # noqa: D103
+    parser = argparse.ArgumentParser(prog="fieldworkimport.batchimport", description="Import a directory of job folders.")
+    parser.add_argument("jobs_dir", type=Path, help="Directory holding one folder per job.")
+    parser.add_argument("target", help="GeoPackage path or PostgreSQL connection string to import into.")
+    parser.add_argument(
+        "--schema", default=DEFAULT_TARGET_SCHEMA, help="PostgreSQL schema of the target tables, ignored for GeoPackages.",
+    )
+    parser.add_argument("--rules", type=Path, default=None, help="Rules file used in place of the import dialogs.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of parsing processes, defaults to the CPU count.")
+    parser.add_argument("--verbose", action="store_true", help="Print the QGIS message log.")
+    args = parser.parse_args(argv)
+
+    app = QgsApplication([], False)  # noqa: FBT003
+    app.initQgis()
+    try:
+        message_log = QgsApplication.messageLog()
+        if args.verbose and message_log is not None:
+            message_log.messageReceived.connect(_print_message)
+        setup_default_settings()
+        rules = load_rules(args.rules)
+        results = run_batch_import(args.jobs_dir, args.target, rules, workers=args.workers, schema=args.schema)
+    finally:
+        app.exitQgis()
+
+    for result in results:
+        print(f"{result.status}\t{result.name}\t{result.message}")  # noqa: T201
+    counts = {status: sum(result.status == status for result in results) for status in ("imported", "skipped", "failed")}
+    print(", ".join(f"{count} {status}" for status, count in counts.items()))  # noqa: T201
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
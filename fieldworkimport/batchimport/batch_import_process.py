@@ -0,0 +1,394 @@
+"""Headless import of a directory of jobs, driven by a rules file instead of dialogs.
+
+The input files of every job are parsed in a pool of worker processes, which store the results in the
+parse cache. The imports themselves write to the same layers, so they run one at a time in the main
+process, in job order, each one starting as soon as its job has been parsed.
+Only about one job per worker is parsed ahead of the import, so the parse cache's size limit doesn't
+evict a job's results before it is imported.
+"""
+
+from __future__ import annotations
+
+import itertools
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Literal
+
+from qgis.core import QgsApplication, QgsDataSourceUri, QgsFeature, QgsMessageLog, QgsVectorLayer
+
+from fieldworkimport.exceptions import AbortError
+from fieldworkimport.fwimport.import_process import FieldworkImportLayers, FieldworkImportProcess
+from fieldworkimport.fwimport.stage_1_create_fieldwork import (
+    find_duplicate_import_reasons,
+    parse_check_inputs,
+    parse_create_inputs,
+)
+from fieldworkimport.fwimport.stage_4_match_fieldrun import FieldRunMatchStage
+from fieldworkimport.fwimport.stage_5_coordinate_shift import ControlShift, CoordinateShiftStage, average_control_shift
+from fieldworkimport.helpers import assert_true
+from fieldworkimport.plugin import PluginInput
+from fieldworkimport.ui.match_control_item import ControlMatchResult
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from pathlib import Path
+
+    from fieldworkimport.batchimport.rules import BatchImportRules
+    from fieldworkimport.common import ValidationConfig
+    from fieldworkimport.fwimport.fingerprint import ImportFingerprint
+    from fieldworkimport.ui.coordinate_shift_dialog import CoordinateShiftDialogResult
+
+JOB_FILE_SUFFIXES = (".crdb", ".rw5", ".sum", ".ref", ".loc")
+DEFAULT_TARGET_SCHEMA = "public"
+"""PostgreSQL schema of the target tables, unless another one is given."""
+TARGET_TABLES = {
+    # table name: has geometry
+    "sites_fieldwork": False,
+    "sites_fieldworkshot": True,
+    "sites_fieldrunshot": True,
+    "sites_coordsystem": False,
+    "sites_elevationsystem": False,
+}
+TARGET_GEOMETRY_COLUMN = "geom"
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    """Input files of one job folder."""
+
+    name: str
+    crdb_path: str
+    rw5_path: str
+    sum_path: str | None
+    ref_path: str | None
+    loc_path: str | None
+
+    def plugin_input(self, fieldrun_feature: QgsFeature | None = None) -> PluginInput:  # noqa: D102
+        return PluginInput(
+            crdb_path=self.crdb_path,
+            rw5_path=self.rw5_path,
+            sum_path=self.sum_path,
+            ref_path=self.ref_path,
+            loc_path=self.loc_path,
+            fieldrun_feature=fieldrun_feature,
+        )
+
+
+@dataclass(frozen=True)
+class BatchJobResult:
+    name: str
+    status: Literal["imported", "skipped", "failed"]
+    message: str = ""
+
+
+def find_jobs(jobs_dir: Path) -> list[BatchJob]:
+    """Find job folders directly under jobs_dir.
+
+    A job folder needs one CRDB and one RW5 file, and may have one SUM, REF and LOC file.
+    Folders that don't qualify are logged and left out.
+    """  # noqa: DOC201
+    jobs: list[BatchJob] = []
+    for folder in sorted(path for path in jobs_dir.iterdir() if path.is_dir()):
+        files_by_suffix: dict[str, list[Path]] = {suffix: [] for suffix in JOB_FILE_SUFFIXES}
+        for path in folder.iterdir():
+            suffix = path.suffix.lower()
+            if path.is_file() and suffix in files_by_suffix:
+                files_by_suffix[suffix].append(path)
+
+        if len(files_by_suffix[".crdb"]) != 1 or len(files_by_suffix[".rw5"]) != 1:
+            QgsMessageLog.logMessage(f"Skipping {folder.name}, job folders need exactly one CRDB and one RW5 file.")
+            continue
+        optional_files = [files_by_suffix[suffix] for suffix in (".sum", ".ref", ".loc")]
+        if any(len(files) > 1 for files in optional_files):
+            QgsMessageLog.logMessage(f"Skipping {folder.name}, job folders can't have more than one SUM, REF or LOC file.")
+            continue
+
+        sum_path, ref_path, loc_path = (str(files[0]) if files else None for files in optional_files)
+        jobs.append(
+            BatchJob(
+                name=folder.name,
+                crdb_path=str(files_by_suffix[".crdb"][0]),
+                rw5_path=str(files_by_suffix[".rw5"][0]),
+                sum_path=sum_path,
+                ref_path=ref_path,
+                loc_path=loc_path,
+            ),
+        )
+    return jobs
+
+
+def load_target_layer(
+    target: str,
+    table_name: str,
+    *,
+    has_geometry: bool,
+    schema: str = DEFAULT_TARGET_SCHEMA,
+) -> QgsVectorLayer:
+    """Load a table from a GeoPackage path or a PostgreSQL connection string, from schema for PostgreSQL."""  # noqa: DOC201
+    if target.lower().endswith(".gpkg"):
+        layer = QgsVectorLayer(f"{target}|layername={table_name}", table_name, "ogr")
+    else:
+        uri = QgsDataSourceUri(target)
+        uri.setDataSource(schema, table_name, TARGET_GEOMETRY_COLUMN if has_geometry else "")
+        layer = QgsVectorLayer(uri.uri(expandAuthConfig=False), table_name, "postgres")
+    assert_true(layer.isValid(), f"Could not load table '{table_name}' from the target.")
+    return layer
+
+
+def load_target_layers(target: str, schema: str = DEFAULT_TARGET_SCHEMA) -> FieldworkImportLayers:  # noqa: D103
+    layers = {
+        table_name: load_target_layer(target, table_name, has_geometry=has_geometry, schema=schema)
+        for table_name, has_geometry in TARGET_TABLES.items()
+    }
+    return FieldworkImportLayers(
+        fieldwork_layer=layers["sites_fieldwork"],
+        fieldworkshot_layer=layers["sites_fieldworkshot"],
+        fieldrunshot_layer=layers["sites_fieldrunshot"],
+        coordsystem_layer=layers["sites_coordsystem"],
+        elevationsystem_layer=layers["sites_elevationsystem"],
+    )
+
+
+class RulesFieldRunMatchStage(FieldRunMatchStage):
+    """Matches controls by the rules instead of the match to controls dialog."""
+
+    rules: BatchImportRules
+
+    def __init__(self, rules: BatchImportRules, **kwargs) -> None:  # noqa: ANN003, D107
+        super().__init__(**kwargs)
+        self.rules = rules
+
+    def match_controls(self) -> None:  # noqa: D102
+        # same as the base class, without the progress dialog
+        suggestions = self.find_control_suggestions()
+        self.apply_control_matches(self.choose_control_matches(suggestions))
+
+    def choose_control_matches(  # noqa: D102
+        self,
+        control_suggestions: list[tuple[QgsFeature, list[QgsFeature]]],
+    ) -> list[tuple[QgsFeature, ControlMatchResult]]:
+        results: list[tuple[QgsFeature, ControlMatchResult]] = []
+        for fw_shot, suggestions in control_suggestions:
+            if self.rules.control_matches == "nearest" and suggestions:
+                geometry = fw_shot.geometry()
+                nearest = min(suggestions, key=lambda fr_shot: geometry.distance(fr_shot.geometry()))
+                results.append((fw_shot, ControlMatchResult(nearest, None)))
+            elif self.rules.create_missing_controls and self.fieldrun_id is not None:
+                results.append((fw_shot, ControlMatchResult(None, new_fieldrunshot_name=fw_shot["name"])))
+            else:
+                QgsMessageLog.logMessage(f"Leaving control shot {fw_shot['name']} unmatched.")
+        return results
+
+
+class RulesCoordinateShiftStage(CoordinateShiftStage):
+    """Chooses the shift by the rules instead of the coordinate shift dialog."""
+
+    rules: BatchImportRules
+
+    def __init__(self, rules: BatchImportRules, **kwargs) -> None:  # noqa: ANN003, D107
+        super().__init__(**kwargs)
+        self.rules = rules
+
+    def choose_shift(  # noqa: D102
+        self,
+        hpn_shift: tuple[float, float, float] | None,
+        control_shifts: list[ControlShift],
+    ) -> CoordinateShiftDialogResult:
+        if self.rules.shift == "HPN" and hpn_shift is not None:
+            return ("HPN", hpn_shift, None)
+        if self.rules.shift == "CONTROL" and control_shifts:
+            return ("CONTROL", average_control_shift(control_shifts), [fieldrunshot for _, fieldrunshot, _ in control_shifts])
+        if self.rules.shift != "NONE":
+            QgsMessageLog.logMessage(f"Can't calculate a {self.rules.shift} shift for fieldwork {self.fieldwork['name']}, not shifting.")
+        return ("NONE", None, None)
+
+
+class BatchImportProcess(FieldworkImportProcess):
+    """Import process that takes its decisions from the rules instead of asking the user."""
+
+    rules: BatchImportRules
+    skipped_as_duplicate: bool
+
+    # corrections come from the rules, don't mix in what was learned from interactive imports
+    learn_code_corrections = False
+
+    def __init__(  # noqa: D107
+        self,
+        plugin_input: PluginInput,
+        layers: FieldworkImportLayers,
+        rules: BatchImportRules,
+    ) -> None:
+        super().__init__(plugin_input, layers)
+        self.rules = rules
+        self.skipped_as_duplicate = False
+
+    def check_duplicate(  # noqa: D102
+        self,
+        fieldwork_layer: QgsVectorLayer,
+        fieldwork_name: str,
+        fingerprint: ImportFingerprint,
+    ) -> bool:
+        reasons = find_duplicate_import_reasons(fieldwork_layer, fieldwork_name, fingerprint)
+        if not reasons:
+            return False
+        QgsMessageLog.logMessage(f"Possible duplicate import of {fieldwork_name}. {' '.join(reasons)}")
+        self.skipped_as_duplicate = self.rules.duplicates == "skip"
+        return self.skipped_as_duplicate
+
+    def ask_code_correction(  # noqa: D102
+        self,
+        description: str,
+        suggestions: Sequence[str],
+        config: ValidationConfig,  # noqa: ARG002
+    ) -> str | None:
+        correction = self.rules.correct_description(description)
+        if correction is None:
+            closest = f" Closest valid: {', '.join(suggestions)}." if suggestions else ""
+            if self.rules.uncorrected_codes == "fail":
+                msg = f"No code correction for '{description}'.{closest}"
+                raise AbortError(msg)
+            QgsMessageLog.logMessage(f"No code correction for '{description}', keeping it.{closest}")
+        return correction
+
+    def show_warnings(  # noqa: D102
+        self,
+        fieldworkshot_layer: QgsVectorLayer,  # noqa: ARG002
+        warning_points: list[QgsFeature],
+        config: ValidationConfig,  # noqa: ARG002
+    ) -> None:
+        if not warning_points:
+            return
+        names = ", ".join(point["name"] for point in warning_points)
+        if self.rules.point_warnings == "fail":
+            msg = f"Shots with point warnings: {names}."
+            raise AbortError(msg)
+        QgsMessageLog.logMessage(f"Accepting shots with point warnings: {names}.")
+
+    def review_merge_groups(  # noqa: D102
+        self,
+        fieldworkshot_layer: QgsVectorLayer,  # noqa: ARG002
+        groups: list[list[QgsFeature]],
+        config: ValidationConfig,  # noqa: ARG002
+    ) -> list[list[QgsFeature]]:
+        return groups if self.rules.merge == "all" else []
+
+    def create_match_stage(self, fieldwork_id: str, fieldrun_id: int | None) -> FieldRunMatchStage:  # noqa: D102
+        return RulesFieldRunMatchStage(
+            self.rules,
+            layers=self.layers,
+            fieldwork_id=fieldwork_id,
+            fieldrun_id=fieldrun_id,
+            plugin_input=self.plugin_input,
+            config=self.config,
+        )
+
+    def create_shift_stage(self, fieldrun_id: int | None) -> CoordinateShiftStage:  # noqa: D102
+        return RulesCoordinateShiftStage(
+            self.rules,
+            layers=self.layers,
+            fieldwork=self.fieldwork_feature,
+            fieldrun_id=fieldrun_id,
+            plugin_input=self.plugin_input,
+            config=self.config,
+        )
+
+    def commit(self) -> None:
+        """Commit the import, in the same order as the plugin does."""
+        fail_msg = "Failed to commit {}."
+        assert_true(self.layers.fieldwork_layer.commitChanges(), fail_msg.format("fieldwork_layer"))
+        assert_true(self.layers.fieldworkshot_layer.commitChanges(), fail_msg.format("fieldworkshot_layer"))
+        assert_true(self.layers.fieldrunshot_layer.commitChanges(), fail_msg.format("fieldrunshot_layer"))
+
+
+_worker_app: QgsApplication | None = None
+
+
+def _init_worker() -> None:
+    # parsing reprojects SUM/LOC/REF coordinates, which needs an initialized QGIS in every worker
+    global _worker_app  # noqa: PLW0603
+    _worker_app = QgsApplication([], False)  # noqa: FBT003
+    _worker_app.initQgis()
+
+
+def _parse_job(job: BatchJob) -> None:
+    # the results go to the parse cache, where the import picks them up
+    plugin_input = job.plugin_input()
+    parse_check_inputs(plugin_input)
+    parse_create_inputs(plugin_input)
+
+
+def import_job(
+    job: BatchJob,
+    layers: FieldworkImportLayers,
+    rules: BatchImportRules,
+    fieldrun_layer: QgsVectorLayer | None,
+) -> BatchJobResult:
+    """Import one parsed job and commit it, or roll it back if it fails."""  # noqa: DOC201
+    fieldrun_feature = None
+    fieldrun_id = rules.fieldrun_ids.get(job.name)
+    if fieldrun_id is not None and fieldrun_layer is not None:
+        fieldrun_feature = next(fieldrun_layer.getFeatures(f'"id" = {int(fieldrun_id)}'), None)
+        if fieldrun_feature is None:
+            return BatchJobResult(job.name, "failed", f"Fieldrun {fieldrun_id} not found.")
+
+    process = BatchImportProcess(job.plugin_input(fieldrun_feature), layers, rules)
+    try:
+        process.run()
+        process.commit()
+    except AbortError as e:
+        process.rollback()
+        return BatchJobResult(job.name, "skipped" if process.skipped_as_duplicate else "failed", str(e))
+    except Exception as e:  # noqa: BLE001
+        # one bad job shouldn't stop the rest of the batch
+        process.rollback()
+        return BatchJobResult(job.name, "failed", f"{type(e).__name__}: {e}")
+    return BatchJobResult(job.name, "imported")
+
+
+def run_batch_import(
+    jobs_dir: Path,
+    target: str,
+    rules: BatchImportRules,
+    workers: int | None = None,
+    schema: str = DEFAULT_TARGET_SCHEMA,
+) -> list[BatchJobResult]:
+    """Parse every job in jobs_dir in a process pool and import them into the target.
+
+    target is a GeoPackage path or a PostgreSQL connection string (e.g. "service=fieldwork"),
+    with the tables in schema for PostgreSQL.
+    Returns the result of each job, in job order.
+    """  # noqa: DOC201
+    jobs = find_jobs(jobs_dir)
+    QgsMessageLog.logMessage(f"Found {len(jobs)} jobs in {jobs_dir}.")
+    layers = load_target_layers(target, schema)
+    fieldrun_layer = (
+        load_target_layer(target, "sites_fieldrun", has_geometry=False, schema=schema) if rules.fieldrun_ids else None
+    )
+
+    results: list[BatchJobResult] = []
+    # spawn, forking a process with QGIS already initialized isn't safe
+    context = multiprocessing.get_context("spawn")
+    parse_ahead = workers or os.cpu_count() or 1
+    queued_jobs = iter(jobs)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as executor:
+        # keep parse_ahead jobs in flight, submitting the next one as each import starts
+        parsing: deque[tuple[BatchJob, Future[None]]] = deque(
+            (job, executor.submit(_parse_job, job)) for job in itertools.islice(queued_jobs, parse_ahead)
+        )
+        while parsing:
+            job, future = parsing.popleft()
+            next_job = next(queued_jobs, None)
+            if next_job is not None:
+                parsing.append((next_job, executor.submit(_parse_job, next_job)))
+            try:
+                future.result()
+            except Exception as e:  # noqa: BLE001
+                results.append(BatchJobResult(job.name, "failed", f"Parsing failed. {type(e).__name__}: {e}"))
+                continue
+            result = import_job(job, layers, rules, fieldrun_layer)
+            QgsMessageLog.logMessage(f"{job.name}: {result.status}. {result.message}")
+            results.append(result)
+    return results
@@ -0,0 +1,118 @@
+"""Rules file used by the batch import in place of the interactive decisions.
+
+Example rules file, every key is optional and defaults to the value shown:
+``` json
+{
+    "duplicates": "skip",
+    "code_corrections": {"CP1": "CP", "BAD/description": "GOOD/description"},
+    "uncorrected_codes": "keep",
+    "point_warnings": "accept",
+    "merge": "all",
+    "control_matches": "nearest",
+    "create_missing_controls": false,
+    "shift": "NONE",
+    "fieldrun_ids": {"job folder name": 123}
+}
+```
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field, fields
+from typing import TYPE_CHECKING, Any, Literal, get_args
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+DuplicatesRule = Literal["skip", "import"]
+UncorrectedCodesRule = Literal["keep", "fail"]
+PointWarningsRule = Literal["accept", "fail"]
+MergeRule = Literal["all", "none"]
+ControlMatchesRule = Literal["nearest", "none"]
+ShiftRule = Literal["NONE", "HPN", "CONTROL"]
+
+
+@dataclass(frozen=True)
+class BatchImportRules:
+    duplicates: DuplicatesRule = "skip"
+    """Skip jobs that look like a duplicate of an existing fieldwork, or import them anyway."""
+    code_corrections: dict[str, str] = field(default_factory=dict)
+    """Corrections for invalid codes, keyed by the whole description or by the code (the part before the /)."""
+    uncorrected_codes: UncorrectedCodesRule = "keep"
+    """What to do with an invalid code that has no correction, keep it as is or fail the job."""
+    point_warnings: PointWarningsRule = "accept"
+    """What to do with shots that have bad HRMS, VRMS or fixed status flags."""
+    merge: MergeRule = "all"
+    """Average every group of same-point shots found, or none of them."""
+    control_matches: ControlMatchesRule = "nearest"
+    """Match each control shot to its nearest suggested fieldrun control, or leave it unmatched."""
+    create_missing_controls: bool = False
+    """Create a fieldrun control named after the shot when there's no suggestion. Needs a fieldrun id for the job."""
+    shift: ShiftRule = "NONE"
+    """Shift to apply. Falls back to no shift when the chosen one can't be calculated."""
+    fieldrun_ids: dict[str, int] = field(default_factory=dict)
+    """Fieldrun to import each job into, keyed by job folder name."""
+
+    def correct_description(self, description: str) -> str | None:
+        """Return the corrected description, or None if there's no correction for it."""  # noqa: DOC201
+        if description in self.code_corrections:
+            return self.code_corrections[description]
+        code, sep, rest = description.partition("/")
+        if code in self.code_corrections:
+            return f"{self.code_corrections[code]}{sep}{rest}"
+        return None
+
+
+_CHOICES = {
+    "duplicates": DuplicatesRule,
+    "uncorrected_codes": UncorrectedCodesRule,
+    "point_warnings": PointWarningsRule,
+    "merge": MergeRule,
+    "control_matches": ControlMatchesRule,
+    "shift": ShiftRule,
+}
+
+
+def load_rules(path: Path | None) -> BatchImportRules:
+    """Load and validate a rules file. Returns the default rules if path is None."""  # noqa: DOC201, DOC501
+    if path is None:
+        return BatchImportRules()
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(data, dict):
+        msg = f"Rules file {path} must hold a JSON object."
+        raise TypeError(msg)
+
+    known_keys = {f.name for f in fields(BatchImportRules)}
+    unknown_keys = set(data) - known_keys
+    if unknown_keys:
+        msg = f"Unknown keys in rules file {path}: {', '.join(sorted(unknown_keys))}."
+        raise ValueError(msg)
+
+    for key, choices_type in _CHOICES.items():
+        choices = get_args(choices_type)
+        if key in data and data[key] not in choices:
+            msg = f"Rule '{key}' must be one of {', '.join(choices)}, got '{data[key]}'."
+            raise ValueError(msg)
+
+    if "create_missing_controls" in data and not isinstance(data["create_missing_controls"], bool):
+        msg = f"Rule 'create_missing_controls' must be true or false, got {data['create_missing_controls']!r}."
+        raise TypeError(msg)
+    _check_mapping(data, "code_corrections", str)
+    _check_mapping(data, "fieldrun_ids", int)
+
+    return BatchImportRules(**data)
+
+
+def _check_mapping(data: dict[str, Any], key: str, value_type: type) -> None:
+    """Raise a TypeError if data[key] isn't an object of value_type values."""  # noqa: DOC501
+    if key not in data:
+        return
+    value = data[key]
+    # bools are ints in python, but never a valid id
+    if not isinstance(value, dict) or any(
+        not isinstance(item, value_type) or isinstance(item, bool) for item in value.values()
+    ):
+        msg = f"Rule '{key}' must be an object of {value_type.__name__} values, got {value!r}."
+        raise TypeError(msg)
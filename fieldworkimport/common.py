@@ -1,59 +1,116 @@
 import string
-from typing import Optional
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import cached_property
+from itertools import count
+from typing import NamedTuple, Optional
 from uuid import uuid4
 
+import numpy as np
 from qgis.core import QgsFeature, QgsSettings, QgsVectorLayer
 
 from fieldworkimport.helpers import settings_key
+from fieldworkimport.schema import FieldworkShotSchema
+from fieldworkimport.shot_table import FLAG_COLUMNS, GroupAverages, ShotTable
 
+_CODE_END = ""
+"""Key marking the end of a valid code in a `CodeMatcher` trie node. Never a character, so it can't clash."""
 
-def _validate_single_code(
-    code: str,
-    previous_code: Optional[str],
-    valid_codes: list[str],
-    valid_special_characters: list[str],
-    parameterized_special_characters: list[str],
-) -> bool:
-    """Validate a single code.
+DEFAULT_CODE_CHECK_CACHE_SIZE = 4096
+"""Number of multicode checks kept by the shared `CodeCheckCache`."""
 
-    :param code: Description
-    :type code: str
-    :param previous_code: Description
-    :type previous_code:
-    :param valid_codes: Description
-    :type valid_codes:
-    :param valid_code_special_characters: Description
-    :type valid_code_special_characters:
+DEFAULT_SUGGESTION_COUNT = 5
+"""Number of closest valid multicodes suggested for an invalid one."""
+
+
+class CodeCheck(NamedTuple):
+    """Result of validating a multicode."""
+
+    valid: bool
+    failed_code: Optional[str] = None
+    """First code of the multicode that isn't valid, None if it's valid."""
+
+
+class CodeMatcher:
+    """Code validation settings compiled for validating many codes.
+
+    Valid codes are stored in a trie so the longest valid prefix of a code is found in one walk over
+    the code's characters, instead of trying every valid code.
     """
-    # Special characters can appear after a code or another special character
-    if code.upper() in valid_special_characters and previous_code is not None:
-        return True
-    # If the previous code was a special character that is "parameterized" meaning
-    # it can take paramteters like "V 0.15" where 0.15 is the param,
-    # check if this code is a number. If so, it's valid.
-    if previous_code and previous_code.upper() in parameterized_special_characters:
-        try:
-            float(code)
-        except ValueError:
-            pass
-        else:
+
+    def __init__(  # noqa: D107
+        self,
+        valid_codes: Iterable[str],
+        valid_special_characters: Iterable[str],
+        parameterized_special_characters: Iterable[str],
+    ) -> None:
+        self._trie: dict[str, dict] = {}
+        for valid_code in valid_codes:
+            node = self._trie
+            for char in valid_code:
+                node = node.setdefault(char, {})
+            node[_CODE_END] = {}
+        self._special_characters = frozenset(valid_special_characters)
+        self._parameterized_special_characters = frozenset(parameterized_special_characters)
+
+    def longest_prefix(self, code: str) -> Optional[str]:
+        """Return the longest valid code that code starts with, or None."""  # noqa: DOC201
+        node = self._trie
+        length = 0 if _CODE_END in node else None
+        for depth, char in enumerate(code, start=1):
+            next_node = node.get(char)
+            if next_node is None:
+                break
+            node = next_node
+            if _CODE_END in node:
+                length = depth
+        return None if length is None else code[:length]
+
+    def validate_single_code(self, code: str, previous_code: Optional[str]) -> bool:
+        """Validate a single code."""  # noqa: DOC201
+        upper_code = code.upper()
+        # Special characters can appear after a code or another special character
+        if upper_code in self._special_characters and previous_code is not None:
             return True
+        # If the previous code was a special character that is "parameterized" meaning
+        # it can take paramteters like "V 0.15" where 0.15 is the param,
+        # check if this code is a number. If so, it's valid.
+        if previous_code and previous_code.upper() in self._parameterized_special_characters:
+            try:
+                float(code)
+            except ValueError:
+                pass
+            else:
+                return True
+
+        # Codes need to start with a known prefix
+        # want to prevent matching on 'WV' if code is 'WVMH', so find the longest match
+        prefix = self.longest_prefix(upper_code)
+        if prefix is None:
+            return False
 
-    # Codes need to start with a known prefix
-    prefix = None
-    for curr_code in valid_codes:
-        # want to prevent matching on 'WV' if code is 'WVMH'
-        # find best match (best match is probably the longest)
-        if code.upper().startswith(curr_code) and (prefix is None or len(prefix) < len(curr_code)):
-            prefix = curr_code
+        # They may have a string starting with a number appended to the end of them, like '3B4AZ'
+        suffix = code.removeprefix(prefix)
+        # If there is a suffix and it doesn't start with a number, it's invalid. Otherwise, it is a valid code.
+        return len(suffix) == 0 or suffix[0].isdigit()
 
-    if prefix is None:
-        return False
+    def check(self, mutlicode: str) -> CodeCheck:
+        """Validate a fieldwork process point code/multicode string, and find the code that makes it invalid."""  # noqa: DOC201
+        # split multi code into individual codes
+        codes = mutlicode.strip().upper().split(" ")
 
-    # They may have a string starting with a number appended to the end of them, like '3B4AZ'
-    suffix = code.removeprefix(prefix)
-    # If there is a suffix and it doesn't start with a number, it's invalid. Otherwise, it is a valid code.
-    return len(suffix) == 0 or suffix[0].isdigit()
+        # valid if all single codes are valid
+        previous_code: Optional[str] = None
+        for code in codes:
+            if not self.validate_single_code(code, previous_code):
+                return CodeCheck(valid=False, failed_code=code)
+            previous_code = code
+        return CodeCheck(valid=True)
+
+    def validate(self, mutlicode: str) -> bool:
+        """Validate a fieldwork process point code/multicode string."""  # noqa: DOC201
+        return self.check(mutlicode).valid
 
 
 def validate_code(
@@ -64,67 +121,268 @@ def validate_code(
 ) -> bool:
     """Validate a fieldwork process point code/multicode string.
 
+    Compiles the settings on every call, use `ValidationConfig.code_matcher` to validate many codes.
+
     :param mutlicode: Description
     :type mutlicode: str
     :param valid_codes: Description
     :type valid_codes:
     :param valid_code_special_characters: Description
     :type valid_code_special_characters:
+    """  # noqa: DOC201
+    return CodeMatcher(valid_codes, valid_special_characters, parameterized_special_characters).validate(mutlicode)
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance, the number of inserted, deleted or replaced characters to turn a into b."""  # noqa: DOC201
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def _deletions(word: str, max_deletions: int) -> set[str]:
+    """Return word and every string made by deleting up to max_deletions of its characters."""  # noqa: DOC201
+    found = {word}
+    frontier = {word}
+    for _ in range(max_deletions):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        found |= frontier
+    return found
+
+
+class EditDistanceIndex:
+    """Words indexed by their deletions, to find the words within an edit distance of another one.
+
+    Two words within n edits of each other have a common string left after deleting at most n characters
+    from each, so a search only computes the distance to the words sharing a deletion with it.
     """
-    # split multi code into individual codes
-    codes = mutlicode.strip().upper().split(" ")
-
-    # return true if all single codes are valid
-    previous_code: Optional[str] = None
-
-    for code in codes:
-        if not _validate_single_code(
-            code,
-            previous_code,
-            valid_codes,
-            valid_special_characters,
-            parameterized_special_characters,
-        ):
-            return False
-        previous_code = code
-
-    return True
-
-
-def validate_point(
-        point: QgsFeature,
-        hrms_tolerance: float,
-        vrms_tolerance: float,
-        valid_codes: list[str],
-        valid_special_characters: list[str],
-        parameterized_special_characters: list[str],
-    ) -> bool:
-    hrms: float = point["HRMS"]
-    vrms: float = point["VRMS"]
-    code: str = point["code"]
-    status: Optional[str] = point["status"]
-    invalid = False
-
-    if hrms > hrms_tolerance:
-        point.setAttribute("bad_hrms_flag", True)
-        invalid = True
-    if vrms > vrms_tolerance:
-        point.setAttribute("bad_vrms_flag", True)
-        invalid = True
-    if status and "fixed" not in status.lower():
-        point.setAttribute("bad_fixed_status_flag", True)
-        invalid = True
-
-    code_valid = validate_code(
-        code,
-        valid_codes=valid_codes,
-        valid_special_characters=valid_special_characters,
-        parameterized_special_characters=parameterized_special_characters,
-    )
-    if not code_valid:
-        point.setAttribute("bad_code_flag", True)
-        invalid = True
-    return not invalid
+
+    max_distance: int
+
+    def __init__(self, words: Iterable[str], max_distance: int) -> None:  # noqa: D107
+        self.max_distance = max_distance
+        self._words_by_deletion: dict[str, set[str]] = {}
+        for word in words:
+            for deletion in _deletions(word, max_distance):
+                self._words_by_deletion.setdefault(deletion, set()).add(word)
+
+    def search(self, word: str, max_distance: int) -> list[tuple[int, str]]:
+        """Return the (distance, word) of the words within max_distance of word, closest first.
+
+        max_distance can't be over the index's max_distance.
+        """  # noqa: DOC201
+        candidates: set[str] = set()
+        for deletion in _deletions(word, max_distance):
+            candidates |= self._words_by_deletion.get(deletion, set())
+        found = [(edit_distance(word, candidate), candidate) for candidate in candidates]
+        return sorted(match for match in found if match[0] <= max_distance)
+
+
+class CodeSuggester:
+    """Suggests the closest valid multicodes for an invalid one.
+
+    Each invalid code of the multicode is swapped for the valid codes closest to the letters it starts
+    with, keeping the number it ends with, like 'TRE12' to 'TREE12'. The suggested multicodes are the
+    combinations with the smallest total distance.
+    """
+
+    def __init__(self, matcher: CodeMatcher, valid_codes: Iterable[str], max_distance: int = 2) -> None:  # noqa: D107
+        self.matcher = matcher
+        self.max_distance = max_distance
+        self._index = EditDistanceIndex((code for code in valid_codes if code), max_distance)
+
+    def suggest_single_code(self, code: str, previous_code: Optional[str], k: int) -> list[tuple[int, str]]:
+        """Return the (distance, code) of up to k valid codes closest to code, code itself if it's valid."""  # noqa: DOC201
+        if self.matcher.validate_single_code(code, previous_code):
+            return [(0, code)]
+        letters = code.rstrip(string.digits + ".")
+        number = code[len(letters):]
+        if not letters:
+            return []
+        # short codes are a couple of edits away from every other short code, allow fewer edits for them
+        max_distance = min(self.max_distance, max(len(letters) - 1, 1))
+        matches = self._index.search(letters, max_distance)[:k]
+        return [(distance, valid_code + number) for distance, valid_code in matches]
+
+    def suggest(self, mutlicode: str, k: int = DEFAULT_SUGGESTION_COUNT) -> list[str]:
+        """Return up to k valid multicodes closest to mutlicode, closest first."""  # noqa: DOC201
+        # keeping the best k partial multicodes after each code is enough, the distances add up
+        best: list[tuple[int, tuple[str, ...]]] = [(0, ())]
+        previous_code: Optional[str] = None
+        for code in mutlicode.strip().upper().split(" "):
+            candidates = self.suggest_single_code(code, previous_code, k)
+            if not candidates:
+                return []
+            best = sorted(
+                (total + distance, (*codes, candidate))
+                for total, codes in best
+                for distance, candidate in candidates
+            )[:k]
+            previous_code = candidates[0][1]
+        return [" ".join(codes) for total, codes in best if total > 0]
+
+
+_config_versions = count()
+
+
+@dataclass(frozen=True)
+class ValidationConfig:
+    """Snapshot of the validation settings, read and split once.
+
+    Get the current one with `validation_config()`, it's replaced every time the settings are saved.
+    Every snapshot gets its own version, which keys the shared multicode check cache.
+    """
+
+    hrms_tolerance: float
+    vrms_tolerance: float
+    same_point_tolerance: float
+    valid_codes: frozenset[str]
+    valid_special_chars: frozenset[str]
+    parameterized_special_chars: frozenset[str]
+    control_point_codes: frozenset[str]
+    consecutive_merge_only: bool = False
+    """Only merge same-point shots that are next to each other in name order."""
+    version: int = field(init=False, default_factory=lambda: next(_config_versions))
+
+    @classmethod
+    def from_settings(cls) -> "ValidationConfig":
+        """Read the validation settings."""  # noqa: DOC201
+        s = QgsSettings()
+        return cls(
+            hrms_tolerance=float(s.value(settings_key("hrms_tolerance"), 0)),
+            vrms_tolerance=float(s.value(settings_key("vrms_tolerance"), 0)),
+            same_point_tolerance=float(s.value(settings_key("same_point_tolerance"), 0)),
+            valid_codes=frozenset(s.value(settings_key("valid_codes"), "").split(",")),
+            valid_special_chars=frozenset(s.value(settings_key("valid_special_chars"), "").split(",")),
+            parameterized_special_chars=frozenset(s.value(settings_key("parameterized_special_chars"), "").split(",")),
+            control_point_codes=frozenset(s.value(settings_key("control_point_codes"), "").split(",")),
+            consecutive_merge_only=s.value(settings_key("consecutive_merge_only"), False, bool),  # noqa: FBT003
+        )
+
+    @cached_property
+    def code_matcher(self) -> CodeMatcher:  # noqa: D102
+        return CodeMatcher(self.valid_codes, self.valid_special_chars, self.parameterized_special_chars)
+
+    @cached_property
+    def code_suggester(self) -> CodeSuggester:  # noqa: D102
+        return CodeSuggester(self.code_matcher, self.valid_codes)
+
+    def check_code(self, mutlicode: str) -> CodeCheck:
+        """Validate a multicode, through the shared multicode check cache."""  # noqa: DOC201
+        return _code_check_cache.check(self, mutlicode)
+
+
+class CodeCheckCache:
+    """Bounded LRU cache of multicode checks, keyed by config version and multicode.
+
+    A job has thousands of shots but only a few dozen distinct descriptions, and each one is checked
+    when validating, again when correcting codes and again when the user enters a correction.
+    """
+
+    maxsize: int
+    hits: int
+    misses: int
+
+    def __init__(self, maxsize: int = DEFAULT_CODE_CHECK_CACHE_SIZE) -> None:  # noqa: D107
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[int, str], CodeCheck] = OrderedDict()
+
+    def check(self, config: ValidationConfig, mutlicode: str) -> CodeCheck:
+        """Return the cached check of mutlicode under config, checking it on a miss."""  # noqa: DOC201
+        key = (config.version, mutlicode)
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        result = config.code_matcher.check(mutlicode)
+        self._entries[key] = result
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return result
+
+    def clear(self) -> None:  # noqa: D102
+        self._entries.clear()
+
+    def stats(self) -> str:  # noqa: D102
+        return f"{self.hits} hits, {self.misses} misses, {len(self._entries)} entries"
+
+
+_code_check_cache = CodeCheckCache()
+
+
+def code_check_cache() -> CodeCheckCache:
+    """Return the multicode check cache shared by every validation."""  # noqa: DOC201
+    return _code_check_cache
+
+
+_validation_config: Optional[ValidationConfig] = None
+
+
+def validation_config() -> ValidationConfig:
+    """Return the current validation settings snapshot."""  # noqa: DOC201
+    global _validation_config  # noqa: PLW0603
+    if _validation_config is None:
+        _validation_config = ValidationConfig.from_settings()
+    return _validation_config
+
+
+def refresh_validation_config() -> ValidationConfig:
+    """Re-read the validation settings, call after saving them."""  # noqa: DOC201
+    global _validation_config  # noqa: PLW0603
+    _validation_config = ValidationConfig.from_settings()
+    # checks under the old settings can't be hit anymore
+    _code_check_cache.clear()
+    return _validation_config
+
+
+class ShotFlagColumns(NamedTuple):
+    """Validation checks failed by each shot of a table, in the order of the bad_*_flag fields."""
+
+    bad_hrms: np.ndarray
+    bad_vrms: np.ndarray
+    bad_fixed_status: np.ndarray
+    bad_code: np.ndarray
+
+
+def codes_valid(codes: np.ndarray, config: ValidationConfig) -> np.ndarray:
+    """Return whether each multicode is valid. Each distinct multicode is only checked once."""  # noqa: DOC201
+    valid_by_code = {code: config.check_code(code).valid for code in set(codes)}
+    return np.fromiter((valid_by_code[code] for code in codes), dtype=np.bool_, count=len(codes))
+
+
+def shot_flag_columns(
+    hrms: np.ndarray,
+    vrms: np.ndarray,
+    statuses: np.ndarray,
+    code_valid: np.ndarray,
+    config: ValidationConfig,
+) -> ShotFlagColumns:
+    """Return which validation checks each shot fails.
+
+    Null (NaN) HRMS and VRMS pass their checks.
+    """  # noqa: DOC201
+    # few distinct statuses, check each once
+    bad_by_status = {status: bool(status) and "fixed" not in status.lower() for status in set(statuses)}
+    with np.errstate(invalid="ignore"):
+        return ShotFlagColumns(
+            bad_hrms=hrms > config.hrms_tolerance,
+            bad_vrms=vrms > config.vrms_tolerance,
+            bad_fixed_status=np.fromiter(
+                (bad_by_status[status] for status in statuses), dtype=np.bool_, count=len(statuses),
+            ),
+            bad_code=~code_valid,
+        )
 
 
 def parent_point_name(child_name: str):
@@ -135,69 +393,61 @@ def parent_point_name(child_name: str):
     return child_name[:-1] + chr(ord(child_name[-1]) + 1)
 
 
-def get_average_point(fieldworkshot_layer: QgsVectorLayer, points: list[QgsFeature]) -> QgsFeature:  # noqa: D103, PLR0914
-    n = len(points)
-
-    f = QgsFeature(points[0])
-    fields = fieldworkshot_layer.fields()
-    id_index = fields.indexFromName("id")
-    name_index = fields.indexFromName("name")
-    northing_index = fields.indexFromName("northing")
-    easting_index = fields.indexFromName("easting")
-    elevation_index = fields.indexFromName("elevation")
-    HRMS_index = fields.indexFromName("HRMS")  # noqa: N806
-    VRMS_index = fields.indexFromName("VRMS")  # noqa: N806
-    PDOP_index = fields.indexFromName("PDOP")  # noqa: N806
-    HDOP_index = fields.indexFromName("HDOP")  # noqa: N806
-    VDOP_index = fields.indexFromName("VDOP")  # noqa: N806
-    TDOP_index = fields.indexFromName("TDOP")  # noqa: N806
-    GDOP_index = fields.indexFromName("GDOP")  # noqa: N806
-
-    n_with_HRMS = len([p for p in points if p[HRMS_index]])  # noqa: N806
-    n_with_VRMS = len([p for p in points if p[VRMS_index]])  # noqa: N806
-    n_with_PDOP = len([p for p in points if p[PDOP_index]])  # noqa: N806
-    n_with_HDOP = len([p for p in points if p[HDOP_index]])  # noqa: N806
-    n_with_VDOP = len([p for p in points if p[VDOP_index]])  # noqa: N806
-    n_with_TDOP = len([p for p in points if p[TDOP_index]])  # noqa: N806
-    n_with_GDOP = len([p for p in points if p[GDOP_index]])  # noqa: N806
-
-    f[id_index] = str(uuid4())
-    f[name_index] = parent_point_name(f[name_index])
-    f[northing_index] = sum(p[northing_index] for p in points) / n
-    f[easting_index] = sum(p[easting_index] for p in points) / n
-    f[elevation_index] = sum(p[elevation_index] for p in points) / n
-    f[HRMS_index] = sum(p[HRMS_index] for p in points if p[HRMS_index]) / max(n_with_HRMS, 1)
-    f[VRMS_index] = sum(p[VRMS_index] for p in points if p[VRMS_index]) / max(n_with_VRMS, 1)
-    f[PDOP_index] = sum(p[PDOP_index] for p in points if p[PDOP_index]) / max(n_with_PDOP, 1)
-    f[HDOP_index] = sum(p[HDOP_index] for p in points if p[HDOP_index]) / max(n_with_HDOP, 1)
-    f[VDOP_index] = sum(p[VDOP_index] for p in points if p[VDOP_index]) / max(n_with_VDOP, 1)
-    f[TDOP_index] = sum(p[TDOP_index] for p in points if p[TDOP_index]) / max(n_with_TDOP, 1)
-    f[GDOP_index] = sum(p[GDOP_index] for p in points if p[GDOP_index]) / max(n_with_GDOP, 1)
-
-    s = QgsSettings()
-
-    validate_point(
-        f,
-        float(s.value(settings_key("hrms_tolerance"), 0)),
-        float(s.value(settings_key("vrms_tolerance"), 0)),
-        s.value(settings_key("valid_codes"), "").split(","),
-        s.value(settings_key("valid_special_chars"), "").split(","),
-        s.value(settings_key("parameterized_special_chars"), "").split(","),
+def average_shot_groups(
+    fieldworkshot_layer: QgsVectorLayer,
+    groups: list[list[QgsFeature]],
+    table: Optional[ShotTable] = None,
+    config: Optional[ValidationConfig] = None,
+) -> tuple[list[QgsFeature], GroupAverages]:
+    """Return a new shot averaging each group, named and attributed after the group's first shot, and the averages.
+
+    Pass the table the shots were loaded into, if any, to average from it instead of the features.
+    The new shots are validated against config, the current validation settings by default.
+    """  # noqa: DOC201
+    if table is None:
+        table = ShotTable.from_features(fieldworkshot_layer, [point for group in groups for point in group])
+        sizes = np.cumsum([0, *(len(group) for group in groups)])
+        group_rows = [np.arange(start, end) for start, end in zip(sizes[:-1], sizes[1:])]
+    else:
+        group_rows = [table.rows_of(group) for group in groups]
+    averages = table.average_groups(group_rows)
+
+    # validate all the averages at once, each takes the status and code of its first shot
+    config = config or validation_config()
+    first_rows = averages.rows[averages.starts[:-1]]
+    flags = shot_flag_columns(
+        averages.averages["HRMS"],
+        averages.averages["VRMS"],
+        table["status"][first_rows],
+        codes_valid(table["code"][first_rows], config),
+        config,
     )
 
-    return f
+    schema = FieldworkShotSchema.of(fieldworkshot_layer)
+    average_columns = [schema.column(name) for name in averages.averages.dtype.names]
+    flag_columns = [schema.column(name) for name in FLAG_COLUMNS]
+    avg_points = []
+    for index, group in enumerate(groups):
+        f = QgsFeature(group[0])
+        schema.id.set(f, str(uuid4()))
+        schema.name.set(f, parent_point_name(schema.name.get(f)))
+        for column, value in zip(average_columns, averages.averages[index].tolist()):
+            column.set(f, value)
+        # only raise flags, a shot that already failed a check keeps its flag
+        for column, bad in zip(flag_columns, flags):
+            if bad[index]:
+                column.set(f, True)  # noqa: FBT003
+        avg_points.append(f)
+    return avg_points, averages
 
 
-def calc_parent_child_residuals(parent_point: QgsFeature, child_point: QgsFeature):
-    parent_point_northing = parent_point["northing"]
-    parent_point_easting = parent_point["easting"]
-    parent_point_elevation = parent_point["elevation"]
-    child_point_northing = child_point["northing"]
-    child_point_easting = child_point["easting"]
-    child_point_elevation = child_point["elevation"]
+def get_average_point(
+    fieldworkshot_layer: QgsVectorLayer,
+    points: list[QgsFeature],
+    table: Optional[ShotTable] = None,
+    config: Optional[ValidationConfig] = None,
+) -> QgsFeature:
+    """Return a new shot averaging points, see `average_shot_groups`."""  # noqa: DOC201
+    avg_points, _ = average_shot_groups(fieldworkshot_layer, [points], table, config)
+    return avg_points[0]
 
-    return (
-        parent_point_easting - child_point_easting,
-        parent_point_northing - child_point_northing,
-        parent_point_elevation - child_point_elevation,
-    )
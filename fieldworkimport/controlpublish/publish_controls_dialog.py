@@ -5,7 +5,16 @@ from typing import TYPE_CHECKING
 from qgis.core import QgsFeature, QgsMessageLog, QgsSettings, QgsVectorLayer
 from qgis.PyQt.QtWidgets import QDialog, QMessageBox, QWidget
 
-from fieldworkimport.helpers import assert_true, get_layers_by_table_name, nullish, progress_dialog, settings_key, timed
+from fieldworkimport.helpers import (
+    BulkAttributeWriter,
+    assert_true,
+    get_layers_by_table_name,
+    nullish,
+    progress_dialog,
+    settings_key,
+    timed,
+)
+from fieldworkimport.schema import FieldrunShotSchema
 from fieldworkimport.ui.generated.publish_controls_ui import Ui_PublishControlsDialog
 from fieldworkimport.ui.publish_control_item import PublishControlItem
 
@@ -104,7 +113,8 @@ class PublishControlsDialog(QDialog, Ui_PublishControlsDialog):
         self.fieldworkshot_layer.startEditing()
         self.fieldrunshot_layer.startEditing()
 
-        frs_fields = self.fieldrunshot_layer.fields()
+        frs = FieldrunShotSchema.of(self.fieldrunshot_layer)
+        writer = BulkAttributeWriter(self.fieldrunshot_layer, "Publish controls")
 
         for item in self.scrollAreaWidgetContents.children():
             if not isinstance(item, PublishControlItem):
@@ -118,17 +128,19 @@ class PublishControlsDialog(QDialog, Ui_PublishControlsDialog):
 
             fieldworkshot = item.fieldwork_shot
             fieldrunshot = item.fieldrun_shot
-            fieldrunshot[frs_fields.indexFromName("name")] = name
-            fieldrunshot[frs_fields.indexFromName("description")] = description
-            # update control point data to set published_by_fieldwork_id
-            # lets us know that the control point coords were published by this fieldwork.
-            fieldrunshot[frs_fields.indexFromName("control_published_by_fieldwork_id")] = selected_fieldwork["id"]
-            fieldrunshot[frs_fields.indexFromName("control_coordinate_system_id")] = coord_system["id"]
-            fieldrunshot[frs_fields.indexFromName("control_easting")] = round(fieldworkshot["easting"], 4)
-            fieldrunshot[frs_fields.indexFromName("control_northing")] = round(fieldworkshot["northing"], 4)
-            fieldrunshot[frs_fields.indexFromName("control_elevation_system_id")] = elevation_system["id"]
-            fieldrunshot[frs_fields.indexFromName("control_elevation")] = round(fieldworkshot["elevation"], 2)
-            assert_true(self.fieldrunshot_layer.updateFeature(fieldrunshot), "Failed to update fieldrun shot.")
+            writer.change_values(fieldrunshot.id(), {
+                frs.name.index: name,
+                frs.description.index: description,
+                # update control point data to set published_by_fieldwork_id
+                # lets us know that the control point coords were published by this fieldwork.
+                frs.control_published_by_fieldwork_id.index: selected_fieldwork["id"],
+                frs.control_coordinate_system_id.index: coord_system["id"],
+                frs.control_easting.index: round(fieldworkshot["easting"], 4),
+                frs.control_northing.index: round(fieldworkshot["northing"], 4),
+                frs.control_elevation_system_id.index: elevation_system["id"],
+                frs.control_elevation.index: round(fieldworkshot["elevation"], 2),
+            })
+        writer.apply("Failed to update fieldrun shots.")
 
         fail_msg = "Failed to commit %s."
         assert_true(self.fieldworkshot_layer.commitChanges(), fail_msg % "fieldworkshot")
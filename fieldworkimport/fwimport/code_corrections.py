@@ -0,0 +1,129 @@
+"""Code corrections learned from earlier imports.
+
+Crews tend to make the same typos on every job, so the full codes corrected in the code correction dialog
+are kept in an SQLite database under the plugin's data directory, with how often each was used.
+Later imports apply them without asking again.
+
+    store = code_correction_store()
+    known = store.lookup({"TRE", "CP1"})  # {"TRE": "TREE"}
+    store.record({"TRE": "TREE"}, {"TRE": 3})
+"""
+
+from __future__ import annotations
+
+import contextlib
+import sqlite3
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from qgis.core import QgsApplication, QgsMessageLog
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+LOOKUP_CHUNK_SIZE = 500
+"""Codes looked up per query, below SQLite's limit on query parameters."""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS code_correction (
+    bad_code TEXT PRIMARY KEY,
+    good_code TEXT NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0,
+    last_used TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def default_store_path() -> Path:  # noqa: D103
+    return Path(QgsApplication.qgisSettingsDirPath()) / "fieldworkimport" / "code_corrections.sqlite"
+
+
+class CodeCorrectionStore:
+    """Bad full code to corrected full code, with usage counts, stored in SQLite.
+
+    The store is only an optimization, database errors are logged and treated as an empty store.
+    """
+
+    path: Path
+
+    def __init__(self, path: Path | None = None) -> None:  # noqa: D107
+        self.path = path or default_store_path()
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # the inner with is one transaction
+        with contextlib.closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.execute(_SCHEMA)
+            yield connection
+
+    def lookup(self, bad_codes: Iterable[str]) -> dict[str, str]:
+        """Return the known corrections of bad_codes."""  # noqa: DOC201
+        bad_codes = list(dict.fromkeys(bad_codes))
+        corrections: dict[str, str] = {}
+        try:
+            with self._connect() as connection:
+                for start in range(0, len(bad_codes), LOOKUP_CHUNK_SIZE):
+                    chunk = bad_codes[start:start + LOOKUP_CHUNK_SIZE]
+                    rows = connection.execute(
+                        f"SELECT bad_code, good_code FROM code_correction WHERE bad_code IN ({','.join('?' * len(chunk))})",  # noqa: S608
+                        chunk,
+                    )
+                    corrections.update(rows)
+        except (OSError, sqlite3.Error) as e:
+            QgsMessageLog.logMessage(f"Failed to read learned code corrections: {e}")
+            return {}
+        return corrections
+
+    def record(self, learned: dict[str, str], used: dict[str, int] | None = None) -> None:
+        """Save the newly learned corrections, and count the uses of known ones.
+
+        A learned correction replaces an earlier correction of the same code.
+        """
+        if not learned and not used:
+            return
+        try:
+            with self._connect() as connection:
+                connection.executemany(
+                    """
+                    INSERT INTO code_correction (bad_code, good_code, uses) VALUES (?, ?, 1)
+                    ON CONFLICT (bad_code) DO UPDATE SET
+                        uses = CASE WHEN good_code = excluded.good_code THEN uses + 1 ELSE 1 END,
+                        good_code = excluded.good_code,
+                        last_used = CURRENT_TIMESTAMP
+                    """,
+                    learned.items(),
+                )
+                connection.executemany(
+                    "UPDATE code_correction SET uses = uses + ?, last_used = CURRENT_TIMESTAMP WHERE bad_code = ?",
+                    [(n, bad_code) for bad_code, n in (used or {}).items()],
+                )
+        except (OSError, sqlite3.Error) as e:
+            QgsMessageLog.logMessage(f"Failed to save learned code corrections: {e}")
+
+    def forget(self, bad_code: str) -> None:
+        """Delete the correction of a code."""
+        try:
+            with self._connect() as connection:
+                connection.execute("DELETE FROM code_correction WHERE bad_code = ?", (bad_code,))
+        except (OSError, sqlite3.Error) as e:
+            QgsMessageLog.logMessage(f"Failed to delete learned code correction: {e}")
+
+    def clear(self) -> None:
+        """Delete all corrections."""
+        try:
+            with self._connect() as connection:
+                connection.execute("DELETE FROM code_correction")
+        except (OSError, sqlite3.Error) as e:
+            QgsMessageLog.logMessage(f"Failed to delete learned code corrections: {e}")
+
+
+_code_correction_store: CodeCorrectionStore | None = None
+
+
+def code_correction_store() -> CodeCorrectionStore:
+    """Return the shared code correction store."""  # noqa: DOC201
+    global _code_correction_store  # noqa: PLW0603
+    if _code_correction_store is None:
+        _code_correction_store = CodeCorrectionStore()
+    return _code_correction_store
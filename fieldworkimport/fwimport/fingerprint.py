@@ -0,0 +1,98 @@
+"""Content fingerprints of import inputs, used to detect duplicate imports regardless of the job name.
+
+The fingerprints are stored in the `rw5_fingerprint` and `crdb_fingerprint` columns of sites_fieldwork, added by
+docs/migrations/0001_fieldwork_fingerprints.sql. Without them the check falls back to matching on the job name.
+"""
+
+import hashlib
+import io
+from pathlib import Path
+from typing import NamedTuple
+
+from qgis.core import Qgis, QgsExpression, QgsFeatureRequest, QgsVectorLayer
+
+from fieldworkimport.fwimport.parse_cache import read_hashed_bytes
+from fieldworkimport.fwimport.parse_crdb_file import iter_crdb_coordinates, normalize_point_name
+from fieldworkimport.fwimport.parse_rw5_file import RW5_ENCODING, iter_command_blocks
+
+RW5_FINGERPRINT_FIELD = "rw5_fingerprint"
+CRDB_FINGERPRINT_FIELD = "crdb_fingerprint"
+
+IGNORED_RW5_RECORD_TYPES = {"JB"}
+"""Records left out of the RW5 fingerprint, the JB record holds the job name and creation time."""
+
+
+class ImportFingerprint(NamedTuple):
+    """Hashes of the normalized inputs of an import."""
+
+    rw5: str
+    crdb: str
+
+
+class FingerprintMatch(NamedTuple):
+    """Existing fieldwork whose inputs match the fingerprint of a new import."""
+
+    fieldwork_name: str
+    exact: bool
+    """True if both the RW5 records and CRDB coordinates match, otherwise only one of them does."""
+
+
+def rw5_fingerprint(path: Path) -> str:
+    """Hash the RW5 command blocks, with whitespace stripped and the JB record left out.
+
+    The file is read once, the parse cache reuses the content hash taken while reading it.
+    """  # noqa: DOC201
+    digest = hashlib.sha256()
+    with io.TextIOWrapper(io.BytesIO(read_hashed_bytes(path)), encoding=RW5_ENCODING) as input_file:
+        for command_block in iter_command_blocks(input_file):
+            if command_block[0].split(",")[0] in IGNORED_RW5_RECORD_TYPES:
+                continue
+            digest.update("\n".join(command_block).encode("utf-8"))
+            digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+def crdb_fingerprint(path: Path) -> str:
+    """Hash the CRDB coordinates, by normalized point name so re-exports in a different order match.
+
+    Only the coordinates are read, the CRDB is parsed once the import goes ahead.
+    """  # noqa: DOC201
+    lines = sorted(
+        f"{normalize_point_name(p)}\t{n:.4f}\t{e:.4f}\t{z:.4f}"
+        for p, n, e, z in iter_crdb_coordinates(path)
+        if p is not None and None not in {n, e, z}
+    )
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+def has_fingerprint_fields(fieldwork_layer: QgsVectorLayer) -> bool:
+    """Return True if the fieldwork table has columns to store fingerprints in."""  # noqa: DOC201
+    fields = fieldwork_layer.fields()
+    return fields.indexFromName(RW5_FINGERPRINT_FIELD) >= 0 and fields.indexFromName(CRDB_FINGERPRINT_FIELD) >= 0
+
+
+def find_fingerprint_matches(fieldwork_layer: QgsVectorLayer, fingerprint: ImportFingerprint) -> list[FingerprintMatch]:
+    """Find existing fieldwork with the same RW5 records or CRDB coordinates.
+
+    The lookup is an equality filter on the fingerprint columns, so the provider can answer it with the
+    columns' indexes instead of scanning the table.
+    """  # noqa: DOC201
+    if not has_fingerprint_fields(fieldwork_layer):
+        return []
+
+    request = (
+        QgsFeatureRequest()
+        .setFilterExpression(
+            f'"{RW5_FINGERPRINT_FIELD}" = {QgsExpression.quotedValue(fingerprint.rw5)}'
+            f' OR "{CRDB_FINGERPRINT_FIELD}" = {QgsExpression.quotedValue(fingerprint.crdb)}',
+        )
+        .setFlags(Qgis.FeatureRequestFlag.NoGeometry)
+        .setSubsetOfAttributes(["name", RW5_FINGERPRINT_FIELD, CRDB_FINGERPRINT_FIELD], fieldwork_layer.fields())
+    )
+    return [
+        FingerprintMatch(
+            fieldwork_name=fieldwork["name"],
+            exact=fieldwork[RW5_FINGERPRINT_FIELD] == fingerprint.rw5 and fieldwork[CRDB_FINGERPRINT_FIELD] == fingerprint.crdb,
+        )
+        for fieldwork in fieldwork_layer.getFeatures(request)
+    ]
@@ -5,17 +5,21 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import TYPE_CHECKING
 
-from qgis.core import QgsFeature, QgsVectorLayer
+from qgis.core import Qgis, QgsFeatureRequest, QgsMessageLog, QgsVectorLayer
 from qgis.gui import QgisInterface
 from qgis.utils import iface as _iface
 
+from fieldworkimport.common import ValidationConfig, code_check_cache, validation_config
 from fieldworkimport.exceptions import AbortError
-from fieldworkimport.fwimport.stage_1_create_fieldwork import create_fieldwork
-from fieldworkimport.fwimport.stage_2_validate_points import correct_codes, show_warnings, validate_points
-from fieldworkimport.fwimport.stage_3_local_point_merge import local_point_merge
+from fieldworkimport.fwimport.code_corrections import code_correction_store
+from fieldworkimport.fwimport.stage_1_create_fieldwork import create_fieldwork, warn_against_duplicate_imports
+from fieldworkimport.fwimport.stage_2_validate_points import PointValidationStage, ask_code_correction, show_warnings
+from fieldworkimport.fwimport.stage_3_local_point_merge import local_point_merge, review_merge_groups
 from fieldworkimport.fwimport.stage_4_match_fieldrun import FieldRunMatchStage
 from fieldworkimport.fwimport.stage_5_coordinate_shift import CoordinateShiftStage
-from fieldworkimport.helpers import assert_true, get_layers_by_table_name, timed
+from fieldworkimport.helpers import BulkAttributeWriter, get_layers_by_table_name, timed
+from fieldworkimport.schema import FieldworkShotSchema
+from fieldworkimport.transforms import transform_cache
 
 iface: QgisInterface = _iface  # type: ignore
 
@@ -44,12 +48,26 @@ class FieldworkImportLayers:
 class FieldworkImportProcess:
     layers: FieldworkImportLayers
     plugin_input: PluginInput
+    config: ValidationConfig
+
+    # interactive steps, the batch import swaps these for rule based ones
+    check_duplicate = staticmethod(warn_against_duplicate_imports)
+    ask_code_correction = staticmethod(ask_code_correction)
+    show_warnings = staticmethod(show_warnings)
+    review_merge_groups = staticmethod(review_merge_groups)
+    learn_code_corrections = True
+    """Apply the code corrections learned in earlier imports, and learn the new ones."""
 
     def __init__(
         self,
         plugin_input: PluginInput,
+        layers: FieldworkImportLayers | None = None,
     ) -> None:
         self.plugin_input = plugin_input
+        self.config = validation_config()
+        if layers is not None:
+            self.layers = layers
+            return
 
         fieldwork_layer = get_layers_by_table_name("public", "sites_fieldwork", raise_exception=True, no_filter=True)[0]
         fieldworkshot_layer = get_layers_by_table_name("public", "sites_fieldworkshot", raise_exception=True, no_filter=True, require_geom=True)[0]
@@ -70,7 +88,13 @@ class FieldworkImportProcess:
         self.layers.fieldworkshot_layer.rollBack()
         self.layers.fieldwork_layer.rollBack()
 
-    def run(self):
+    def run(self, config: ValidationConfig | None = None):
+        """Run every stage of the import.
+
+        The stages validate against config, by default the validation settings as they were when the process was created.
+        """
+        if config is not None:
+            self.config = config
         try:
             self.layers.fieldwork_layer.startEditing()
             self.layers.fieldworkshot_layer.startEditing()
@@ -80,67 +104,78 @@ class FieldworkImportProcess:
                 self.fieldwork_feature = create_fieldwork(
                     self.layers,
                     self.plugin_input,
+                    check_duplicate=self.check_duplicate,
                 )
 
             fieldwork_id = self.fieldwork_feature["id"]
             fieldrun_id = self.plugin_input.fieldrun_feature["id"] if self.plugin_input.fieldrun_feature else None
 
-            with timed("validate_points"):
-                validate_points(
-                    self.layers.fieldworkshot_layer,
-                    fieldwork_id=fieldwork_id,
-                )
-
-            with timed("correct_codes"):
-                correct_codes(
-                    self.layers.fieldworkshot_layer,
-                    fieldwork_id=fieldwork_id,
-                )
-
-            with timed("show_warnings"):
-                show_warnings(
+            with timed("PointValidationStage"):
+                pv = PointValidationStage(
                     self.layers.fieldworkshot_layer,
                     fieldwork_id=fieldwork_id,
+                    config=self.config,
+                    ask_correction=self.ask_code_correction,
+                    review_warnings=self.show_warnings,
+                    corrections=code_correction_store() if self.learn_code_corrections else None,
                 )
+                pv.run()
 
             with timed("local_point_merge"):
                 local_point_merge(
                     self.layers.fieldworkshot_layer,
                     fieldwork_id=fieldwork_id,
+                    review_groups=self.review_merge_groups,
+                    config=self.config,
                 )
 
             with timed("FieldRunMatchStage"):
-                mm = FieldRunMatchStage(
-                    layers=self.layers,
-                    fieldwork_id=fieldwork_id,
-                    fieldrun_id=fieldrun_id,
-                    plugin_input=self.plugin_input,
-                )
+                mm = self.create_match_stage(fieldwork_id, fieldrun_id)
                 mm.run()
 
             with timed("CoordinateShiftStage"):
-                cs = CoordinateShiftStage(
-                    layers=self.layers,
-                    fieldwork=self.fieldwork_feature,
-                    fieldrun_id=fieldrun_id,
-                    plugin_input=self.plugin_input,
-                )
+                cs = self.create_shift_stage(fieldrun_id)
                 cs.run()
 
             with timed("mark_shots_as_processed"):
                 self.mark_shots_as_processed()
 
+            QgsMessageLog.logMessage(f"Transform cache: {transform_cache().stats()}")
+            QgsMessageLog.logMessage(f"Code check cache: {code_check_cache().stats()}")
+
         except AbortError:
             self.rollback()
             raise
 
+    def create_match_stage(self, fieldwork_id: str, fieldrun_id: int | None) -> FieldRunMatchStage:  # noqa: D102
+        return FieldRunMatchStage(
+            layers=self.layers,
+            fieldwork_id=fieldwork_id,
+            fieldrun_id=fieldrun_id,
+            plugin_input=self.plugin_input,
+            config=self.config,
+        )
+
+    def create_shift_stage(self, fieldrun_id: int | None) -> CoordinateShiftStage:  # noqa: D102
+        return CoordinateShiftStage(
+            layers=self.layers,
+            fieldwork=self.fieldwork_feature,
+            fieldrun_id=fieldrun_id,
+            plugin_input=self.plugin_input,
+            config=self.config,
+        )
+
     def mark_shots_as_processed(self):
         """Set is_processed to true on all points to show processing has completed."""
-        fields = self.layers.fieldworkshot_layer.fields()
-        is_processed_idx = fields.indexFromName("is_processed")
-        points: list[QgsFeature] = [*self.layers.fieldworkshot_layer.getFeatures(
-            f"fieldwork_id = '{self.fieldwork_feature['id']}'",
-        )]  # type: ignore []
-        for point in points:
-            point[is_processed_idx] = True
-            assert_true(self.layers.fieldworkshot_layer.updateFeature(point), "Failed to mark fieldwork shot as processed.")
+        is_processed = FieldworkShotSchema.of(self.layers.fieldworkshot_layer).is_processed
+        # only the feature ids are needed
+        request = (
+            QgsFeatureRequest()
+            .setFilterExpression(f"fieldwork_id = '{self.fieldwork_feature['id']}'")
+            .setFlags(Qgis.FeatureRequestFlag.NoGeometry)
+            .setNoAttributes()
+        )
+        writer = BulkAttributeWriter(self.layers.fieldworkshot_layer, "Mark fieldwork shots as processed")
+        for point in self.layers.fieldworkshot_layer.getFeatures(request):
+            writer.change(point.id(), is_processed.index, True)  # noqa: FBT003
+        writer.apply("Failed to mark fieldwork shots as processed.")
@@ -0,0 +1,197 @@
+"""On-disk cache of parsed import input files.
+
+Operators often abort an import partway through and run it again, so parsed results are kept
+under the plugin's data directory keyed by the content hash of the input file. The least recently
+used entries are evicted once the cache grows over its size limits.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+import pickle
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Callable, TypeVar
+
+from qgis.core import QgsApplication, QgsMessageLog
+
+PARSE_CACHE_VERSION = 1
+"""Bump when the output of any cached parser changes, so stale entries are ignored."""
+PARSER_PACKAGES = ("rw5_to_csv",)
+"""Packages the parsers build on. Their installed versions are part of every key, so upgrading one drops the entries."""
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+ENTRY_SUFFIX = ".parse"
+
+_T = TypeVar("_T")
+
+
+def default_cache_dir() -> Path:  # noqa: D103
+    return Path(QgsApplication.qgisSettingsDirPath()) / "fieldworkimport" / "parse_cache"
+
+
+MAX_CONTENT_HASHES = DEFAULT_MAX_ENTRIES
+"""Number of file content hashes kept in memory, least recently used dropped first."""
+_content_hashes: OrderedDict[tuple[Path, int, int], str] = OrderedDict()
+"""Content hash of each file by (resolved path, mtime, size), so a file is only hashed once until it changes."""
+
+
+@lru_cache(maxsize=None)
+def parser_package_versions() -> tuple[tuple[str, str], ...]:
+    """Return the installed version of each of `PARSER_PACKAGES`, "unknown" if it can't be found."""  # noqa: DOC201
+    versions = []
+    for package in PARSER_PACKAGES:
+        try:
+            versions.append((package, version(package)))
+        except PackageNotFoundError:
+            versions.append((package, "unknown"))
+    return tuple(versions)
+
+
+def _content_hash_key(path: Path) -> tuple[Path, int, int]:
+    stat = path.stat()
+    return path.resolve(), stat.st_mtime_ns, stat.st_size
+
+
+def _remember_content_hash(key: tuple[Path, int, int], content_hash: str) -> None:
+    _content_hashes[key] = content_hash
+    _content_hashes.move_to_end(key)
+    while len(_content_hashes) > MAX_CONTENT_HASHES:
+        _content_hashes.popitem(last=False)
+
+
+def file_content_hash(path: Path) -> str:
+    """Return the sha256 of a file's content, hashed once until the file changes."""  # noqa: DOC201
+    key = _content_hash_key(path)
+    content_hash = _content_hashes.get(key)
+    if content_hash is None:
+        digest = hashlib.sha256()
+        with path.open("rb") as fptr:
+            for chunk in iter(lambda: fptr.read(1024 * 1024), b""):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+    _remember_content_hash(key, content_hash)
+    return content_hash
+
+
+def read_hashed_bytes(path: Path) -> bytes:
+    """Read a whole file, keeping its content hash for `file_content_hash` so it isn't read again for it."""  # noqa: DOC201
+    key = _content_hash_key(path)
+    data = path.read_bytes()
+    _remember_content_hash(key, _content_hashes.get(key) or hashlib.sha256(data).hexdigest())
+    return data
+
+
+class ParseCache:
+    """Cache of parser results, stored as compressed pickles.
+
+    Entries are keyed by the parser kind, the parser version, the versions of the packages the parsers use,
+    the content hash of the input file and any extra arguments that change the parser's output.
+    """
+
+    directory: Path
+    max_entries: int
+    max_bytes: int
+
+    def __init__(  # noqa: D107
+        self,
+        directory: Path | None = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.directory = directory or default_cache_dir()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, kind: str, path: Path, key_args: tuple) -> Path:
+        key = hashlib.sha256(
+            repr((kind, PARSE_CACHE_VERSION, parser_package_versions(), file_content_hash(path), key_args)).encode("utf-8"),
+        ).hexdigest()
+        return self.directory / f"{kind}-{key}{ENTRY_SUFFIX}"
+
+    def _read(self, entry_path: Path) -> tuple[bool, object]:
+        try:
+            data = pickle.loads(zlib.decompress(entry_path.read_bytes()))  # noqa: S301
+        except FileNotFoundError:
+            return False, None
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            QgsMessageLog.logMessage(f"Discarding unreadable parse cache entry {entry_path.name}.")
+            with contextlib.suppress(OSError):
+                entry_path.unlink()
+            return False, None
+        # mark as recently used for eviction
+        with contextlib.suppress(OSError):
+            os.utime(entry_path)
+        return True, data
+
+    def _write(self, entry_path: Path, data: object) -> None:
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            # pickle before touching the disk, results that can't be pickled aren't cached
+            payload = zlib.compress(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_bytes(payload)
+            tmp_path.replace(entry_path)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError, RecursionError) as e:
+            # caching is only an optimization, don't fail the import over it
+            QgsMessageLog.logMessage(f"Failed to write parse cache entry: {e!r}")
+            with contextlib.suppress(OSError):
+                tmp_path.unlink()
+            return
+        self.evict()
+
+    def get_or_parse(self, kind: str, path: Path, parse: Callable[[], _T], *key_args: object) -> _T:
+        """Return the cached result of parsing path, or parse it and cache the result.
+
+        key_args should hold every argument besides the file that changes parse's output.
+        """  # noqa: DOC201
+        entry_path = self._entry_path(kind, path, key_args)
+        found, data = self._read(entry_path)
+        if found:
+            QgsMessageLog.logMessage(f"Parse cache hit for {kind} file {path.name}.")
+            return data  # type: ignore []
+
+        data = parse()
+        self._write(entry_path, data)
+        return data
+
+    def evict(self) -> None:
+        """Delete the least recently used entries until the cache is within its limits."""
+        entries = []
+        for entry_path in self.directory.glob(f"*{ENTRY_SUFFIX}"):
+            with contextlib.suppress(OSError):
+                stat = entry_path.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry_path))
+        entries.sort()
+
+        total_bytes = sum(size for _, size, _ in entries)
+        n_entries = len(entries)
+        for _, size, entry_path in entries:
+            if n_entries <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            with contextlib.suppress(OSError):
+                entry_path.unlink()
+            n_entries -= 1
+            total_bytes -= size
+
+    def clear(self) -> None:
+        """Delete all entries."""
+        for entry_path in self.directory.glob(f"*{ENTRY_SUFFIX}"):
+            with contextlib.suppress(OSError):
+                entry_path.unlink()
+
+
+_parse_cache: ParseCache | None = None
+
+
+def parse_cache() -> ParseCache:
+    """Return the shared parse cache."""  # noqa: DOC201
+    global _parse_cache  # noqa: PLW0603
+    if _parse_cache is None:
+        _parse_cache = ParseCache()
+    return _parse_cache
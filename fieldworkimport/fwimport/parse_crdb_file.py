@@ -0,0 +1,81 @@
+import sqlite3
+from collections.abc import Iterator
+from contextlib import closing
+from pathlib import Path
+from typing import NamedTuple, Optional, TypedDict
+
+CRDB_COLUMNS = ("P", "N", "E", "Z", "D")
+"""Columns of the Coordinates table used by the import."""
+CRDB_OPTIONAL_COLUMNS = ("LockStatus",)
+"""Columns only shown in the raw data section of the report, read if the CRDB has them."""
+
+
+class CRDBRow(NamedTuple):
+    """Row of the CRDB Coordinates table."""
+
+    P: str
+    """Point name."""
+    N: float
+    E: float
+    Z: float
+    D: str
+    """Description, code is everything before the /."""
+    LockStatus: Optional[int]
+
+
+class ParseCRDBResult(TypedDict):
+    """Result of reading the Coordinates table of a CRDB file."""
+
+    rows: list[CRDBRow]
+    """All rows, in table order."""
+    by_name: dict[str, CRDBRow]
+    """First row for each normalized point name."""
+
+
+def normalize_point_name(name: str) -> str:
+    """Normalize a point name for joining RW5 PointIDs against CRDB point names.
+
+    Matches how the CRDB used to be queried (`P like ?`), which is case insensitive.
+    """  # noqa: DOC201
+    return name.strip().upper()
+
+
+def _connect_read_only(path: Path) -> sqlite3.Connection:
+    # immutable tells sqlite the file won't change under us, so it skips locking and change detection.
+    uri = f"{path.resolve().as_uri()}?mode=ro&immutable=1"
+    return sqlite3.connect(uri, uri=True)
+
+
+def parse_crdb_file(path: Path) -> ParseCRDBResult:
+    """Read the Coordinates table of a CRDB file in one pass.
+
+    The file is opened read-only. Go through the parse cache so the import and the report share a single read.
+    """  # noqa: DOC201
+    with closing(_connect_read_only(path)) as connection:
+        table_columns = {row[1] for row in connection.execute("PRAGMA table_info(Coordinates)")}
+        selected_columns = [
+            *CRDB_COLUMNS,
+            *(column if column in table_columns else f"NULL AS {column}" for column in CRDB_OPTIONAL_COLUMNS),
+        ]
+        cursor = connection.execute(f"SELECT {', '.join(selected_columns)} FROM Coordinates")  # noqa: S608
+        rows = [CRDBRow(*row) for row in cursor]
+
+    by_name: dict[str, CRDBRow] = {}
+    for row in rows:
+        if row.P is None:
+            continue
+        by_name.setdefault(normalize_point_name(row.P), row)
+
+    return {
+        "rows": rows,
+        "by_name": by_name,
+    }
+
+
+def iter_crdb_coordinates(path: Path) -> Iterator[tuple[Optional[str], Optional[float], Optional[float], Optional[float]]]:
+    """Stream the point name, northing, easting and elevation of each row, without building the rows.
+
+    For when only the coordinates are needed, like the import fingerprint.
+    """  # noqa: DOC402
+    with closing(_connect_read_only(path)) as connection:
+        yield from connection.execute("SELECT P, N, E, Z FROM Coordinates")
@@ -2,7 +2,9 @@ from pathlib import Path
 from typing import Optional, TypedDict
 from xml.etree import ElementTree
 
-from qgis.core import QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsPoint, QgsProject
+from qgis.core import QgsPoint
+
+from fieldworkimport.transforms import LAT_LON_SRID, LOCAL_SRID, get_transform
 
 
 class ParseLOCResult(TypedDict):
@@ -56,9 +58,7 @@ def parse_loc_file(path: Path, geoid_seperation: Optional[float]) -> ParseLOCRes
     lat = float(point_1_record.findall("./value[@name='Lat']")[0].get("value", ""))
     lon = float(point_1_record.findall("./value[@name='Lon']")[0].get("value", ""))
     ellipsoid_elv = float(point_1_record.findall("./value[@name='Ellipsoid_Elv']")[0].get("value", ""))
-    srcCrs = QgsCoordinateReferenceSystem(4617)
-    dstCrs = QgsCoordinateReferenceSystem(2953)
-    transform = QgsCoordinateTransform(srcCrs, dstCrs, QgsProject.instance())
+    transform = get_transform(LAT_LON_SRID, LOCAL_SRID)
 
     point = QgsPoint(x=lon, y=lat, z=ellipsoid_elv)
     point.transform(transform)
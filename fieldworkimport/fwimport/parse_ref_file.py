@@ -1,6 +1,8 @@
 from pathlib import Path
 
-from qgis.core import QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsPoint, QgsProject
+from qgis.core import QgsPoint
+
+from fieldworkimport.transforms import LAT_LON_SRID, LOCAL_SRID, get_transform
 
 
 def parse_ref_file(path: Path) -> tuple[float, float, float]:
@@ -21,9 +23,7 @@ def parse_ref_file(path: Path) -> tuple[float, float, float]:
     y = float(lines[2].strip())
     z = float(lines[3].strip())
 
-    srcCrs = QgsCoordinateReferenceSystem(4617)
-    dstCrs = QgsCoordinateReferenceSystem(2953)
-    transform = QgsCoordinateTransform(srcCrs, dstCrs, QgsProject.instance())
+    transform = get_transform(LAT_LON_SRID, LOCAL_SRID)
 
     point = QgsPoint(x=y, y=x, z=z)
     point.transform(transform)
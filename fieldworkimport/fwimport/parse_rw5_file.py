@@ -0,0 +1,146 @@
+import datetime
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Optional, TypedDict
+
+try:
+    import rw5_to_csv  # noqa: F401
+except ImportError:
+    import os
+    import sys
+    this_dir = Path(os.path.realpath(__file__)).parent.parent
+    path = this_dir / "wheels" / "rw5_to_csv-0.1.0-py3-none-any.whl"
+    sys.path.append(str(path))
+
+from rw5_to_csv.machine_state import MachineState
+from rw5_to_csv.records.record import RW5CSVRow, get_standard_record_params_dict
+from rw5_to_csv.rw5_csv import SKIP_LINES_WITH_PREFIXES, RW5Prelude, _prelude_get_equipment, parse_command
+
+RW5_ENCODING = "iso8859-1"
+
+
+class ParseRW5Result(TypedDict):
+    """Result of parsing an RW5 file."""
+
+    prelude: RW5Prelude
+    """Fields from the JB and MO records."""
+    rows: list[RW5CSVRow]
+    """Parsed records, same as `rw5_to_csv.convert`. Empty if only the prelude was parsed."""
+
+
+def iter_command_blocks(lines: Iterable[str]) -> Iterator[list[str]]:
+    """Group lines into command blocks as they're read.
+
+    Streaming version of `rw5_to_csv.rw5_csv.group_lines_into_command_blocks`, see it for the rules.
+    """  # noqa: DOC402
+    skip_prefixes = tuple(SKIP_LINES_WITH_PREFIXES)
+    active_command: list[str] = []
+    for raw_line in lines:
+        line = raw_line.strip()
+        # skips lines with specific prefixes, act line they're not even there.
+        if line.startswith(skip_prefixes):
+            continue
+        # a non comment line finishes the active command and starts a new one
+        if active_command and not line.startswith("--"):
+            yield active_command
+            active_command = []
+        active_command.append(line)
+
+    if active_command:
+        yield active_command
+
+
+def _record_type(command_block: list[str]) -> str:
+    return command_block[0].split(",")[0]
+
+
+def _prelude_from_blocks(
+    jb_record: Optional[list[str]],
+    mo_record: Optional[list[str]],
+    command_blocks: list[list[str]],
+) -> RW5Prelude:
+    """Build the prelude like `rw5_to_csv.prelude`, from already grouped command blocks."""  # noqa: DOC201, DOC501
+    if jb_record is None:
+        msg = "JB record not found."
+        raise ValueError(msg)
+    if mo_record is None:
+        msg = "MO record not found."
+        raise ValueError(msg)
+
+    jb_line_params = get_standard_record_params_dict(jb_record[0])
+    date = jb_line_params["DT"]
+    time = jb_line_params["TM"]
+    # RW5 uses month-day-year
+    date_obj = datetime.datetime.strptime(date, "%m-%d-%Y").date()  # noqa: DTZ007
+    time_obj = datetime.datetime.strptime(time, "%H:%M:%S").time()  # noqa: DTZ007
+
+    user_defined = None
+    antenna_type = None
+    for line in mo_record:
+        if line.startswith("--User Defined:"):
+            user_defined = line.removeprefix("--User Defined:").strip()
+        if line.startswith("--Antenna Type:"):
+            antenna_type = line.removeprefix("--Antenna Type:").strip()
+
+    return RW5Prelude(
+        JobName=jb_line_params["NM"],
+        Date=date,
+        Time=time,
+        ISODateTime=datetime.datetime.combine(date_obj, time_obj).isoformat(),
+        UserDefined=user_defined,
+        Equipment=_prelude_get_equipment(command_blocks),
+        AntennaType=antenna_type,
+    )
+
+
+def parse_rw5_file(
+    path: Path,
+    tzinfo: Optional[datetime.tzinfo] = None,
+    *,
+    prelude_only: bool = False,
+) -> ParseRW5Result:
+    """Parse the prelude and records of an RW5 file in a single pass.
+
+    Replaces calling `rw5_to_csv.prelude` and `rw5_to_csv.convert` separately, which both read and group
+    the whole file.
+
+    If prelude_only is set, reading stops as soon as the JB and MO records have been read and no rows are returned.
+    The equipment string then only includes equipment listed up to the MO record.
+    """  # noqa: DOC201
+    machine_state = MachineState(
+        {
+            "ProcessedCommandBlocks": [],
+            "HI": None,
+            "HR": None,
+            "InstrumentType": "",
+            "tzinfo": tzinfo,
+        },
+    )
+    command_blocks = machine_state["ProcessedCommandBlocks"]
+    rows: list[RW5CSVRow] = []
+    jb_record: Optional[list[str]] = None
+    mo_record: Optional[list[str]] = None
+
+    with path.open("r", encoding=RW5_ENCODING) as input_file:
+        for command_block in iter_command_blocks(input_file):
+            record_type = _record_type(command_block)
+            if jb_record is None and record_type == "JB":
+                jb_record = command_block
+            if mo_record is None and record_type == "MO":
+                mo_record = command_block
+
+            if prelude_only:
+                command_blocks.append(command_block)
+                if jb_record is not None and mo_record is not None:
+                    break
+                continue
+
+            parsed_command = parse_command(command_block, machine_state)
+            command_blocks.append(command_block)
+            if parsed_command:
+                rows.append(parsed_command)
+
+    return {
+        "prelude": _prelude_from_blocks(jb_record, mo_record, command_blocks),
+        "rows": rows,
+    }
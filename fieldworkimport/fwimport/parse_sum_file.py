@@ -1,7 +1,9 @@
 from pathlib import Path
 from typing import TypedDict
 
-from qgis.core import QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsPoint, QgsProject
+from qgis.core import QgsPoint
+
+from fieldworkimport.transforms import LAT_LON_SRID, LOCAL_SRID, get_transform
 
 
 class ParseSUMResult(TypedDict):
@@ -26,9 +28,9 @@ def dms_dd(degrees: float, minutes: float, seconds: float):
     return decimal
 
 
-SUM_FILE_LAT_LON_SRID = 4617
+SUM_FILE_LAT_LON_SRID = LAT_LON_SRID
 """SUM file uses NAD83 for lat/lng (as opposed to the global 4326)"""
-SUM_FILE_LOCAL_SRID = 2953
+SUM_FILE_LOCAL_SRID = LOCAL_SRID
 
 
 def parse_sum_file(path: Path) -> ParseSUMResult:
@@ -82,9 +84,7 @@ def parse_sum_file(path: Path) -> ParseSUMResult:
     ght_line_parts = [p.strip() for p in ght_line.split()]
     geoid_seperation = float(ght_line_parts[1])
 
-    srcCrs = QgsCoordinateReferenceSystem(SUM_FILE_LAT_LON_SRID)
-    dstCrs = QgsCoordinateReferenceSystem(SUM_FILE_LOCAL_SRID)
-    transform = QgsCoordinateTransform(srcCrs, dstCrs, QgsProject.instance())
+    transform = get_transform(SUM_FILE_LAT_LON_SRID, SUM_FILE_LOCAL_SRID)
 
     point = QgsPoint(x=lon, y=lat)
     point.transform(transform)
@@ -1,19 +1,19 @@
 
 import datetime
-import sqlite3
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable, NamedTuple, Optional
 from uuid import uuid4
 
+import numpy as np
 import pytz
 from PyQt5.QtCore import QDateTime
 from qgis.core import (
-    QgsCoordinateReferenceSystem,
-    QgsCoordinateTransform,
+    Qgis,
+    QgsExpression,
     QgsFeature,
+    QgsFeatureRequest,
     QgsMessageLog,
-    QgsPoint,
-    QgsProject,
+    QgsSettings,
     QgsVectorLayer,
     QgsVectorLayerUtils,
 )
@@ -22,45 +22,145 @@ from qgis.PyQt.QtWidgets import QMessageBox
 from qgis.utils import iface as _iface
 
 from fieldworkimport.exceptions import AbortError
-from fieldworkimport.fwimport.parse_loc_file import parse_loc_file
+from fieldworkimport.fwimport.fingerprint import (
+    CRDB_FINGERPRINT_FIELD,
+    RW5_FINGERPRINT_FIELD,
+    ImportFingerprint,
+    crdb_fingerprint,
+    find_fingerprint_matches,
+    has_fingerprint_fields,
+    rw5_fingerprint,
+)
+from fieldworkimport.fwimport.parse_cache import parse_cache
+from fieldworkimport.fwimport.parse_crdb_file import CRDBRow, ParseCRDBResult, normalize_point_name, parse_crdb_file
+from fieldworkimport.fwimport.parse_loc_file import ParseLOCResult, parse_loc_file
 from fieldworkimport.fwimport.parse_ref_file import parse_ref_file
-from fieldworkimport.fwimport.parse_sum_file import parse_sum_file
-from fieldworkimport.helpers import assert_true, timed
+from fieldworkimport.fwimport.parse_rw5_file import ParseRW5Result, parse_rw5_file
+from fieldworkimport.fwimport.parse_sum_file import ParseSUMResult, parse_sum_file
+from fieldworkimport.helpers import DEFAULT_INSERT_CHUNK_SIZE, add_features_in_chunks, assert_true, settings_key, timed
+from fieldworkimport.schema import FieldworkSchema, FieldworkShotSchema
+from fieldworkimport.transforms import LAT_LON_SRID, LOCAL_SRID, get_transform, point_geometries, transform_arrays
 
 if TYPE_CHECKING:
+    from rw5_to_csv.records.record import RW5CSVRow
+    from rw5_to_csv.rw5_csv import RW5Prelude
+
     from fieldworkimport.fwimport.import_process import FieldworkImportLayers
     from fieldworkimport.plugin import PluginInput
 
-try:
-    import rw5_to_csv
-except ImportError:
-    import os
-    import sys
-    this_dir = Path(os.path.realpath(__file__)).parent.parent
-    path = this_dir / "wheels" / "rw5_to_csv-0.1.0-py3-none-any.whl"
-    sys.path.append(str(path))
-    import rw5_to_csv
-
 iface: QgisInterface = _iface  # type: ignore
 
+IMPORT_TIMEZONE = "America/Halifax"
+"""Timezone of the RW5 timestamps."""
+
+DuplicateImportCheck = Callable[[QgsVectorLayer, str, ImportFingerprint], bool]
+"""Called with the fieldwork layer, the job name and the import fingerprint. Returns True to abort the import."""
+
+
+class CreateInputs(NamedTuple):
+    """Parsed input files needed to create the fieldwork and its shots."""
+
+    rw5: ParseRW5Result
+    crdb: ParseCRDBResult
+    sum: Optional[ParseSUMResult]
+    loc: Optional[ParseLOCResult]
+    ref: Optional[tuple[float, float, float]]
+
+
+def import_fingerprint(plugin_input: "PluginInput") -> ImportFingerprint:
+    """Fingerprint the RW5 and CRDB files, without parsing either."""  # noqa: DOC201
+    return ImportFingerprint(
+        rw5=rw5_fingerprint(Path(plugin_input.rw5_path)),
+        crdb=crdb_fingerprint(Path(plugin_input.crdb_path)),
+    )
+
+
+def parse_check_inputs(plugin_input: "PluginInput") -> "RW5Prelude":
+    """Parse what the duplicate import check needs besides the fingerprint, the RW5 prelude."""  # noqa: DOC201
+    rw5_path = Path(plugin_input.rw5_path)
+    return parse_cache().get_or_parse(
+        "rw5_prelude", rw5_path, lambda: parse_rw5_file(rw5_path, prelude_only=True)["prelude"],
+    )
+
+
+def parse_create_inputs(plugin_input: "PluginInput") -> CreateInputs:
+    """Parse the RW5 records, the CRDB and the optional SUM, LOC and REF files."""  # noqa: DOC201
+    cache = parse_cache()
+    sum_data = None
+    loc_data = None
+    ref_data = None
+    if plugin_input.sum_path:
+        sum_path = Path(plugin_input.sum_path)
+        sum_data = cache.get_or_parse("sum", sum_path, lambda: parse_sum_file(sum_path))
+    if plugin_input.loc_path:
+        loc_path = Path(plugin_input.loc_path)
+        geoid_seperation = sum_data["geoid_seperation"] if sum_data else None
+        loc_data = cache.get_or_parse(
+            "loc", loc_path, lambda: parse_loc_file(loc_path, geoid_seperation=geoid_seperation), geoid_seperation,
+        )
+    if plugin_input.ref_path:
+        ref_path = Path(plugin_input.ref_path)
+        ref_data = cache.get_or_parse("ref", ref_path, lambda: parse_ref_file(ref_path))
 
-def warn_against_duplicate_imports(fieldwork_layer: QgsVectorLayer, fieldwork_name: str) -> bool:
-    """Check if another fieldwork with this name already exists.
+    rw5_path = Path(plugin_input.rw5_path)
+    timezone = pytz.timezone(IMPORT_TIMEZONE)
+    rw5_data = cache.get_or_parse("rw5", rw5_path, lambda: parse_rw5_file(rw5_path, tzinfo=timezone), IMPORT_TIMEZONE)
+    crdb_path = Path(plugin_input.crdb_path)
+    crdb_data = cache.get_or_parse("crdb", crdb_path, lambda: parse_crdb_file(crdb_path))
+    return CreateInputs(rw5=rw5_data, crdb=crdb_data, sum=sum_data, loc=loc_data, ref=ref_data)
+
+
+def find_duplicate_import_reasons(
+    fieldwork_layer: QgsVectorLayer,
+    fieldwork_name: str,
+    fingerprint: ImportFingerprint,
+) -> list[str]:
+    """Check if another fieldwork with this name, or with the same input data, already exists.
+
+    Returns a sentence for each reason the import looks like a duplicate, empty if it doesn't.
+    """  # noqa: DOC201
+    # simple filter so the provider can answer it with the table's index, and stop at the first match
+    request = (
+        QgsFeatureRequest()
+        .setFilterExpression(f'"name" = {QgsExpression.quotedValue(fieldwork_name)}')
+        .setFlags(Qgis.FeatureRequestFlag.NoGeometry)
+        .setNoAttributes()
+        .setLimit(1)
+    )
+    has_match = next(fieldwork_layer.getFeatures(request), None) is not None
+    fingerprint_matches = find_fingerprint_matches(fieldwork_layer, fingerprint)
+
+    reasons = []
+    if has_match:
+        reasons.append(f"Another fieldwork with the name '{fieldwork_name}' (found in RW5 file) has already been imported.")
+    exact_names = sorted({m.fieldwork_name for m in fingerprint_matches if m.exact})
+    near_names = sorted({m.fieldwork_name for m in fingerprint_matches if not m.exact})
+    if exact_names:
+        reasons.append(f"The same RW5 and CRDB data was already imported as: {', '.join(exact_names)}.")
+    if near_names:
+        reasons.append(f"The same RW5 records or CRDB coordinates were already imported as: {', '.join(near_names)}.")
+    return reasons
+
+
+def warn_against_duplicate_imports(
+    fieldwork_layer: QgsVectorLayer,
+    fieldwork_name: str,
+    fingerprint: ImportFingerprint,
+) -> bool:
+    """Check if another fieldwork with this name, or with the same input data, already exists.
 
     If so, warn against importing.
     Returns False if continue, True if user wants to abort.
     """  # noqa: DOC201
-    fieldwork_layer.selectByExpression(f"\"name\" = '{fieldwork_name}'")
-    num_matches = fieldwork_layer.selectedFeatureCount()
-    fieldwork_layer.removeSelection()
-    if num_matches > 0:
+    reasons = find_duplicate_import_reasons(fieldwork_layer, fieldwork_name, fingerprint)
+    if reasons:
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Warning)
         msg.setText("Possible duplicate import.")
         msg.setStandardButtons(QMessageBox.Ok)
         msg.addButton(QMessageBox.Cancel)
         msg.setDefaultButton(QMessageBox.Cancel)
-        msg.setInformativeText(f"Another fieldwork with the name '{fieldwork_name}' (found in RW5 file) has already been imported. Are you sure you want to continue?")
+        msg.setInformativeText(f"{' '.join(reasons)} Are you sure you want to continue?")
         msg.setWindowTitle("Duplictate import detected.")
         return_code = msg.exec()
         if return_code == QMessageBox.Cancel:
@@ -68,194 +168,177 @@ def warn_against_duplicate_imports(fieldwork_layer: QgsVectorLayer, fieldwork_na
     return False
 
 
+def index_last_versions(rw5_rows: "list[RW5CSVRow]") -> dict[str, tuple[int, int]]:
+    """Map each PointID to the index of its last row and the number of rows sharing that PointID.
+
+    RW5 files keep every version of a re-shot point, the last one being the one that counts.
+    Built in a single pass so that large files stay linear.
+    """  # noqa: DOC201
+    index: dict[str, tuple[int, int]] = {}
+    for idx, rw5_row in enumerate(rw5_rows):
+        point_id = rw5_row["PointID"]
+        _, n_versions = index.get(point_id, (idx, 0))
+        index[point_id] = (idx, n_versions + 1)
+    return index
+
+
 def create_fieldwork(
     layers: "FieldworkImportLayers",
     plugin_input: "PluginInput",
+    check_duplicate: DuplicateImportCheck = warn_against_duplicate_imports,
 ) -> QgsFeature:
     QgsMessageLog.logMessage(
         "Create fieldwork started.",
     )
+    with timed("check for duplicate import"):
+        # the fingerprints and the prelude are enough here, so a canceled duplicate import doesn't pay for
+        # parsing the RW5 records or the CRDB. Fingerprinting reads the RW5 once, which also hashes it for the cache.
+        fingerprint = import_fingerprint(plugin_input)
+        rw5_prelude = parse_check_inputs(plugin_input)
+        if check_duplicate(layers.fieldwork_layer, rw5_prelude["JobName"], fingerprint):
+            # user chose to abort due to duplicate
+            msg = "Aborting due to duplicate import."
+            raise AbortError(msg)
+
     with timed("setup create"):
-        timezone = pytz.timezone("America/Halifax")
-        loc_data = None
-        sum_data = None
-        ref_data = None
+        timezone = pytz.timezone(IMPORT_TIMEZONE)
         field_run_id = None
-        if plugin_input.sum_path:
-            sum_data = parse_sum_file(Path(plugin_input.sum_path))
-        if plugin_input.loc_path:
-            loc_data = parse_loc_file(Path(plugin_input.loc_path), geoid_seperation=sum_data["geoid_seperation"] if sum_data else None)
-        if plugin_input.ref_path:
-            ref_data = parse_ref_file(Path(plugin_input.ref_path))
         if plugin_input.fieldrun_feature:
             field_run_id = plugin_input.fieldrun_feature["id"]
 
-        rw5_rows = rw5_to_csv.convert(rw5_path=Path(plugin_input.rw5_path), output_path=None, tzinfo=timezone)
-        rw5_prelude = rw5_to_csv.prelude(rw5_path=Path(plugin_input.rw5_path))
+        rw5_data, crdb_data, sum_data, loc_data, ref_data = parse_create_inputs(plugin_input)
+        rw5_rows = rw5_data["rows"]
+        rw5_prelude = rw5_data["prelude"]
 
-        # check if this has already been imported
-        if warn_against_duplicate_imports(layers.fieldwork_layer, rw5_prelude["JobName"]):
-            # user chose to abort due to duplicate
-            msg = "Aborting due to duplicate import."
-            raise AbortError(msg)
+        crdb_rows_by_name = crdb_data["by_name"]
 
-        crdb_connection = sqlite3.connect(plugin_input.crdb_path)
-        crdb_connection.row_factory = sqlite3.Row
-        cursor = crdb_connection.cursor()
-
-        fieldwork_layer_fields = layers.fieldwork_layer.fields()
-        fieldwork_layer_id_index = fieldwork_layer_fields.indexFromName("id")
-        fieldwork_layer_field_run_id_index = fieldwork_layer_fields.indexFromName("field_run_id")
-        fieldwork_layer_name_index = fieldwork_layer_fields.indexFromName("name")
-        fieldwork_layer_note_index = fieldwork_layer_fields.indexFromName("note")
-        RW5_datetime_index = fieldwork_layer_fields.indexFromName("RW5_datetime")  # noqa: N806
-        LOC_measured_easting_index = fieldwork_layer_fields.indexFromName("LOC_measured_easting")  # noqa: N806
-        LOC_measured_northing_index = fieldwork_layer_fields.indexFromName("LOC_measured_northing")  # noqa: N806
-        LOC_measured_elevation_index = fieldwork_layer_fields.indexFromName("LOC_measured_elevation")  # noqa: N806
-        LOC_grid_easting_index = fieldwork_layer_fields.indexFromName("LOC_grid_easting")  # noqa: N806
-        LOC_grid_northing_index = fieldwork_layer_fields.indexFromName("LOC_grid_northing")  # noqa: N806
-        LOC_grid_elevation_index = fieldwork_layer_fields.indexFromName("LOC_grid_elevation")  # noqa: N806
-        LOC_description_index = fieldwork_layer_fields.indexFromName("LOC_description")  # noqa: N806
-        REF_easting_index = fieldwork_layer_fields.indexFromName("REF_easting")  # noqa: N806
-        REF_northing_index = fieldwork_layer_fields.indexFromName("REF_northing")  # noqa: N806
-        REF_elevation_index = fieldwork_layer_fields.indexFromName("REF_elevation")  # noqa: N806
-        SUM_easting_index = fieldwork_layer_fields.indexFromName("SUM_easting")  # noqa: N806
-        SUM_northing_index = fieldwork_layer_fields.indexFromName("SUM_northing")  # noqa: N806
-        SUM_elevation_index = fieldwork_layer_fields.indexFromName("SUM_elevation")  # noqa: N806
-        SUM_orthometric_system_index = fieldwork_layer_fields.indexFromName("SUM_orthometric_system")  # noqa: N806
-        SUM_orthometric_model_index = fieldwork_layer_fields.indexFromName("SUM_orthometric_model")  # noqa: N806
-        SUM_geoid_seperation_index = fieldwork_layer_fields.indexFromName("SUM_geoid_seperation")  # noqa: N806
-        equipment_string_index = fieldwork_layer_fields.indexFromName("equipment_string")
+        fieldwork_schema = FieldworkSchema.of(layers.fieldwork_layer)
+        shot_schema = FieldworkShotSchema.of(layers.fieldworkshot_layer)
         fieldwork_id = str(uuid4())
+        # CRDB coordinates are local, shot geometries are lat/lon
+        transform = get_transform(LOCAL_SRID, LAT_LON_SRID)
 
     with timed("create fieldwork"):
         layers.fieldwork_layer.startEditing()
         new_fieldwork = QgsVectorLayerUtils.createFeature(layers.fieldwork_layer)
-        new_fieldwork[fieldwork_layer_field_run_id_index] = field_run_id
-        new_fieldwork[fieldwork_layer_id_index] = fieldwork_id
-        new_fieldwork[fieldwork_layer_name_index] = rw5_prelude["JobName"]
-        new_fieldwork[fieldwork_layer_note_index] = ""
+        fieldwork_schema.field_run_id.set(new_fieldwork, field_run_id)
+        fieldwork_schema.id.set(new_fieldwork, fieldwork_id)
+        fieldwork_schema.name.set(new_fieldwork, rw5_prelude["JobName"])
+        fieldwork_schema.note.set(new_fieldwork, "")
         if rw5_prelude.get("ISODateTime"):
             dt = datetime.datetime.fromisoformat(rw5_prelude["ISODateTime"])
             dt = datetime.datetime.combine(dt.date(), dt.time(), timezone)
-            new_fieldwork[RW5_datetime_index] = QDateTime(dt)
-        new_fieldwork[LOC_measured_easting_index] = loc_data["measured_point"][0] if loc_data else None
-        new_fieldwork[LOC_measured_northing_index] = loc_data["measured_point"][1] if loc_data else None
-        new_fieldwork[LOC_measured_elevation_index] = loc_data["measured_point"][2] if loc_data else None
-        new_fieldwork[LOC_grid_easting_index] = loc_data["grid_point"][0] if loc_data and loc_data["grid_point"] is not None else None  # noqa: E501
-        new_fieldwork[LOC_grid_northing_index] = loc_data["grid_point"][1] if loc_data and loc_data["grid_point"] is not None else None  # noqa: E501
-        new_fieldwork[LOC_grid_elevation_index] = loc_data["grid_point"][2] if loc_data and loc_data["grid_point"] is not None else None  # noqa: E501
-        new_fieldwork[LOC_description_index] = loc_data["description"] if loc_data else ""
-        new_fieldwork[REF_easting_index] = ref_data[0] if ref_data else None
-        new_fieldwork[REF_northing_index] = ref_data[1] if ref_data else None
-        new_fieldwork[REF_elevation_index] = ref_data[2] if ref_data else None
-        new_fieldwork[SUM_easting_index] = sum_data["point"][0] if sum_data else None
-        new_fieldwork[SUM_northing_index] = sum_data["point"][1] if sum_data else None
-        new_fieldwork[SUM_elevation_index] = sum_data["point"][2] if sum_data else None
-        new_fieldwork[SUM_geoid_seperation_index] = sum_data["geoid_seperation"] if sum_data else None
-        new_fieldwork[SUM_orthometric_model_index] = sum_data["orthometric_model"] if sum_data else ""
-        new_fieldwork[SUM_orthometric_system_index] = sum_data["orthometric_system"] if sum_data else ""
-        new_fieldwork[equipment_string_index] = rw5_prelude["Equipment"] or ""
+            fieldwork_schema.RW5_datetime.set(new_fieldwork, QDateTime(dt))
+        fieldwork_schema.LOC_measured_easting.set(new_fieldwork, loc_data["measured_point"][0] if loc_data else None)
+        fieldwork_schema.LOC_measured_northing.set(new_fieldwork, loc_data["measured_point"][1] if loc_data else None)
+        fieldwork_schema.LOC_measured_elevation.set(new_fieldwork, loc_data["measured_point"][2] if loc_data else None)
+        fieldwork_schema.LOC_grid_easting.set(new_fieldwork, loc_data["grid_point"][0] if loc_data and loc_data["grid_point"] is not None else None)  # noqa: E501
+        fieldwork_schema.LOC_grid_northing.set(new_fieldwork, loc_data["grid_point"][1] if loc_data and loc_data["grid_point"] is not None else None)  # noqa: E501
+        fieldwork_schema.LOC_grid_elevation.set(new_fieldwork, loc_data["grid_point"][2] if loc_data and loc_data["grid_point"] is not None else None)  # noqa: E501
+        fieldwork_schema.LOC_description.set(new_fieldwork, loc_data["description"] if loc_data else "")
+        fieldwork_schema.REF_easting.set(new_fieldwork, ref_data[0] if ref_data else None)
+        fieldwork_schema.REF_northing.set(new_fieldwork, ref_data[1] if ref_data else None)
+        fieldwork_schema.REF_elevation.set(new_fieldwork, ref_data[2] if ref_data else None)
+        fieldwork_schema.SUM_easting.set(new_fieldwork, sum_data["point"][0] if sum_data else None)
+        fieldwork_schema.SUM_northing.set(new_fieldwork, sum_data["point"][1] if sum_data else None)
+        fieldwork_schema.SUM_elevation.set(new_fieldwork, sum_data["point"][2] if sum_data else None)
+        fieldwork_schema.SUM_geoid_seperation.set(new_fieldwork, sum_data["geoid_seperation"] if sum_data else None)
+        fieldwork_schema.SUM_orthometric_model.set(new_fieldwork, sum_data["orthometric_model"] if sum_data else "")
+        fieldwork_schema.SUM_orthometric_system.set(new_fieldwork, sum_data["orthometric_system"] if sum_data else "")
+        fieldwork_schema.equipment_string.set(new_fieldwork, rw5_prelude["Equipment"] or "")
+        if has_fingerprint_fields(layers.fieldwork_layer):
+            new_fieldwork[RW5_FINGERPRINT_FIELD] = fingerprint.rw5
+            new_fieldwork[CRDB_FINGERPRINT_FIELD] = fingerprint.crdb
+        else:
+            QgsMessageLog.logMessage(
+                "Fieldwork layer has no fingerprint fields, not storing import fingerprint. "
+                "Apply docs/migrations/0001_fieldwork_fingerprints.sql to add them.",
+            )
 
         assert_true(layers.fieldwork_layer.addFeature(new_fieldwork), "Failed to add new fieldwork.")
 
-        fieldworkshot_layer_fields = layers.fieldworkshot_layer.fields()
-        fieldworkshot_layer_id_index = fieldworkshot_layer_fields.indexFromName("id")
-        fieldworkshot_layer_fieldwork_id_index = fieldworkshot_layer_fields.indexFromName("fieldwork_id")
-        fieldworkshot_layer_name_index = fieldworkshot_layer_fields.indexFromName("name")
-        fieldworkshot_layer_datetime_index = fieldworkshot_layer_fields.indexFromName("datetime")
-        fieldworkshot_layer_description_index = fieldworkshot_layer_fields.indexFromName("description")
-        fieldworkshot_layer_full_code_index = fieldworkshot_layer_fields.indexFromName("full_code")
-        fieldworkshot_layer_code_index = fieldworkshot_layer_fields.indexFromName("code")
-        fieldworkshot_layer_original_code_index = fieldworkshot_layer_fields.indexFromName("original_code")
-        northing_index = fieldworkshot_layer_fields.indexFromName("northing")
-        easting_index = fieldworkshot_layer_fields.indexFromName("easting")
-        elevation_index = fieldworkshot_layer_fields.indexFromName("elevation")
-        number_of_satellites_index = fieldworkshot_layer_fields.indexFromName("number_of_satellites")
-        age_of_corrections_index = fieldworkshot_layer_fields.indexFromName("age_of_corrections")
-        status_index = fieldworkshot_layer_fields.indexFromName("status")
-        HRMS_index = fieldworkshot_layer_fields.indexFromName("HRMS")  # noqa: N806
-        VRMS_index = fieldworkshot_layer_fields.indexFromName("VRMS")  # noqa: N806
-        PDOP_index = fieldworkshot_layer_fields.indexFromName("PDOP")  # noqa: N806
-        HDOP_index = fieldworkshot_layer_fields.indexFromName("HDOP")  # noqa: N806
-        VDOP_index = fieldworkshot_layer_fields.indexFromName("VDOP")  # noqa: N806
-        TDOP_index = fieldworkshot_layer_fields.indexFromName("TDOP")  # noqa: N806
-        GDOP_index = fieldworkshot_layer_fields.indexFromName("GDOP")  # noqa: N806
-        rod_height_index = fieldworkshot_layer_fields.indexFromName("rod_height")
-        instrument_height_index = fieldworkshot_layer_fields.indexFromName("instrument_height")
-        instrument_type_index = fieldworkshot_layer_fields.indexFromName("instrument_type")
-        was_overwritten_index = fieldworkshot_layer_fields.indexFromName("was_overwritten_flag")
-
-    layers.fieldworkshot_layer.startEditing()
+    with timed("index rw5 rows"):
+        last_version_by_point_id = index_last_versions(rw5_rows)
 
+    # pair the latest version of each rw5 row with its crdb row
+    shot_rows: "list[tuple[RW5CSVRow, CRDBRow, bool]]" = []
     for idx, rw5_row in enumerate(rw5_rows):
         # make sure we're only using the last rw5 row for this point.
-        last_version_of_point_row_idx = idx
-        multiple_versions_of_point_row = False
-        for curr_idx, curr_row in enumerate(rw5_rows):
-            if curr_row["PointID"] == rw5_row["PointID"]:
-                if curr_idx > idx:
-                    last_version_of_point_row_idx = curr_idx
-                if curr_idx != idx:
-                    multiple_versions_of_point_row = True
+        last_version_of_point_row_idx, n_versions_of_point_row = last_version_by_point_id[rw5_row["PointID"]]
         # skip row if there's another newer version later
         if idx < last_version_of_point_row_idx:
             continue
         # we now know we're dealing with the latets version of the rw5 row
         # make note if there were multiple versions
-        was_overwritten_flag = multiple_versions_of_point_row
+        was_overwritten_flag = n_versions_of_point_row > 1
 
-        crdb_query = cursor.execute("SELECT * FROM Coordinates WHERE P like ?", (rw5_row["PointID"].strip(),))
-        crdb_row: sqlite3.Row = crdb_query.fetchone()
+        crdb_row = crdb_rows_by_name.get(normalize_point_name(rw5_row["PointID"]))
 
         # skip if no crdbrow
         if not crdb_row:
             continue
 
+        shot_rows.append((rw5_row, crdb_row, was_overwritten_flag))
+
+    with timed("reproject shots"):
+        lon, lat, _ = transform_arrays(
+            transform,
+            np.fromiter((crdb_row.E for _, crdb_row, _ in shot_rows), dtype=np.float64, count=len(shot_rows)),
+            np.fromiter((crdb_row.N for _, crdb_row, _ in shot_rows), dtype=np.float64, count=len(shot_rows)),
+        )
+        geoms = point_geometries(lon, lat)
+
+    new_fieldwork_shots: list[QgsFeature] = []
+    for (rw5_row, crdb_row, was_overwritten_flag), geom in zip(shot_rows, geoms):
         # code is everything before the / in the description
-        srcCrs = QgsCoordinateReferenceSystem(2953)
-        dstCrs = QgsCoordinateReferenceSystem(4617)
-        transform = QgsCoordinateTransform(srcCrs, dstCrs, QgsProject.instance())
-        geom = QgsPoint(x=crdb_row["E"], y=crdb_row["N"])
-        geom.transform(transform)
-        full_code = crdb_row["D"].split("/")[0]
+        full_code = crdb_row.D.split("/")[0]
         point_code = full_code.split(" ")[0]
 
         new_fieldwork_shot = QgsVectorLayerUtils.createFeature(layers.fieldworkshot_layer)
-        new_fieldwork_shot[fieldworkshot_layer_id_index] = str(uuid4())
-        new_fieldwork_shot[fieldworkshot_layer_fieldwork_id_index] = fieldwork_id
+        shot_schema.id.set(new_fieldwork_shot, str(uuid4()))
+        shot_schema.fieldwork_id.set(new_fieldwork_shot, fieldwork_id)
         if rw5_row["DateTime"]:
-            new_fieldwork_shot[fieldworkshot_layer_datetime_index] = QDateTime(rw5_row["DateTime"])
-        new_fieldwork_shot[fieldworkshot_layer_name_index] = crdb_row["P"]
-        new_fieldwork_shot[fieldworkshot_layer_description_index] = crdb_row["D"]
-        new_fieldwork_shot[fieldworkshot_layer_original_code_index] = full_code
-        new_fieldwork_shot[fieldworkshot_layer_full_code_index] = full_code
-        new_fieldwork_shot[fieldworkshot_layer_code_index] = point_code
-        new_fieldwork_shot[northing_index] = crdb_row["N"]
-        new_fieldwork_shot[easting_index] = crdb_row["E"]
-        new_fieldwork_shot[elevation_index] = crdb_row["Z"]
-        new_fieldwork_shot[number_of_satellites_index] = rw5_row["NumSatellites"]
-        new_fieldwork_shot[age_of_corrections_index] = rw5_row["Age"]
-        new_fieldwork_shot[status_index] = rw5_row["Status"] or ""
-        new_fieldwork_shot[HRMS_index] = rw5_row["HRMS"]
-        new_fieldwork_shot[VRMS_index] = rw5_row["VRMS"]
-        new_fieldwork_shot[PDOP_index] = rw5_row["PDOP"]
-        new_fieldwork_shot[HDOP_index] = rw5_row["HDOP"]
-        new_fieldwork_shot[VDOP_index] = rw5_row["VDOP"]
-        new_fieldwork_shot[TDOP_index] = rw5_row["TDOP"]
-        new_fieldwork_shot[GDOP_index] = rw5_row["GDOP"]
-        new_fieldwork_shot[rod_height_index] = rw5_row["RodHeight"]
-        new_fieldwork_shot[instrument_height_index] = rw5_row["InstrumentHeight"]
-        new_fieldwork_shot[instrument_type_index] = rw5_row["InstrumentType"]
-        new_fieldwork_shot[was_overwritten_index] = was_overwritten_flag
+            shot_schema.datetime.set(new_fieldwork_shot, QDateTime(rw5_row["DateTime"]))
+        shot_schema.name.set(new_fieldwork_shot, crdb_row.P)
+        shot_schema.description.set(new_fieldwork_shot, crdb_row.D)
+        shot_schema.original_code.set(new_fieldwork_shot, full_code)
+        shot_schema.full_code.set(new_fieldwork_shot, full_code)
+        shot_schema.code.set(new_fieldwork_shot, point_code)
+        shot_schema.northing.set(new_fieldwork_shot, crdb_row.N)
+        shot_schema.easting.set(new_fieldwork_shot, crdb_row.E)
+        shot_schema.elevation.set(new_fieldwork_shot, crdb_row.Z)
+        shot_schema.number_of_satellites.set(new_fieldwork_shot, rw5_row["NumSatellites"])
+        shot_schema.age_of_corrections.set(new_fieldwork_shot, rw5_row["Age"])
+        shot_schema.status.set(new_fieldwork_shot, rw5_row["Status"] or "")
+        shot_schema.HRMS.set(new_fieldwork_shot, rw5_row["HRMS"])
+        shot_schema.VRMS.set(new_fieldwork_shot, rw5_row["VRMS"])
+        shot_schema.PDOP.set(new_fieldwork_shot, rw5_row["PDOP"])
+        shot_schema.HDOP.set(new_fieldwork_shot, rw5_row["HDOP"])
+        shot_schema.VDOP.set(new_fieldwork_shot, rw5_row["VDOP"])
+        shot_schema.TDOP.set(new_fieldwork_shot, rw5_row["TDOP"])
+        shot_schema.GDOP.set(new_fieldwork_shot, rw5_row["GDOP"])
+        shot_schema.rod_height.set(new_fieldwork_shot, rw5_row["RodHeight"])
+        shot_schema.instrument_height.set(new_fieldwork_shot, rw5_row["InstrumentHeight"])
+        shot_schema.instrument_type.set(new_fieldwork_shot, rw5_row["InstrumentType"])
+        shot_schema.was_overwritten_flag.set(new_fieldwork_shot, was_overwritten_flag)
         new_fieldwork_shot.setGeometry(geom)
-        assert_true(layers.fieldworkshot_layer.addFeature(new_fieldwork_shot), "Failed to add new fieldwork shot.")
-
-    # zoom layer to new fieldwork points
-    iface.setActiveLayer(layers.fieldworkshot_layer)
-    layers.fieldworkshot_layer.selectByExpression(f'"fieldwork_id" = \'{fieldwork_id}\'')
-    map_canvas = iface.mapCanvas()
-    if map_canvas:
-        map_canvas.zoomToSelected(layers.fieldworkshot_layer)
+        new_fieldwork_shots.append(new_fieldwork_shot)
+
+    with timed("add fieldwork shots"):
+        layers.fieldworkshot_layer.startEditing()
+        add_features_in_chunks(
+            layers.fieldworkshot_layer,
+            new_fieldwork_shots,
+            "Failed to add new fieldwork shots.",
+            chunk_size=QgsSettings().value(settings_key("insert_chunk_size"), DEFAULT_INSERT_CHUNK_SIZE, int),
+        )
+
+    # zoom layer to new fieldwork points, there's no iface when running headless
+    if iface is not None:
+        iface.setActiveLayer(layers.fieldworkshot_layer)
+        layers.fieldworkshot_layer.selectByExpression(f'"fieldwork_id" = \'{fieldwork_id}\'')
+        map_canvas = iface.mapCanvas()
+        if map_canvas:
+            map_canvas.zoomToSelected(layers.fieldworkshot_layer)
 
     return new_fieldwork
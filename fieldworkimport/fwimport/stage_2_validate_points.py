@@ -1,133 +1,182 @@
-from collections.abc import Iterator
+from collections.abc import Sequence
+from typing import Callable, Optional
 
-from qgis.core import Qgis, QgsFeature, QgsFeatureRequest, QgsMessageLog, QgsSettings, QgsVectorLayer
+import numpy as np
+from qgis.core import QgsFeature, QgsMessageLog, QgsVectorLayer
 from qgis.PyQt import QtWidgets
 
-from fieldworkimport.common import validate_code, validate_point
+from fieldworkimport.common import ValidationConfig, codes_valid, shot_flag_columns, validation_config
 from fieldworkimport.exceptions import AbortError
-from fieldworkimport.helpers import assert_true, settings_key
+from fieldworkimport.fwimport.code_corrections import CodeCorrectionStore
+from fieldworkimport.helpers import timed
+from fieldworkimport.shot_table import FLAG_COLUMNS, ShotTable
 from fieldworkimport.ui.code_correction_dialog import CodeCorrectionDialog
 from fieldworkimport.ui.point_warning_item import PointWarningItem
 from fieldworkimport.ui.point_warnings_dialog import PointWarningsDialog
 
+WARNING_FLAG_COLUMNS = ("bad_hrms_flag", "bad_vrms_flag", "bad_fixed_status_flag")
+"""Flags shown as point warnings. Bad codes are dealt with by the code corrections instead."""
 
-def validate_points(
-    fieldworkshot_layer: QgsVectorLayer,
-    fieldwork_id: int,
-):
-    QgsMessageLog.logMessage(
-        "Validate points started.",
-    )
-    points: list[QgsFeature] = [
-        *fieldworkshot_layer.getFeatures(
-            QgsFeatureRequest()
-            .setFilterExpression(f"\"fieldwork_id\" = '{fieldwork_id}'")
-            .setFlags(Qgis.FeatureRequestFlag.NoGeometry),
-        ),  # type: ignore []
-    ]
-
-    fieldworkshot_layer.startEditing()
-    s = QgsSettings()
-    for point in points:
-        valid = validate_point(
-            point,
-            float(s.value(settings_key("hrms_tolerance"), 0)),
-            float(s.value(settings_key("vrms_tolerance"), 0)),
-            s.value(settings_key("valid_codes"), "").split(","),
-            s.value(settings_key("valid_special_chars"), "").split(","),
-            s.value(settings_key("parameterized_special_chars"), "").split(","),
-        )
-        if not valid:
-            # update invalid flags
-            assert_true(fieldworkshot_layer.updateFeature(point), "Failed to update validation flags on fieldwork shot.")
+CodeCorrectionPrompt = Callable[[str, Sequence[str], ValidationConfig], Optional[str]]
+"""Called with a description that has an invalid code, the closest valid descriptions and the validation settings.
 
+Returns the corrected description, or None to keep it.
+"""
+
+WarningReview = Callable[[QgsVectorLayer, list[QgsFeature], ValidationConfig], None]
+"""Called with the shots that have point warnings. Raises AbortError to stop the import."""
 
-def correct_codes(
-    fieldworkshot_layer: QgsVectorLayer,
-    fieldwork_id: int,
-):
-    QgsMessageLog.logMessage(
-        "Correct points started.",
-    )
-    fields = fieldworkshot_layer.fields()
-    code_index = fields.indexFromName("code")
-    full_code_index = fields.indexFromName("full_code")
-    description_index = fields.indexFromName("description")
-    points: list[QgsFeature] = [
-        *fieldworkshot_layer.getFeatures(
-            QgsFeatureRequest().setFilterExpression(f"\"fieldwork_id\" = '{fieldwork_id}'"),
-        ),  # type: ignore
-    ]
-
-    corrections = {
-        "__bad_description__": "__good_description__",
-    }
-
-    s = QgsSettings()
-    fieldworkshot_layer.startEditing()
-    for point in points:
-        full_code = point["full_code"]
-        description: str = point["description"]
-        full_code_valid = validate_code(
-            full_code,
-            s.value(settings_key("valid_codes"), "").split(","),
-            s.value(settings_key("valid_special_chars"), "").split(","),
-            s.value(settings_key("parameterized_special_chars"), "").split(","),
-        )
 
-        if not full_code_valid:
-            if description not in corrections:
-                # populate corrections
-                dialog = CodeCorrectionDialog(
-                    description,
-                    s.value(settings_key("valid_codes"), "").split(","),
-                    s.value(settings_key("valid_special_chars"), "").split(","),
-                    s.value(settings_key("parameterized_special_chars"), "").split(","),
-                )
-                dialog.exec_()
-                # either the exception was ignored or corrected, use the correction value
-                description_correction = dialog.description
-                if description_correction:
-                    corrections[description] = description_correction
-                else:
-                    corrections[description] = description
-            point[description_index] = corrections[description]
-            point[full_code_index] = corrections[description].split("/")[0]
-            point[code_index] = corrections[description].split("/")[0].split(" ")[0]
-            assert_true(fieldworkshot_layer.updateFeature(point), "Failed to update code on fieldwork shot.")
+def ask_code_correction(description: str, suggestions: Sequence[str], config: ValidationConfig) -> Optional[str]:
+    """Ask the user to correct a description with an invalid code, offering the suggestions."""  # noqa: DOC201
+    dialog = CodeCorrectionDialog(description, config, suggestions)
+    dialog.exec_()
+    # either the exception was ignored or corrected, use the correction value
+    return dialog.description or None
 
 
 def show_warnings(
-    fieldworkshot_layer: QgsVectorLayer,
-    fieldwork_id: int,
+    fieldworkshot_layer: QgsVectorLayer,  # noqa: ARG001
+    warning_points: list[QgsFeature],
+    config: ValidationConfig,
 ):
-    QgsMessageLog.logMessage(
-        "Show warnings started.",
-    )
-    points: Iterator[QgsFeature] = fieldworkshot_layer.getFeatures(
-        QgsFeatureRequest().setFilterExpression(f"\"fieldwork_id\" = '{fieldwork_id}'"),
-    )  # type: ignore
-
-    warning_widgets: list[QtWidgets.QWidget] = []
-    for point in points:
-        bad_hrms_flag = point["bad_hrms_flag"]
-        bad_vrms_flag = point["bad_vrms_flag"]
-        bad_fixed_status_flag = point["bad_fixed_status_flag"]
-        if bad_fixed_status_flag in {"true", True} or bad_hrms_flag in {"true", True} or bad_vrms_flag in {"true", True}:
-            warning_widgets.append(
-                PointWarningItem(point),
-            )
+    """Ask the user to accept the shots with point warnings."""  # noqa: DOC501
+    if not warning_points:
+        return
+
+    warning_widgets: list[QtWidgets.QWidget] = [PointWarningItem(point) for point in warning_points]
+    dialog = PointWarningsDialog(config.hrms_tolerance, config.vrms_tolerance)
+    for w in warning_widgets:
+        dialog.scrollAreaWidgetContents.layout().addWidget(w)
+    return_code = dialog.exec_()
+    if return_code == dialog.Rejected:
+        # abort process
+        msg = "Aborted due to point warnings."
+        raise AbortError(msg)
+
+
+def warning_rows(table: ShotTable) -> np.ndarray:
+    """Return the rows of shots with a bad HRMS, VRMS or fixed status flag."""  # noqa: DOC201
+    return np.flatnonzero(np.logical_or.reduce([table[name] for name in WARNING_FLAG_COLUMNS]))
+
+
+class PointValidationStage:
+    """Validates, corrects and reviews the shots of a fieldwork.
 
-    if len(warning_widgets) > 0:
-        s = QgsSettings()
-        dialog = PointWarningsDialog(
-            float(s.value(settings_key("hrms_tolerance"), "")),
-            float(s.value(settings_key("vrms_tolerance"), "")),
+    The shots are read once into a `ShotTable`, the flags and corrections are applied to it and written
+    back together, and only the shots with warnings are fetched as features for the review.
+    With a correction store, codes corrected in earlier imports are corrected without asking.
+    """
+
+    fieldworkshot_layer: QgsVectorLayer
+    fieldwork_id: str
+    config: ValidationConfig
+    ask_correction: CodeCorrectionPrompt
+    review_warnings: WarningReview
+    corrections: Optional[CodeCorrectionStore]
+
+    def __init__(  # noqa: D107
+        self,
+        fieldworkshot_layer: QgsVectorLayer,
+        fieldwork_id: str,
+        config: Optional[ValidationConfig] = None,
+        ask_correction: CodeCorrectionPrompt = ask_code_correction,
+        review_warnings: WarningReview = show_warnings,
+        corrections: Optional[CodeCorrectionStore] = None,
+    ) -> None:
+        self.fieldworkshot_layer = fieldworkshot_layer
+        self.fieldwork_id = fieldwork_id
+        self.config = config or validation_config()
+        self.ask_correction = ask_correction
+        self.review_warnings = review_warnings
+        self.corrections = corrections
+
+    def run(self) -> None:  # noqa: D102
+        QgsMessageLog.logMessage(
+            "PointValidationStage.run started.",
+        )
+        with timed("load_shots"):
+            table = ShotTable.load(self.fieldworkshot_layer, self.fieldwork_id)
+        with timed("validate_points"):
+            self.validate_points(table)
+        with timed("correct_codes"):
+            self.correct_codes(table)
+        with timed("write_validation"):
+            self.fieldworkshot_layer.startEditing()
+            table.write(self.fieldworkshot_layer)
+        with timed("show_warnings"):
+            # only fetch the full features of the shots the warnings are shown for
+            warning_points = table.features(self.fieldworkshot_layer, warning_rows(table))
+            self.review_warnings(self.fieldworkshot_layer, warning_points, self.config)
+
+    def validate_points(self, table: ShotTable) -> None:
+        """Raise the flags of the checks each shot fails."""
+        flags = shot_flag_columns(
+            table["HRMS"],
+            table["VRMS"],
+            table["status"],
+            codes_valid(table["code"], self.config),
+            self.config,
         )
-        for w in warning_widgets:
-            dialog.scrollAreaWidgetContents.layout().addWidget(w)
-        return_code = dialog.exec_()
-        if return_code == dialog.Rejected:
-            # abort process
-            msg = "Aborted due to point warnings."
-            raise AbortError(msg)
+        for name, bad in zip(FLAG_COLUMNS, flags):
+            # only raise flags, never clear them, and only write the ones that aren't raised yet
+            newly_bad = bad & ~table[name]
+            if newly_bad.any():
+                table.set(name, newly_bad, True)  # noqa: FBT003
+
+    def known_corrections(self, full_codes: set[str]) -> dict[str, str]:
+        """Return the learned corrections of full_codes that are still valid codes."""  # noqa: DOC201
+        if self.corrections is None or not full_codes:
+            return {}
+        known = self.corrections.lookup(full_codes)
+        return {bad: good for bad, good in known.items() if self.config.check_code(good).valid}
+
+    def correct_codes(self, table: ShotTable) -> None:
+        """Correct the descriptions with an invalid full code.
+
+        Codes with a known correction are corrected without asking, for the rest the user is asked once
+        per distinct description, with suggestions of the closest valid codes, and what they correct is
+        learned for the following rows and imports.
+        """
+        invalid_rows = np.flatnonzero(~codes_valid(table["full_code"], self.config))
+        if not len(invalid_rows):
+            return
+        descriptions = table["description"]
+        full_codes = table["full_code"]
+        invalid_codes = set(full_codes[invalid_rows])
+        known = self.known_corrections(invalid_codes)
+        with timed("suggest_codes"):
+            suggester = self.config.code_suggester
+            suggestions = {code: suggester.suggest(code) for code in invalid_codes - known.keys()}
+        asked: dict[str, str] = {}
+        learned: dict[str, str] = {}
+        used: dict[str, int] = {}
+        for row in invalid_rows:
+            description = descriptions[row]
+            full_code = full_codes[row]
+            # the full code is the description up to the first /
+            rest = description[len(full_code):]
+            if description in asked:
+                correction = asked[description]
+            elif full_code in known:
+                correction = known[full_code] + rest
+                if full_code not in learned:
+                    used[full_code] = used.get(full_code, 0) + 1
+            else:
+                # suggestions are full codes, keep the rest of the description
+                suggested = [suggestion + rest for suggestion in suggestions.get(full_code, [])]
+                correction = self.ask_correction(description, suggested, self.config) or description
+                asked[description] = correction
+                corrected_code = correction.split("/")[0]
+                if corrected_code != full_code:
+                    learned[full_code] = known[full_code] = corrected_code
+            table.set("description", row, correction)
+            table.set("full_code", row, correction.split("/")[0])
+            table.set("code", row, correction.split("/")[0].split(" ")[0])
+
+        if self.corrections is not None:
+            self.corrections.record(learned, used)
+        if used or learned:
+            QgsMessageLog.logMessage(
+                f"Corrected {sum(used.values())} shots with learned code corrections, learned {len(learned)} new ones.",
+            )
@@ -1,143 +1,239 @@
 """Functions for performing a local point merge on fieldwork data."""
 
-import math
-from collections.abc import Generator, Iterable, Sequence
-from typing import Any, Callable, Optional, TypeVar
+from collections.abc import Collection
+from typing import Callable, Optional
 
-from qgis.core import QgsFeature, QgsFeatureRequest, QgsMessageLog, QgsSettings, QgsVectorLayer
+import numpy as np
+from qgis.core import QgsFeature, QgsMessageLog, QgsVectorLayer
 
-from fieldworkimport.common import get_average_point
+from fieldworkimport.common import ValidationConfig, average_shot_groups, get_average_point, validation_config
 from fieldworkimport.exceptions import AbortError
-from fieldworkimport.helpers import assert_true, settings_key
+from fieldworkimport.helpers import BulkAttributeWriter, assert_true
+from fieldworkimport.schema import FieldworkShotSchema
+from fieldworkimport.shot_table import ShotTable
 from fieldworkimport.ui.same_point_shots_dialog import SamePointShotsDialog
 
-_GC_T = TypeVar("_GC_T")
+MergeGroupReview = Callable[[QgsVectorLayer, list[list[QgsFeature]], ValidationConfig], list[list[QgsFeature]]]
+"""Called with the fieldwork shot layer, the groups found and the validation settings. Returns the groups to average."""
 
 
 def should_be_averaged_together(
-    p1: QgsFeature,
-    p2: QgsFeature,
+    table: ShotTable,
+    rows_1: np.ndarray,
+    rows_2: np.ndarray,
     same_point_tolerance: float,
-    control_point_codes: list[str],
-) -> bool:
-    """Return True if the two coords belong in an averaging group together."""  # noqa: DOC201
-    # QgsMessageLog.logMessage(f"CMP: {p1['name')] -> {p2['name')}"]
-
-    p1_code = p1["code"]
-    p2_code = p2["code"]
-    p1_parent_point_id = p1["parent_point_id"]
-    p2_parent_point_id = p2["parent_point_id"]
-    p1_easting = p1["easting"]
-    p2_easting = p2["easting"]
-    p1_northing = p1["northing"]
-    p2_northing = p2["northing"]
+    control_point_codes: Collection[str],
+) -> np.ndarray:
+    """Return, for each pair of rows, True if the two shots belong in an averaging group together."""  # noqa: DOC201
+    codes = table["code"]
+    parent_point_ids = table["parent_point_id"]
+    easting = table["easting"]
+    northing = table["northing"]
+    elevation = table["elevation"]
 
     # If already averaged (the user went back?) skip
-    if p1_parent_point_id or p2_parent_point_id:
-
-        return False
+    not_averaged = ~(parent_point_ids[rows_1].astype(bool) | parent_point_ids[rows_2].astype(bool))
 
     # Same code
-    if p1_code != p2_code:
-        return False
+    same_code = codes[rows_1] == codes[rows_2]
 
     # Within tolerance
-    if p1_code in control_point_codes:
-        p1_elevation = p1["elevation"]
-        p2_elevation = p2["elevation"]
-        # factor elevation into distance calc if control point for 3d calculations
-        distance = math.sqrt(
-            (p2_easting - p1_easting) ** 2
-            + (p2_northing - p1_northing) ** 2
-            + (p2_elevation - p1_elevation) ** 2,
-        )
-    else:
-        # if not control point, just use 2d calculations
-        distance = math.sqrt((p2_easting - p1_easting) ** 2 + (p2_northing - p1_northing) ** 2)
-
-    return not distance > same_point_tolerance
-
-
-def _group_consecutively(iterable: Iterable[_GC_T], comparator: Callable[[_GC_T, _GC_T], bool]) -> Generator[list[_GC_T], Any, None]:  # noqa: E501
-    pval: Optional[_GC_T] = None  # noqa: FA100
-    group: list[_GC_T] = []
-    for val in iterable:
-        is_same_group = pval is None or comparator(val, pval)
-
-        if pval is not None and not is_same_group and len(group) > 0:
-            yield group
-            group = [val]
-        else:
-            group.append(val)
-
-        pval = val
-
-    yield group
-
-
-def find_groups_of_same_shots(
-    points: Sequence[QgsFeature],
-) -> list[list[QgsFeature]]:
-    s = QgsSettings()
-
-    def is_same_group(p1: QgsFeature, p2: QgsFeature) -> bool:
-        return should_be_averaged_together(
-            p1,
-            p2,
-            float(s.value(settings_key("same_point_tolerance"))),
-            s.value(settings_key("control_point_codes")).split(","),
-        )
+    squared_distance = (easting[rows_2] - easting[rows_1]) ** 2 + (northing[rows_2] - northing[rows_1]) ** 2
+    # factor elevation into distance calc if control point for 3d calculations, if not control point, just use 2d calculations
+    is_control = np.isin(codes[rows_1], list(control_point_codes))
+    squared_distance[is_control] += (elevation[rows_2][is_control] - elevation[rows_1][is_control]) ** 2
+    within_tolerance = ~(np.sqrt(squared_distance) > same_point_tolerance)
+
+    return not_averaged & same_code.astype(bool) & within_tolerance
+
+
+def find_groups_of_same_shots(table: ShotTable, config: ValidationConfig) -> list[np.ndarray]:
+    """Return the rows of each group of shots that should be averaged together.
+
+    Only runs of consecutive shots are grouped in consecutive only mode, otherwise every group of shots
+    within tolerance is.
+    """  # noqa: DOC201
+    if config.consecutive_merge_only:
+        return find_consecutive_groups(table, config)
+    return find_groups_within_tolerance(table, config)
+
+
+def find_consecutive_groups(table: ShotTable, config: ValidationConfig) -> list[np.ndarray]:
+    """Return the rows of each run of consecutive shots that should be averaged together."""  # noqa: DOC201
+    rows = np.arange(len(table))
+    same_as_previous = should_be_averaged_together(
+        table,
+        rows[1:],
+        rows[:-1],
+        config.same_point_tolerance,
+        config.control_point_codes,
+    )
 
     # Consecutive
-    return [group for group in _group_consecutively(points, is_same_group) if len(group) > 1]
+    groups = np.split(rows, np.flatnonzero(~same_as_previous) + 1)
+    return [group for group in groups if len(group) > 1]
+
+
+# a cell and the neighbours after it, so each pair of neighbouring cells is compared once
+_NEIGHBOUR_CELLS = ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+def _neighbour_pairs(
+    cell_rows: np.ndarray,
+    cell_starts: np.ndarray,
+    cells_1: np.ndarray,
+    cells_2: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return every pair of a row of cells_1[i] and a row of cells_2[i].
+
+    The rows of cell c are cell_rows[cell_starts[c]:cell_starts[c + 1]].
+    """  # noqa: DOC201
+    sizes = np.diff(cell_starts)
+    sizes_1 = sizes[cells_1]
+    sizes_2 = sizes[cells_2]
+    n_pairs = sizes_1 * sizes_2
+    # index of each pair within its pair of cells
+    pair_cells = np.repeat(np.arange(len(cells_1)), n_pairs)
+    local = np.arange(n_pairs.sum()) - np.repeat(np.cumsum(n_pairs) - n_pairs, n_pairs)
+    rows_1 = cell_rows[cell_starts[cells_1][pair_cells] + local // sizes_2[pair_cells]]
+    rows_2 = cell_rows[cell_starts[cells_2][pair_cells] + local % sizes_2[pair_cells]]
+    return rows_1, rows_2
+
+
+def find_groups_within_tolerance(table: ShotTable, config: ValidationConfig) -> list[np.ndarray]:
+    """Return the rows of each group of shots that should be averaged together, wherever they are in the table.
+
+    Shots are put in a grid of same-code cells as wide as the tolerance, so only the shots in neighbouring
+    cells need comparing. Shots within tolerance of each other are grouped, and so are their groups.
+    Groups are in table order, like the consecutive ones.
+    """  # noqa: DOC201
+    tolerance = config.same_point_tolerance
+    cell_size = tolerance if tolerance > 0 else 1.0
+    easting = table["easting"]
+    northing = table["northing"]
+    # shots already averaged and shots without a position can't be grouped
+    candidates = np.flatnonzero(~table["parent_point_id"].astype(bool) & ~np.isnan(easting) & ~np.isnan(northing))
+    if len(candidates) < 2:  # noqa: PLR2004
+        return []
+
+    # sort the shots by cell, each cell's rows are then a slice of cell_rows
+    _, code_ids = np.unique(table["code"][candidates].astype(str), return_inverse=True)
+    cell_x = np.floor(easting[candidates] / cell_size).astype(np.int64)
+    cell_y = np.floor(northing[candidates] / cell_size).astype(np.int64)
+    order = np.lexsort((cell_y, cell_x, code_ids))
+    cell_rows = candidates[order]
+    keys = np.stack((code_ids[order], cell_x[order], cell_y[order]), axis=1)
+    is_first = np.ones(len(keys), dtype=np.bool_)
+    is_first[1:] = (keys[1:] != keys[:-1]).any(axis=1)
+    cell_starts = np.append(np.flatnonzero(is_first), len(keys))
+    cell_keys = keys[is_first]
+    cell_index = {key: cell for cell, key in enumerate(map(tuple, cell_keys.tolist()))}
+
+    pairs_1: list[np.ndarray] = []
+    pairs_2: list[np.ndarray] = []
+    for dx, dy in _NEIGHBOUR_CELLS:
+        neighbours = np.array(
+            [cell_index.get((code_id, x + dx, y + dy), -1) for code_id, x, y in cell_keys.tolist()],
+            dtype=np.intp,
+        )
+        cells_1 = np.flatnonzero(neighbours >= 0)
+        rows_1, rows_2 = _neighbour_pairs(cell_rows, cell_starts, cells_1, neighbours[cells_1])
+        if dx == dy == 0:
+            keep = rows_1 < rows_2
+            rows_1, rows_2 = rows_1[keep], rows_2[keep]
+        pairs_1.append(rows_1)
+        pairs_2.append(rows_2)
+    rows_1 = np.concatenate(pairs_1)
+    rows_2 = np.concatenate(pairs_2)
+    together = should_be_averaged_together(table, rows_1, rows_2, tolerance, config.control_point_codes)
+
+    # union-find of the rows, grouped rows share a root
+    roots = list(range(len(table)))
+
+    def find_root(row: int) -> int:
+        while roots[row] != row:
+            roots[row] = roots[roots[row]]
+            row = roots[row]
+        return row
+
+    for row_1, row_2 in zip(rows_1[together].tolist(), rows_2[together].tolist()):
+        roots[find_root(row_1)] = find_root(row_2)
+
+    groups: dict[int, list[int]] = {}
+    for row in candidates.tolist():
+        groups.setdefault(find_root(row), []).append(row)
+    return sorted(
+        (np.array(rows, dtype=np.intp) for rows in groups.values() if len(rows) > 1),
+        key=lambda rows: rows[0],
+    )
 
 
 def create_averaged_point(
     fieldworkshot_layer: QgsVectorLayer,
     group: list[QgsFeature],
+    table: Optional[ShotTable] = None,
+    config: Optional[ValidationConfig] = None,
+    avg_point: Optional[QgsFeature] = None,
 ):
-    fields = fieldworkshot_layer.fields()
-    parent_point_id_index = fields.indexFromName("parent_point_id")
+    """Add the average of group to the layer and parent the group's shots to it.
+
+    With a table, the parents are set on the table and written back with `table.write`.
+    Pass avg_point if the group was already averaged, with `average_shot_groups`.
+    """
+    schema = FieldworkShotSchema.of(fieldworkshot_layer)
 
     # get avg point of group
-    avg_point = get_average_point(fieldworkshot_layer, group)
-    avg_point_id = avg_point["id"]
+    if avg_point is None:
+        avg_point = get_average_point(fieldworkshot_layer, group, table, config)
+    avg_point_id = schema.id.get(avg_point)
 
     # add avg point to layer
     assert_true(fieldworkshot_layer.addFeature(avg_point), "Failed to add average fieldwork shot.")
 
     # parent each child point with avg point
+    if table is not None:
+        table.set("parent_point_id", table.rows_of(group), avg_point_id)
+        return
+    writer = BulkAttributeWriter(fieldworkshot_layer, "Parent fieldwork shots to average shot")
     for point in group:
-        point[parent_point_id_index] = avg_point_id
-        # update feature on layer
-        assert_true(fieldworkshot_layer.updateFeature(point), "Failed to update child fieldwork shot.")
+        schema.parent_point_id.set(point, avg_point_id)
+        writer.change(point.id(), schema.parent_point_id.index, avg_point_id)
+    writer.apply("Failed to update child fieldwork shots.")
+
+
+def review_merge_groups(
+    fieldworkshot_layer: QgsVectorLayer,
+    groups: list[list[QgsFeature]],
+    config: ValidationConfig,
+) -> list[list[QgsFeature]]:
+    """Let the user adjust the groups of same-point shots before they're averaged."""  # noqa: DOC201, DOC501
+    dialog = SamePointShotsDialog(fieldworkshot_layer, groups=groups, config=config)
+    return_code = dialog.exec_()
+    if return_code == dialog.Rejected:
+        msg = "Aborted during local point merge stage."
+        raise AbortError(msg)
+    return dialog.final_groups
 
 
 def local_point_merge(
     fieldworkshot_layer: QgsVectorLayer,
     fieldwork_id: int,
+    review_groups: MergeGroupReview = review_merge_groups,
+    config: Optional[ValidationConfig] = None,
 ):
     QgsMessageLog.logMessage(
         "Local point merge started.",
     )
-    points: list[QgsFeature] = [
-        *fieldworkshot_layer.getFeatures(
-            QgsFeatureRequest()
-            .setFilterExpression(f"\"fieldwork_id\" = '{fieldwork_id}'")
-            .addOrderBy("name", ascending=True),
-        ),  # type: ignore
-    ]
-
-    groups = find_groups_of_same_shots(
-        points,
-    )
-
-    dialog = SamePointShotsDialog(fieldworkshot_layer, groups=groups)
-    return_code = dialog.exec_()
-    if return_code == dialog.Rejected:
-        msg = "Aborted during local point merge stage."
-        raise AbortError(msg)
-
-    final_groups = dialog.final_groups
-    for group in final_groups:
-        create_averaged_point(fieldworkshot_layer, group)
+    table = ShotTable.load(fieldworkshot_layer, fieldwork_id, order_by="name")
+
+    config = config or validation_config()
+    group_rows = find_groups_of_same_shots(table, config)
+    # the review needs full features, only fetch the grouped shots
+    groups = [table.features(fieldworkshot_layer, rows) for rows in group_rows]
+
+    final_groups = review_groups(fieldworkshot_layer, groups, config)
+    # average every group in one go
+    avg_points, _ = average_shot_groups(fieldworkshot_layer, final_groups, table, config)
+    for group, avg_point in zip(final_groups, avg_points):
+        create_averaged_point(fieldworkshot_layer, group, table, config, avg_point)
+    table.write(fieldworkshot_layer)
@@ -1,20 +1,26 @@
-from typing import TYPE_CHECKING, Optional
+import math
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, Callable, Optional
 from uuid import uuid4
 
+import numpy as np
 from qgis.core import (
-    QgsCoordinateReferenceSystem,
-    QgsCoordinateTransform,
     QgsFeature,
     QgsFeatureRequest,
     QgsGeometry,
     QgsMessageLog,
     QgsProject,
-    QgsSettings,
+    QgsVectorLayer,
     QgsVectorLayerUtils,
 )
 
-from fieldworkimport.helpers import assert_true, nullish, progress_dialog, settings_key, timed
-from fieldworkimport.ui.match_control_item import MatchControlItem
+from fieldworkimport.common import ValidationConfig, validation_config
+from fieldworkimport.helpers import BulkAttributeWriter, assert_true, nullish, progress_dialog, timed
+from fieldworkimport.point_index import RadiusIndex
+from fieldworkimport.schema import FieldrunShotSchema, FieldworkShotSchema
+from fieldworkimport.shot_table import ShotTable
+from fieldworkimport.transforms import WEB_MERCATOR_SRID, get_transform, transform_arrays
+from fieldworkimport.ui.match_control_item import ControlMatchResult, MatchControlItem
 from fieldworkimport.ui.match_to_controls_dialog import MatchToControlsDialog
 
 if TYPE_CHECKING:
@@ -22,11 +28,49 @@ if TYPE_CHECKING:
     from fieldworkimport.plugin import PluginInput
 
 
+CONTROL_SUGGESTION_RADIUS = 10.0
+"""How far from a control fieldwork shot fieldrun controls are suggested, in Web Mercator meters."""
+
+
+def metric_positions(layer: QgsVectorLayer, features: Iterable[QgsFeature]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the ids of (multi)point features and their Web Mercator x and y, NaN for the ones without a geometry."""  # noqa: DOC201
+    fids: list[int] = []
+    x: list[float] = []
+    y: list[float] = []
+    for feature in features:
+        fids.append(feature.id())
+        geometry = feature.geometry()
+        if geometry.isEmpty():
+            x.append(math.nan)
+            y.append(math.nan)
+        else:
+            # asPoint raises on multipart geometries, use their first point
+            point = geometry.asMultiPoint()[0] if geometry.isMultipart() else geometry.asPoint()
+            x.append(point.x())
+            y.append(point.y())
+    project = QgsProject.instance()
+    assert project
+    # Web Mercator so we can use meters
+    transform_to_m = get_transform(layer.crs(), WEB_MERCATOR_SRID, project.transformContext())
+    metric_x = np.array(x)
+    metric_y = np.array(y)
+    # proj can't transform the missing ones
+    has_point = ~np.isnan(metric_x)
+    metric_x[has_point], metric_y[has_point], _ = transform_arrays(transform_to_m, metric_x[has_point], metric_y[has_point])
+    return np.array(fids, dtype=np.int64), metric_x, metric_y
+
+
 class FieldRunMatchStage:
     layers: "FieldworkImportLayers"
     fieldwork_id: str
     fieldrun_id: Optional[int]  # noqa: FA100
     plugin_input: "PluginInput"
+    config: ValidationConfig
+    fw_schema: FieldworkShotSchema
+    fr_schema: FieldrunShotSchema
+    fr_writer: BulkAttributeWriter
+    _parent_by_id: dict[str, Optional[str]]  # noqa: FA100
+    _root_by_id: dict[str, str]
 
     def __init__(  # noqa: D107
         self,
@@ -34,13 +78,20 @@ class FieldRunMatchStage:
         fieldwork_id: str,
         fieldrun_id: Optional[int],  # noqa: FA100
         plugin_input: "PluginInput",
+        config: Optional[ValidationConfig] = None,  # noqa: FA100
     ) -> None:
         self.layers = layers
         self.fieldwork_id = fieldwork_id
         self.fieldrun_id = fieldrun_id
         self.plugin_input = plugin_input
+        self.config = config or validation_config()
 
-        fw_fields = self.layers.fieldworkshot_layer.fields()
+        self.fw_schema = FieldworkShotSchema.of(self.layers.fieldworkshot_layer)
+        self.fr_schema = FieldrunShotSchema.of(self.layers.fieldrunshot_layer)
+        # matches are queued and written together at the end of run
+        self.fr_writer = BulkAttributeWriter(self.layers.fieldrunshot_layer, "Match fieldrun shots")
+        self._parent_by_id = {}
+        self._root_by_id = {}
 
     def run(self):
         """Start finding matches."""
@@ -52,15 +103,19 @@ class FieldRunMatchStage:
                 self.match_on_name()
         with timed("match_controls"):
             self.match_controls()
+        with timed("write_matches"):
+            self.fr_writer.apply("Failed to assign fieldwork shot matches to fieldrun shots.")
 
     def create_fieldrun_control_shot(self, name: str, based_on_fieldwork_shot: QgsFeature) -> QgsFeature:
         new_fieldrunshot = QgsVectorLayerUtils.createFeature(self.layers.fieldrunshot_layer)
-        fields = self.layers.fieldrunshot_layer.fields()
-        new_fieldrunshot[fields.indexFromName("id")] = str(uuid4())
-        new_fieldrunshot[fields.indexFromName("name")] = name
-        new_fieldrunshot[fields.indexFromName("type")] = "Control"
-        new_fieldrunshot[fields.indexFromName("field_run_id")] = self.fieldrun_id
-        new_fieldrunshot[fields.indexFromName("description")] = f"{based_on_fieldwork_shot["description"]}\n[Generated to match shot {based_on_fieldwork_shot['name']}]"  # noqa: E501
+        fr_schema = self.fr_schema
+        fw_description = self.fw_schema.description.get(based_on_fieldwork_shot)
+        fw_name = self.fw_schema.name.get(based_on_fieldwork_shot)
+        fr_schema.id.set(new_fieldrunshot, str(uuid4()))
+        fr_schema.name.set(new_fieldrunshot, name)
+        fr_schema.type.set(new_fieldrunshot, "Control")
+        fr_schema.field_run_id.set(new_fieldrunshot, self.fieldrun_id)
+        fr_schema.description.set(new_fieldrunshot, f"{fw_description}\n[Generated to match shot {fw_name}]")
         geom = QgsGeometry(based_on_fieldwork_shot.geometry())
         new_fieldrunshot.setGeometry(geom)
 
@@ -70,14 +125,41 @@ class FieldRunMatchStage:
 
     def assign_fr_shot(self, fw_shot: QgsFeature, fr_shot: QgsFeature) -> None:
         """Assign fieldrun show as match for fieldwork shot or its ancestor."""
-        parent_point_id = fw_shot["parent_point_id"]
-        if not nullish(parent_point_id):
-            parent_point = next(self.layers.fieldworkshot_layer.getFeatures(f"id = '{parent_point_id}'"))
-            # recurse up ancestor tree.
-            self.assign_fr_shot(parent_point, fr_shot)
-        else:
-            fr_shot["matched_fieldwork_shot_id"] = fw_shot["id"]
-            assert_true(self.layers.fieldrunshot_layer.updateFeature(fr_shot), "Failed to assign fieldwork shot match to fieldrun shot.")
+        self._assign_fr_shot_by_id(self.fw_schema.id.get(fw_shot), self.fw_schema.parent_point_id.get(fw_shot), fr_shot)
+
+    def _assign_fr_shot_by_id(self, fw_shot_id: str, parent_point_id: Optional[str], fr_shot: QgsFeature) -> None:  # noqa: FA100
+        root_shot_id = self.root_shot_id(fw_shot_id, parent_point_id)
+        matched_fieldwork_shot_id = self.fr_schema.matched_fieldwork_shot_id
+        matched_fieldwork_shot_id.set(fr_shot, root_shot_id)
+        self.fr_writer.change(fr_shot.id(), matched_fieldwork_shot_id.index, root_shot_id)
+
+    def index_parents(self, fw_shots: ShotTable) -> None:
+        """Remember the parent of each shot of fw_shots, so finding their ancestors doesn't query the layer."""
+        self._parent_by_id.update(zip(fw_shots["id"].tolist(), fw_shots["parent_point_id"].tolist()))
+
+    def _parent_point_id(self, fw_shot_id: str) -> Optional[str]:  # noqa: FA100
+        if fw_shot_id not in self._parent_by_id:
+            # a parent outside the indexed shots
+            fw_shot = next(self.layers.fieldworkshot_layer.getFeatures(f"id = '{fw_shot_id}'"), None)
+            assert_true(fw_shot is not None, f"Parent fieldwork shot {fw_shot_id} doesn't exist.")
+            self._parent_by_id[fw_shot_id] = self.fw_schema.parent_point_id.get(fw_shot)
+        return self._parent_by_id[fw_shot_id]
+
+    def root_shot_id(self, fw_shot_id: str, parent_point_id: Optional[str]) -> str:  # noqa: FA100
+        """Return the id of the oldest ancestor of a fieldwork shot, the shot itself if it has no parent.
+
+        The root of every shot on the way up is remembered for the next shots of the same family.
+        """  # noqa: DOC201
+        path: list[str] = []
+        while fw_shot_id not in self._root_by_id and not nullish(parent_point_id):
+            path.append(fw_shot_id)
+            fw_shot_id = parent_point_id  # type: ignore []
+            assert_true(fw_shot_id not in path, f"Fieldwork shot {fw_shot_id} is its own ancestor.")
+            # no need for the parent of a shot whose root is known
+            parent_point_id = None if fw_shot_id in self._root_by_id else self._parent_point_id(fw_shot_id)
+        root_shot_id = self._root_by_id.get(fw_shot_id, fw_shot_id)
+        self._root_by_id.update(dict.fromkeys(path, root_shot_id))
+        return root_shot_id
 
     def match_on_name(self) -> None:
         """Iterate through fieldwork points, look for match in fieldrun points.
@@ -88,12 +170,8 @@ class FieldRunMatchStage:
             msg = "Fieldrun wasn't passed so a match on name is impossible."
             raise ValueError(msg)
 
-        fw_points: list[QgsFeature] = [
-            *self.layers.fieldworkshot_layer.getFeatures(
-                QgsFeatureRequest()
-                .setFilterExpression(f"\"fieldwork_id\" = '{self.fieldwork_id}'"),
-            ),  # type: ignore []
-        ]
+        fw_shots = ShotTable.load(self.layers.fieldworkshot_layer, self.fieldwork_id)
+        self.index_parents(fw_shots)
 
         fr_points: list[QgsFeature] = [
             *self.layers.fieldrunshot_layer.getFeatures(
@@ -101,29 +179,40 @@ class FieldRunMatchStage:
                 .setFilterExpression(f'"field_run_id" = {self.fieldrun_id}'),
             ),  # type: ignore []
         ]
-        fr_name_feature_tuples = [(f["name"], f) for f in fr_points]
+        fr_name = self.fr_schema.name
+        fr_name_feature_tuples = [(fr_name.get(f), f) for f in fr_points]
         fr_name_feature_map = {f[0].strip(): f[1] for f in fr_name_feature_tuples if f[0]}
 
-        for fw_shot in fw_points:
-            fw_shot_name = fw_shot["name"]
+        for fw_shot_id, fw_shot_name, parent_point_id in zip(fw_shots["id"], fw_shots["name"], fw_shots["parent_point_id"]):
             if fw_shot_name in fr_name_feature_map:
                 fr_shot = fr_name_feature_map[fw_shot_name]
-                QgsMessageLog.logMessage(f"Matched {fw_shot['name']} to field run shot {fr_shot['name']} based on name.")
+                QgsMessageLog.logMessage(f"Matched {fw_shot_name} to field run shot {fr_name.get(fr_shot)} based on name.")
 
-                self.assign_fr_shot(fw_shot, fr_shot)
+                self._assign_fr_shot_by_id(fw_shot_id, parent_point_id, fr_shot)
 
     def match_controls(self) -> None:
-        """List all controls that need matches, with neasby (5m) suggestions for each point.
+        """List all controls that need matches, with nearby (10m) suggestions for each point.
 
         User can either choose a suggestion, choose an "other" point, or provide a name for a new point.
         """
-        s = QgsSettings()
-        control_point_codes = s.value(settings_key("control_point_codes")).split(",")
+        with progress_dialog("Finding control point matches...") as set_progress:
+            suggestions = self.find_control_suggestions(set_progress)
+
+        results = self.choose_control_matches(suggestions)
+        self.apply_control_matches(results)
+
+    def find_control_suggestions(
+        self,
+        set_progress: Callable[[int], None] = lambda _: None,
+    ) -> list[tuple[QgsFeature, list[QgsFeature]]]:
+        """Find control fieldwork shots needing a fieldrun match, each with the nearby fieldrun controls, nearest first.
+
+        The positions of the fieldrun controls are read once into a `RadiusIndex` and every fieldwork control
+        is looked up in it together. Only the suggested fieldrun controls are then fetched in full.
+        """  # noqa: DOC201
+        control_point_codes = sorted(self.config.control_point_codes)
         qgsproj = QgsProject.instance()
         assert qgsproj
-        dialog = MatchToControlsDialog()
-
-        allow_create_new = self.fieldrun_id is not None
 
         # find control-type fieldwork shots that need fieldrunshot matches.
         cp_code_clause = " OR ".join([f"\"code\" like '{code}'" for code in control_point_codes])
@@ -131,38 +220,53 @@ class FieldRunMatchStage:
         fw_controls_needing_matches: list[QgsFeature] = [*self.layers.fieldworkshot_layer.getFeatures(
             f'"fieldwork_id" = \'{self.fieldwork_id}\' and "parent_point_id" is null and ({cp_code_clause})',
         )]  # type: ignore []
+        if not fw_controls_needing_matches:
+            return []
 
-        with progress_dialog("Finding control point matches...") as set_progress:
-            n_controls = len(fw_controls_needing_matches)
-
-            src_crs = self.layers.fieldrunshot_layer.crs()
-            # add widget for each fieldworkshot control
-            for index, fw_shot in enumerate(fw_controls_needing_matches):
-                set_progress(index * 100 // n_controls)
-                projected_crs = QgsCoordinateReferenceSystem("EPSG:3857")  # Web Mercator so we can use meters
-                point = fw_shot.geometry()
-                transform_to_m = QgsCoordinateTransform(src_crs, projected_crs, qgsproj.transformContext())
-                point.transform(transform_to_m)
+        fieldrunshot_layer = self.layers.fieldrunshot_layer
+        with timed("index fieldrun controls"):
+            fr_fids, fr_x, fr_y = metric_positions(
+                fieldrunshot_layer,
+                fieldrunshot_layer.getFeatures(
+                    QgsFeatureRequest().setFilterExpression("type like 'Control'").setNoAttributes(),
+                ),  # type: ignore []
+            )
+            index = RadiusIndex(fr_x, fr_y, CONTROL_SUGGESTION_RADIUS)
+        set_progress(50)
 
-                buffer_geom = point.buffer(10, 10)  # 5 meters
-                transform_back_to_crs = QgsCoordinateTransform(projected_crs, src_crs, qgsproj.transformContext())
-                buffer_geom.transform(transform_back_to_crs)
+        with timed("find suggestions"):
+            _, fw_x, fw_y = metric_positions(self.layers.fieldworkshot_layer, fw_controls_needing_matches)
+            neighbours, _ = index.query(fw_x, fw_y)
+            suggested_fids = np.unique(fr_fids[np.concatenate(neighbours)]).tolist()
+            fr_controls = {
+                f.id(): f
+                for f in fieldrunshot_layer.getFeatures(QgsFeatureRequest().setFilterFids(suggested_fids))
+            }
+        set_progress(100)
 
-                suggestions = []
-
-                # find nearby suggestions
-                with timed("find suggestions"):
-                    suggestions = [*self.layers.fieldrunshot_layer.getFeatures(
-                        QgsFeatureRequest().setFilterExpression("type like 'Control'").setFilterRect(buffer_geom.boundingBox()),
-                    )]  # type: ignore
+        return [
+            (fw_shot, [fr_controls[fid] for fid in fr_fids[shot_neighbours].tolist()])
+            for fw_shot, shot_neighbours in zip(fw_controls_needing_matches, neighbours)
+        ]
 
-                # add widget for fieldworkshot matching
-                match_control_item = MatchControlItem(self.layers, fw_shot, suggestions, allow_create_new=allow_create_new)
-                dialog.scrollAreaContents.layout().addWidget(match_control_item)
+    def choose_control_matches(
+        self,
+        control_suggestions: list[tuple[QgsFeature, list[QgsFeature]]],
+    ) -> list[tuple[QgsFeature, ControlMatchResult]]:
+        """Ask the user to pick a match for each control fieldwork shot."""  # noqa: DOC201
+        dialog = MatchToControlsDialog()
+        allow_create_new = self.fieldrun_id is not None
+        # add widget for each fieldworkshot control
+        for fw_shot, suggestions in control_suggestions:
+            match_control_item = MatchControlItem(self.layers, fw_shot, suggestions, allow_create_new=allow_create_new)
+            dialog.scrollAreaContents.layout().addWidget(match_control_item)
 
         dialog.exec_()
+        return dialog.results
 
-        for fieldwork_shot, control_match_result in dialog.results:
+    def apply_control_matches(self, results: list[tuple[QgsFeature, ControlMatchResult]]) -> None:
+        """Assign the chosen fieldrun shots, creating the new ones first. The matches are written by `run`."""
+        for fieldwork_shot, control_match_result in results:
             if control_match_result.matched_fieldrunshot:
                 # match to selected fieldrun shot
                 self.assign_fr_shot(fieldwork_shot, control_match_result.matched_fieldrunshot)
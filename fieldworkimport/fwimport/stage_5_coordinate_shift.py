@@ -1,22 +1,42 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
-from qgis.core import QgsFeature, QgsMessageLog, QgsSettings
+import numpy as np
+from qgis.core import QgsFeature, QgsMessageLog
 
-from fieldworkimport.helpers import assert_true, nullish, settings_key
+from fieldworkimport.common import ValidationConfig, validation_config
+from fieldworkimport.helpers import BulkAttributeWriter, nullish
+from fieldworkimport.schema import FieldrunShotSchema, FieldworkSchema, FieldworkShotSchema
+from fieldworkimport.shot_table import ShotTable
 from fieldworkimport.ui.coordinate_shift_dialog import CoordinateShiftDialog, CoordinateShiftDialogResult
 
 if TYPE_CHECKING:
     from fieldworkimport.fwimport.import_process import FieldworkImportLayers
     from fieldworkimport.plugin import PluginInput
 
+SHIFT_COLUMNS = ("easting", "northing", "elevation")
+"""Shot columns in the order of a shift's components."""
+
+ControlShift = tuple[QgsFeature, QgsFeature, tuple[float, float, Optional[float]]]
+"""Fieldwork control shot, its matched fieldrun shot, and the shift from measured to published coordinates."""
+
+
+def average_control_shift(control_shifts: list[ControlShift]) -> tuple[float, float, float]:
+    """Average the shifts component-wise, the same way the coordinate shift dialog does for the checked rows."""  # noqa: DOC201
+    averages = []
+    for i in range(3):
+        components = [shift[i] for _, _, shift in control_shifts if shift[i]]
+        averages.append(sum(components, start=0) / max(len(components), 1))
+    return (averages[0], averages[1], averages[2])
+
 
 class CoordinateShiftStage:
     layers: FieldworkImportLayers
     fieldwork: QgsFeature
     fieldrun_id: int | None
     plugin_input: PluginInput
+    config: ValidationConfig
 
     def __init__(  # noqa: D107
         self,
@@ -24,22 +44,30 @@ class CoordinateShiftStage:
         fieldwork: QgsFeature,
         fieldrun_id: int | None,
         plugin_input: PluginInput,
+        config: ValidationConfig | None = None,
     ) -> None:
         self.layers = layers
         self.fieldwork = fieldwork
         self.fieldrun_id = fieldrun_id
         self.plugin_input = plugin_input
+        self.config = config or validation_config()
 
     def run(self):
         QgsMessageLog.logMessage(
             "CoordinateShiftStage.run started.",
         )
-        s = QgsSettings()
-        control_point_codes = s.value(settings_key("control_point_codes")).split(",")
-        cp_code_clause = ", ".join([f"'{code}'" for code in control_point_codes])
-
         hpn_shift = self.calculate_hpn_shift()
-        dialog = CoordinateShiftDialog(hpn_shift=hpn_shift)
+        control_shifts = self.find_control_shifts()
+
+        # apply shift
+        result = self.choose_shift(hpn_shift, control_shifts)
+
+        self.apply_shift(result)
+
+    def find_control_shifts(self) -> list[ControlShift]:
+        """Return the shift to each matched, published fieldrun control, for the fieldwork's control shots."""  # noqa: DOC201
+        control_point_codes = sorted(self.config.control_point_codes)
+        cp_code_clause = ", ".join([f"'{code}'" for code in control_point_codes])
 
         points: list[QgsFeature] = [*self.layers.fieldworkshot_layer.getFeatures(
             f"""
@@ -48,29 +76,43 @@ class CoordinateShiftStage:
             """,
         )]  # type: ignore []
 
+        fw_schema = FieldworkShotSchema.of(self.layers.fieldworkshot_layer)
+        fr_schema = FieldrunShotSchema.of(self.layers.fieldrunshot_layer)
+        control_shifts: list[ControlShift] = []
         for fieldworkshot in points:
-            fieldrunshot = next(self.layers.fieldrunshot_layer.getFeatures(f"matched_fieldwork_shot_id = '{fieldworkshot['id']}'"), None)  # noqa: E501
+            fieldworkshot_id = fw_schema.id.get(fieldworkshot)
+            fieldrunshot = next(self.layers.fieldrunshot_layer.getFeatures(f"matched_fieldwork_shot_id = '{fieldworkshot_id}'"), None)
             if not fieldrunshot:
-                QgsMessageLog.logMessage(f"Fieldwork shot has no matched fieldrun shot. ({fieldworkshot['id']=})")
+                QgsMessageLog.logMessage(f"Fieldwork shot has no matched fieldrun shot. ({fieldworkshot_id=})")
                 continue
 
-            published_easting = fieldrunshot["control_easting"]
-            published_northing = fieldrunshot["control_northing"]
-            published_elevation = fieldrunshot["control_elevation"]
+            published_easting = fr_schema.control_easting.get(fieldrunshot)
+            published_northing = fr_schema.control_northing.get(fieldrunshot)
+            published_elevation = fr_schema.control_elevation.get(fieldrunshot)
 
             # check if easting an northing is set, and if not, it's new and we can't use it for a shift
             if nullish(published_easting) or nullish(published_northing):
                 continue
 
-            measured_easting = fieldworkshot["easting"]
-            measured_northing = fieldworkshot["northing"]
-            measured_elevation = fieldworkshot["elevation"]
+            measured_easting = fw_schema.easting.get(fieldworkshot)
+            measured_northing = fw_schema.northing.get(fieldworkshot)
+            measured_elevation = fw_schema.elevation.get(fieldworkshot)
             shift = (
                 published_easting - measured_easting,
                 published_northing - measured_northing,
                 (published_elevation - measured_elevation) if not nullish(published_elevation) else None,
             )
+            control_shifts.append((fieldworkshot, fieldrunshot, shift))
+        return control_shifts
 
+    def choose_shift(  # noqa: PLR6301
+        self,
+        hpn_shift: tuple[float, float, float] | None,
+        control_shifts: list[ControlShift],
+    ) -> CoordinateShiftDialogResult:
+        """Ask the user which shift to apply."""  # noqa: DOC201
+        dialog = CoordinateShiftDialog(hpn_shift=hpn_shift)
+        for fieldworkshot, fieldrunshot, shift in control_shifts:
             dialog.add_shift_row(
                 fieldworkshot,
                 fieldrunshot,
@@ -82,44 +124,40 @@ class CoordinateShiftStage:
         # show and wait for dialog
         dialog.exec_()
 
-        # apply shift
-        result = dialog.get_result()
-
-        self.apply_shift(result)
+        return dialog.get_result()
 
     def _apply_shift_to_fieldwork(self, result: CoordinateShiftDialogResult, fieldwork: QgsFeature) -> None:
         """Apply shift from dialog to fieldwork."""
         shift_type, shift, selected_fieldrunshots = result
-        ids = [shot["id"] for shot in (selected_fieldrunshots or [])]
+        fr_id = FieldrunShotSchema.of(self.layers.fieldrunshot_layer).id
+        ids = [fr_id.get(shot) for shot in (selected_fieldrunshots or [])]
         ids_str = ",".join(ids)
 
+        schema = FieldworkSchema.of(self.layers.fieldwork_layer)
         fieldwork = next(self.layers.fieldwork_layer.getFeatures(f"\"id\"='{fieldwork["id"]}'"))
-        fieldwork.setAttribute("shift_type", shift_type)
-        fieldwork.setAttribute("shift_control_ids", ids_str)
+        attributes = {
+            schema.shift_type.index: shift_type,
+            schema.shift_control_ids.index: ids_str,
+        }
         if shift:
-            fieldwork.setAttribute("easting_shift", shift[0])
-            fieldwork.setAttribute("northing_shift", shift[1])
-            fieldwork.setAttribute("elevation_shift", shift[2])
+            attributes[schema.easting_shift.index] = shift[0]
+            attributes[schema.northing_shift.index] = shift[1]
+            attributes[schema.elevation_shift.index] = shift[2]
 
-        assert_true(self.layers.fieldwork_layer.updateFeature(fieldwork), "Failed to update fieldwork with shift.")
-
-    def _apply_shift_to_fieldworkshot(self, result: CoordinateShiftDialogResult, fieldworkshot: QgsFeature) -> None:
-        """Apply shift from dialog to fieldwork point."""
-        fields = self.layers.fieldworkshot_layer.fields()
-        easting_idx = fields.indexFromName("easting")
-        northing_idx = fields.indexFromName("northing")
-        elevation_idx = fields.indexFromName("elevation")
+        writer = BulkAttributeWriter(self.layers.fieldwork_layer, "Shift fieldwork")
+        writer.change_values(fieldwork.id(), attributes)
+        writer.apply("Failed to update fieldwork with shift.")
 
+    def _apply_shift_to_fieldworkshots(self, result: CoordinateShiftDialogResult, shots: ShotTable) -> None:
+        """Apply shift from dialog to fieldwork points."""
         _, shift, _ = result
 
         if shift:
-            if fieldworkshot[easting_idx]:
-                fieldworkshot[easting_idx] += shift[0]
-            if fieldworkshot[northing_idx]:
-                fieldworkshot[northing_idx] += shift[1]
-            if fieldworkshot[elevation_idx]:
-                fieldworkshot[elevation_idx] += shift[2]
-            assert_true(self.layers.fieldworkshot_layer.updateFeature(fieldworkshot), "Failed to update fieldwork shot with shift.")
+            for name, component in zip(SHIFT_COLUMNS, shift):
+                values = shots[name]
+                # unset (null or zero) coordinates stay unset
+                is_set = ~np.isnan(values) & (values != 0)
+                shots.set(name, is_set, values[is_set] + component)
 
     def apply_shift(self, result: CoordinateShiftDialogResult) -> None:
         """Apply shift from dialog."""
@@ -128,16 +166,10 @@ class CoordinateShiftStage:
 
         _, shift, _ = result
         if shift:
-            points: list[QgsFeature] = [
-                *self.layers.fieldworkshot_layer.getFeatures(
-                    f"""
-                    "fieldwork_id" = '{self.fieldwork['id']}'
-                    """,
-                ),  # type: ignore []
-            ]
             # apply to each point in fieldwork
-            for point in points:
-                self._apply_shift_to_fieldworkshot(result, point)
+            shots = ShotTable.load(self.layers.fieldworkshot_layer, self.fieldwork["id"])
+            self._apply_shift_to_fieldworkshots(result, shots)
+            shots.write(self.layers.fieldworkshot_layer)
 
     def calculate_hpn_shift(self) -> tuple[float, float, float] | None:  # noqa: D102
         SUM_easting = self.fieldwork["SUM_easting"]  # noqa: N806
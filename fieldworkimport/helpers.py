@@ -2,11 +2,12 @@ from contextlib import contextmanager
 from pathlib import Path
 from time import gmtime, strftime
 from timeit import default_timer as timer
-from typing import Any
+from typing import Any, Optional
 
 from qgis.core import (
     NULL,
     QgsApplication,
+    QgsFeature,
     QgsMessageLog,
     QgsProject,
     QgsVectorLayer,
@@ -16,6 +17,9 @@ from qgis.PyQt.QtWidgets import QProgressBar, QProgressDialog
 
 BASE_DIR = Path(__file__).parent
 
+DEFAULT_INSERT_CHUNK_SIZE = 1000
+"""Number of features passed to each addFeatures call by add_features_in_chunks."""
+
 
 def nullish(val: Any) -> bool:  # noqa: ANN401, D103
     return (val is None or val == NULL)
@@ -101,5 +105,100 @@ def assert_true(val: bool, fail_msg: str):
         raise ValueError(fail_msg)
 
 
+def add_features_in_chunks(
+    layer: QgsVectorLayer,
+    features: list[QgsFeature],
+    fail_msg: str,
+    chunk_size: int = DEFAULT_INSERT_CHUNK_SIZE,
+) -> None:
+    """Add features to an editable layer with one addFeatures call per chunk.
+
+    The layer's signals are blocked while inserting, so listeners (attribute table, canvas)
+    aren't notified for every feature. The layer is repainted once at the end.
+    A chunk_size under 1, like a bad insert_chunk_size setting, falls back to DEFAULT_INSERT_CHUNK_SIZE.
+    Raises a ValueError listing the chunks that failed.
+    """  # noqa: DOC501
+    if chunk_size < 1:
+        QgsMessageLog.logMessage(f"Invalid insert chunk size {chunk_size}, using {DEFAULT_INSERT_CHUNK_SIZE}.")
+        chunk_size = DEFAULT_INSERT_CHUNK_SIZE
+    failed_chunks: list[str] = []
+    layer.blockSignals(True)  # noqa: FBT003
+    try:
+        for start in range(0, len(features), chunk_size):
+            chunk = features[start:start + chunk_size]
+            if not layer.addFeatures(chunk):
+                failed_chunks.append(f"{start}-{start + len(chunk) - 1}")
+    finally:
+        layer.blockSignals(False)  # noqa: FBT003
+    layer.triggerRepaint()
+
+    if failed_chunks:
+        msg = f"{fail_msg} ({len(failed_chunks)} chunk(s) failed, features {', '.join(failed_chunks)})"
+        raise ValueError(msg)
+
+
+class BulkAttributeWriter:
+    """Collects attribute changes to an editable layer and applies them together.
+
+    Changes are applied with `changeAttributeValues`, which only touches the changed fields, unlike
+    `updateFeature` which rewrites every attribute and the geometry. All of them go in one edit command,
+    so they're undone as one step.
+
+        writer = BulkAttributeWriter(layer, "Mark shots as processed")
+        for fid in fids:
+            writer.change(fid, is_processed_idx, True)
+        writer.apply("Failed to mark fieldwork shots as processed.")
+    """
+
+    layer: QgsVectorLayer
+    description: str
+
+    def __init__(self, layer: QgsVectorLayer, description: str) -> None:  # noqa: D107
+        self.layer = layer
+        self.description = description
+        self._changes: dict[int, dict[int, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._changes)
+
+    def change(self, fid: int, field_index: int, value: Any) -> None:  # noqa: ANN401
+        """Queue a change to one attribute of a feature. Later changes to the same attribute win."""
+        self._changes.setdefault(fid, {})[field_index] = value
+
+    def change_values(self, fid: int, attributes: dict[int, Any]) -> None:
+        """Queue changes to attributes of a feature, by field index."""
+        self._changes.setdefault(fid, {}).update(attributes)
+
+    def apply(self, fail_msg: Optional[str] = None) -> int:
+        """Apply and forget the queued changes. Returns the number of features that failed to update.
+
+        Raises a ValueError with the number of failed features if there are any and fail_msg is given.
+        """  # noqa: DOC201, DOC501
+        changes = list(self._changes.items())
+        self._changes.clear()
+        if not changes:
+            return 0
+
+        n_failed = 0
+        self.layer.beginEditCommand(self.description)
+        try:
+            # the edit buffer only takes one feature's changes at a time
+            for fid, attributes in changes:
+                if not self.layer.changeAttributeValues(fid, attributes):
+                    n_failed += 1
+        except Exception:
+            self.layer.destroyEditCommand()
+            raise
+        self.layer.endEditCommand()
+        self.layer.triggerRepaint()
+
+        if n_failed:
+            QgsMessageLog.logMessage(f"{self.description}: {n_failed} of {len(changes)} features failed to update.")
+            if fail_msg is not None:
+                msg = f"{fail_msg} ({n_failed} of {len(changes)} features failed to update)"
+                raise ValueError(msg)
+        return n_failed
+
+
 def settings_key(short_name: str):
     return f"fieldwork/{short_name}"
@@ -12,10 +12,13 @@ from qgis.gui import QgisInterface
 from qgis.PyQt.QtGui import QIcon
 from qgis.utils import iface as _iface
 
+from fieldworkimport.common import refresh_validation_config
 from fieldworkimport.controlpublish.publish_controls_dialog import PublishControlsDialog
 from fieldworkimport.fwimport.import_process import FieldworkImportProcess
 from fieldworkimport.helpers import (
     BASE_DIR,
+    DEFAULT_INSERT_CHUNK_SIZE,
+    BulkAttributeWriter,
     assert_true,
     get_layers_by_table_name,
     progress_dialog,
@@ -24,6 +27,7 @@ from fieldworkimport.helpers import (
 )
 from fieldworkimport.reportgen.report_process import create_report, gather_report_variables
 from fieldworkimport.samepointshots.findsamepointshots_process import FindGlobalSamePointShots
+from fieldworkimport.schema import FieldrunShotSchema
 from fieldworkimport.ui.delete_dialog import DeleteFieldworkDialog
 from fieldworkimport.ui.generate_report_dialog import GenerateReportDialog
 from fieldworkimport.ui.import_finished_dialog import ImportFinishedDialog
@@ -47,6 +51,49 @@ class PluginInput:
     fieldrun_feature: QgsFeature | None
 
 
+def setup_default_settings() -> None:
+    """Set any plugin settings that aren't set yet to their defaults."""  # noqa: DOC501
+    s = QgsSettings()
+
+    validation_file_path = BASE_DIR / "resources" / "validation_settings.json"
+    if not validation_file_path:
+        msg = "QGIS settings is missing validation settings file path."
+        raise ValueError(msg)
+
+    validation_settings: dict = json.loads(Path(validation_file_path).read_text(encoding="utf-8"))
+    key = settings_key("hrms_tolerance")
+    if not s.contains(key) or not s.value(key):
+        s.setValue(key, validation_settings.get("hrms_tolerance", 0))
+    key = settings_key("vrms_tolerance")
+    if not s.contains(key) or not s.value(key):
+        s.setValue(key, validation_settings.get("vrms_tolerance", 0))
+    key = settings_key("same_point_tolerance")
+    if not s.contains(key) or not s.value(key):
+        s.setValue(key, validation_settings.get("same_point_tolerance", 0))
+    key = settings_key("valid_codes")
+    if not s.contains(key) or not s.value(key):
+        s.setValue(key, validation_settings.get("valid_codes", 0))
+    key = settings_key("valid_special_chars")
+    if not s.contains(key) or not s.value(key):
+        s.setValue(key, validation_settings.get("valid_special_chars", 0))
+    key = settings_key("parameterized_special_chars")
+    if not s.contains(key) or not s.value(key):
+        s.setValue(key, validation_settings.get("parameterized_special_chars", 0))
+    key = settings_key("control_point_codes")
+    if not s.contains(key) or not s.value(key):
+        s.setValue(key, validation_settings.get("control_point_codes", 0))
+    key = settings_key("debug_mode")
+    if not s.contains(key):
+        s.setValue(key, False)  # noqa: FBT003
+    key = settings_key("consecutive_merge_only")
+    if not s.contains(key):
+        s.setValue(key, False)  # noqa: FBT003
+    key = settings_key("insert_chunk_size")
+    if not s.contains(key) or not s.value(key):
+        s.setValue(key, DEFAULT_INSERT_CHUNK_SIZE)
+    refresh_validation_config()
+
+
 class Plugin:
     """QGIS Plugin Implementation."""
 
@@ -185,39 +232,8 @@ class Plugin:
             iface.removeToolBarIcon(action)
 
     def _setup_settings(self) -> None:  # noqa: PLR6301
-        """Setup the plugin settings for the first time."""  # noqa: D401, DOC501
-        s = QgsSettings()
-
-        validation_file_path = BASE_DIR / "resources" / "validation_settings.json"
-        if not validation_file_path:
-            msg = "QGIS settings is missing validation settings file path."
-            raise ValueError(msg)
-
-        validation_settings: dict = json.loads(Path(validation_file_path).read_text(encoding="utf-8"))
-        key = settings_key("hrms_tolerance")
-        if not s.contains(key) or not s.value(key):
-            s.setValue(key, validation_settings.get("hrms_tolerance", 0))
-        key = settings_key("vrms_tolerance")
-        if not s.contains(key) or not s.value(key):
-            s.setValue(key, validation_settings.get("vrms_tolerance", 0))
-        key = settings_key("same_point_tolerance")
-        if not s.contains(key) or not s.value(key):
-            s.setValue(key, validation_settings.get("same_point_tolerance", 0))
-        key = settings_key("valid_codes")
-        if not s.contains(key) or not s.value(key):
-            s.setValue(key, validation_settings.get("valid_codes", 0))
-        key = settings_key("valid_special_chars")
-        if not s.contains(key) or not s.value(key):
-            s.setValue(key, validation_settings.get("valid_special_chars", 0))
-        key = settings_key("parameterized_special_chars")
-        if not s.contains(key) or not s.value(key):
-            s.setValue(key, validation_settings.get("parameterized_special_chars", 0))
-        key = settings_key("control_point_codes")
-        if not s.contains(key) or not s.value(key):
-            s.setValue(key, validation_settings.get("control_point_codes", 0))
-        key = settings_key("debug_mode")
-        if not s.contains(key):
-            s.setValue(key, False)  # noqa: FBT003
+        """Setup the plugin settings for the first time."""  # noqa: D401
+        setup_default_settings()
 
     def start_import(self) -> None:
         """Start the import process by showing import dialog."""
@@ -404,11 +420,13 @@ class Plugin:
 
             # remove matches from fieldrun shots
             shots: list[QgsFeature] = [*fieldworkshot_layer.getFeatures(f"\"fieldwork_id\" = '{fieldwork.attribute('id')}'")]  # type: ignore
+            matched_idx = FieldrunShotSchema.of(fieldrunshot_layer).matched_fieldwork_shot_id.index
+            writer = BulkAttributeWriter(fieldrunshot_layer, "Remove fieldwork matches")
             for shot in shots:
                 matched_fieldrun_shot = next(fieldrunshot_layer.getFeatures(f"matched_fieldwork_shot_id = '{shot['id']}'"), None)
                 if matched_fieldrun_shot:
-                    matched_fieldrun_shot["matched_fieldwork_shot_id"] = None
-                    fieldrunshot_layer.updateFeature(matched_fieldrun_shot)
+                    writer.change(matched_fieldrun_shot.id(), matched_idx, None)
+            writer.apply()
             sp(50)
             # delete features
             assert_true(fieldworkshot_layer.deleteFeatures([shot.id() for shot in shots]), "Failed to delete fieldworkshots.")
@@ -0,0 +1,91 @@
+"""Fixed-radius neighbour search over many points, for many query points at once.
+
+Points are put in a grid of cells as wide as the radius, so each query only needs the points of its
+own cell and the 8 around it. Every query is answered in the same few NumPy operations.
+
+    index = RadiusIndex(x, y, radius=10)
+    neighbours, distances = index.query(query_x, query_y)  # nearest first, for each query point
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+# a cell and the 8 around it
+_NEIGHBOUR_CELLS = tuple((dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+
+
+class RadiusIndex:
+    """Indexes of points, in a grid of cells as wide as the radius.
+
+    Coordinates must be in a projected CRS, the distances are plain euclidean ones.
+    Points with a missing coordinate are left out.
+    """
+
+    radius: float
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, radius: float) -> None:  # noqa: D107
+        self.radius = radius
+        self._cell_size = radius if radius > 0 else 1.0
+        self._x = np.asarray(x, dtype=np.float64)
+        self._y = np.asarray(y, dtype=np.float64)
+
+        # sort the points by cell, each cell's points are then a slice of _cell_points
+        indexed = np.flatnonzero(~np.isnan(self._x) & ~np.isnan(self._y))
+        cell_x, cell_y = self._cells(self._x[indexed], self._y[indexed])
+        order = np.lexsort((cell_y, cell_x))
+        self._cell_points = indexed[order]
+        keys = np.stack((cell_x[order], cell_y[order]), axis=1)
+        is_first = np.ones(len(keys), dtype=np.bool_)
+        is_first[1:] = (keys[1:] != keys[:-1]).any(axis=1)
+        self._cell_starts = np.append(np.flatnonzero(is_first), len(keys))
+        self._cell_index = {key: cell for cell, key in enumerate(map(tuple, keys[is_first].tolist()))}
+
+    def __len__(self) -> int:
+        return len(self._cell_points)
+
+    def _cells(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return (
+            np.floor(x / self._cell_size).astype(np.int64),
+            np.floor(y / self._cell_size).astype(np.int64),
+        )
+
+    def query(self, x: np.ndarray, y: np.ndarray) -> tuple[list[np.ndarray], list[np.ndarray]]:
+        """Return, for each query point, the indexes of the points within the radius and their distances.
+
+        Both are nearest first.
+        """  # noqa: DOC201
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if not len(x):
+            return [], []
+        queries = np.flatnonzero(~np.isnan(x) & ~np.isnan(y))
+        cell_x, cell_y = self._cells(x[queries], y[queries])
+        sizes = np.diff(self._cell_starts)
+
+        # every pair of a query and a point of a cell around it
+        pair_queries: list[np.ndarray] = []
+        pair_points: list[np.ndarray] = []
+        for dx, dy in _NEIGHBOUR_CELLS:
+            cells = np.array(
+                [self._cell_index.get((cx + dx, cy + dy), -1) for cx, cy in zip(cell_x.tolist(), cell_y.tolist())],
+                dtype=np.intp,
+            )
+            has_cell = np.flatnonzero(cells >= 0)
+            cells = cells[has_cell]
+            n_points = sizes[cells]
+            local = np.arange(n_points.sum()) - np.repeat(np.cumsum(n_points) - n_points, n_points)
+            pair_queries.append(np.repeat(queries[has_cell], n_points))
+            pair_points.append(self._cell_points[np.repeat(self._cell_starts[cells], n_points) + local])
+        query_of_pair = np.concatenate(pair_queries)
+        point_of_pair = np.concatenate(pair_points)
+
+        distances = np.hypot(self._x[point_of_pair] - x[query_of_pair], self._y[point_of_pair] - y[query_of_pair])
+        within = distances <= self.radius
+        query_of_pair, point_of_pair, distances = query_of_pair[within], point_of_pair[within], distances[within]
+
+        # group by query, nearest first
+        order = np.lexsort((distances, query_of_pair))
+        query_of_pair, point_of_pair, distances = query_of_pair[order], point_of_pair[order], distances[order]
+        splits = np.searchsorted(query_of_pair, np.arange(1, len(x)))
+        return np.split(point_of_pair, splits), np.split(distances, splits)
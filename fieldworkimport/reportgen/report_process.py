@@ -1,6 +1,5 @@
 import base64
 import datetime
-import sqlite3
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
@@ -12,7 +11,10 @@ from qgis.utils import iface as _iface
 
 iface: QgisInterface = _iface  # type: ignore
 
+from fieldworkimport.fwimport.parse_cache import parse_cache
+from fieldworkimport.fwimport.parse_crdb_file import parse_crdb_file
 from fieldworkimport.helpers import BASE_DIR, get_layers_by_table_name, nullish
+from fieldworkimport.schema import FieldrunShotSchema, FieldworkShotSchema
 
 if TYPE_CHECKING:
     from fieldworkimport.plugin import PluginInput
@@ -105,7 +107,9 @@ def gather_report_variables(fieldwork_feature: QgsFeature, plugin_input: "Plugin
     }
 
     all_fieldworkshots: list[QgsFeature] = [*fieldworkshot_layer.getFeatures(f"fieldwork_id = '{fieldwork_id}'")]  # type: ignore
-    fieldworkshot_ids = [f["id"] for f in all_fieldworkshots]
+    fw_schema = FieldworkShotSchema.of(fieldworkshot_layer)
+    fr_schema = FieldrunShotSchema.of(fieldrunshot_layer)
+    fieldworkshot_ids = [fw_schema.id.get(f) for f in all_fieldworkshots]
 
     top_level_shots = []
     top_level_shot_names = []
@@ -116,8 +120,8 @@ def gather_report_variables(fieldwork_feature: QgsFeature, plugin_input: "Plugin
     QgsMessageLog.logMessage("build map of children by parent_id")
     child_by_parent_id: dict[str, list[QgsFeature]] = {}
     for fw_shot in all_fieldworkshots:
-        QgsMessageLog.logMessage(f"- {fw_shot['name']}")
-        parent_point_id = fw_shot["parent_point_id"]
+        QgsMessageLog.logMessage(f"- {fw_schema.name.get(fw_shot)}")
+        parent_point_id = fw_schema.parent_point_id.get(fw_shot)
         if not nullish(parent_point_id):
             if parent_point_id not in child_by_parent_id:
                 child_by_parent_id[parent_point_id] = []
@@ -126,14 +130,14 @@ def gather_report_variables(fieldwork_feature: QgsFeature, plugin_input: "Plugin
     # iterate over all top-level fieldwork shots to build out report
     QgsMessageLog.logMessage("iterate over all top-level fieldwork shots to build out report")
     for fw_shot in all_fieldworkshots:
-        fw_shot_id = fw_shot["id"]
-        parent_point_id = fw_shot["parent_point_id"]
+        fw_shot_id = fw_schema.id.get(fw_shot)
+        parent_point_id = fw_schema.parent_point_id.get(fw_shot)
         # get all top level shots w.r.t. this fieldwork
         # meaning its a top level shot if the parent point isn't set or isn't from this fieldwork
         if parent_point_id in fieldworkshot_ids:
             continue
 
-        name = fw_shot["name"]
+        name = fw_schema.name.get(fw_shot)
 
         # build out top level shots (a.k.a. final shots) section of report
         top_level_shots.append(fw_shot)
@@ -150,16 +154,16 @@ def gather_report_variables(fieldwork_feature: QgsFeature, plugin_input: "Plugin
         if matched_fr_shot is None:
             continue
 
-        fr_shot_name = matched_fr_shot["name"]
-        fr_shot_id = matched_fr_shot["id"]
+        fr_shot_name = fr_schema.name.get(matched_fr_shot)
+        fr_shot_id = fr_schema.id.get(matched_fr_shot)
 
         # skip rest of loop body if it's not a control
-        if matched_fr_shot["type"] != "Control":
+        if fr_schema.type.get(matched_fr_shot) != "Control":
             continue
 
-        published_by_fieldwork_id = matched_fr_shot["control_published_by_fieldwork_id"]
+        published_by_fieldwork_id = fr_schema.control_published_by_fieldwork_id.get(matched_fr_shot)
         # check if the control point has an easting as a test to see if it's been published yet
-        has_been_published = not nullish(matched_fr_shot["control_easting"])
+        has_been_published = not nullish(fr_schema.control_easting.get(matched_fr_shot))
 
         if not has_been_published:
             continue
@@ -185,7 +189,7 @@ def gather_report_variables(fieldwork_feature: QgsFeature, plugin_input: "Plugin
     shift_control_ids_cause = ",".join([f"'{i}'" for i in shift_control_ids])
     shift_controls: list[QgsFeature] = [*fieldrunshot_layer.getFeatures(f"id in ({shift_control_ids_cause})")]  # type: ignore
     for shift_control in shift_controls:
-        QgsMessageLog.logMessage(f"- {shift_control['name']}")
+        QgsMessageLog.logMessage(f"- {fr_schema.name.get(shift_control)}")
         report["coordinate_shift_controls"].append(shift_control)
 
     report["shots_summary_str"] = summary_str(top_level_shot_names)
@@ -196,7 +200,7 @@ def gather_report_variables(fieldwork_feature: QgsFeature, plugin_input: "Plugin
         # iterate over fieldrun shots to build out fieldrun section
         all_fieldrunshots: list[QgsFeature] = [*fieldrunshot_layer.getFeatures(f"field_run_id = {fieldrun_id}")]  # type: ignore
         for fr_shot in all_fieldrunshots:
-            fr_shot_id = fr_shot["id"]
+            fr_shot_id = fr_schema.id.get(fr_shot)
             fr_shot_images: list[QgsFeature] = [*fieldrunshotimage_layer.getFeatures(f"fieldrun_shot_id = '{fr_shot_id}'")]  # type: ignore # noqa: E501
             report["fieldrun_shots"].append({
                 "shot": fr_shot,
@@ -208,12 +212,9 @@ def gather_report_variables(fieldwork_feature: QgsFeature, plugin_input: "Plugin
     # build out detailed report stuff (raw data)
     if plugin_input:
         report["crdb_name"] = Path(plugin_input.crdb_path).name
-        crdb_connection = sqlite3.connect(plugin_input.crdb_path)
-        crdb_connection.row_factory = sqlite3.Row
-        cursor = crdb_connection.cursor()
-        crdb_query = cursor.execute("SELECT * FROM Coordinates")
-        crdb_rows = crdb_query.fetchall()
-        report["crdb_rows"] = crdb_rows
+        # shares the parse done during the import, through the same cache, if the file hasn't changed since
+        crdb_path = Path(plugin_input.crdb_path)
+        report["crdb_rows"] = parse_cache().get_or_parse("crdb", crdb_path, lambda: parse_crdb_file(crdb_path))["rows"]
 
         report["rw5_name"] = Path(plugin_input.rw5_path).name
         report["rw5_raw"] = Path(plugin_input.rw5_path).read_text(encoding="iso-8859-1")
@@ -2,8 +2,6 @@ from collections.abc import Generator
 from typing import Any
 
 from qgis.core import (
-    QgsCoordinateReferenceSystem,
-    QgsCoordinateTransform,
     QgsFeature,
     QgsMapLayer,
     QgsMessageLog,
@@ -17,7 +15,9 @@ from qgis.utils import iface as _iface
 
 from fieldworkimport.common import get_average_point, parent_point_name
 from fieldworkimport.exceptions import AbortError
-from fieldworkimport.helpers import assert_true, get_layers_by_table_name, nullish, timed
+from fieldworkimport.helpers import BulkAttributeWriter, assert_true, get_layers_by_table_name, nullish, timed
+from fieldworkimport.schema import FieldrunShotSchema, FieldworkShotSchema
+from fieldworkimport.transforms import WEB_MERCATOR_SRID, get_transform
 from fieldworkimport.ui.possible_same_point_shot_dialog import PossibleSamePointShotDialog
 from fieldworkimport.ui.recalculate_shot_dialog import RecalculateShotDialog
 
@@ -53,6 +53,8 @@ class FindGlobalSamePointShots:
     distance_threshold: float
     do_nothing_ids: set[int]
     """Ids of shots that we chose to do nothing with. We remember this so we don't spam user with same question."""
+    fw_schema: FieldworkShotSchema
+    fr_schema: FieldrunShotSchema
 
     def __init__(self, distance_threshold: float = 0.075) -> None:
         layer = iface.activeLayer()
@@ -71,6 +73,8 @@ class FindGlobalSamePointShots:
         self.fieldrunshot_layer = get_layers_by_table_name("public", "sites_fieldrunshot", require_geom=True, raise_exception=True, no_filter=True)[0]
         self.distance_threshold = distance_threshold
         self.do_nothing_ids = set()
+        self.fw_schema = FieldworkShotSchema.of(self.layer)
+        self.fr_schema = FieldrunShotSchema.of(self.fieldrunshot_layer)
 
     def __get_selection(self) -> list[QgsFeature]:
         features = self.layer.selectedFeatures()
@@ -91,9 +95,8 @@ class FindGlobalSamePointShots:
         assert qgsproj is not None
 
         # prepare crs transformation so that we can use meters in calculation
-        layer_crs = self.layer.crs()
-        projected_crs = QgsCoordinateReferenceSystem("EPSG:3857")  # Web Mercator so we can use meters
-        transform_to_m = QgsCoordinateTransform(layer_crs, projected_crs, qgsproj.transformContext())
+        # Web Mercator so we can use meters
+        transform_to_m = get_transform(self.layer.crs(), WEB_MERCATOR_SRID, qgsproj.transformContext())
 
         # keep track of visited neighbors so that we don't try to action them twice in same iteration
         # this is important because, unless the user chooses the do nothing option, the second time we see
@@ -156,9 +159,12 @@ class FindGlobalSamePointShots:
 
         child_matched_fr_shot = next(self.fieldrunshot_layer.getFeatures(f"matched_fieldwork_shot_id = '{child['id']}'"), None)
         if child_matched_fr_shot:
-            child_matched_fr_shot["matched_fieldwork_shot_id"] = parent["id"]
-            assert_true(self.fieldrunshot_layer.updateFeature(child_matched_fr_shot), "Failed to propagate matched fieldrun shot.")
-        assert_true(self.layer.updateFeature(child), "Failed to parent child to parent shot.")
+            fr_writer = BulkAttributeWriter(self.fieldrunshot_layer, "Propagate matched fieldrun shot")
+            fr_writer.change(child_matched_fr_shot.id(), self.fr_schema.matched_fieldwork_shot_id.index, parent["id"])
+            fr_writer.apply("Failed to propagate matched fieldrun shot.")
+        writer = BulkAttributeWriter(self.layer, "Parent shot")
+        writer.change(child.id(), self.fw_schema.parent_point_id.index, parent["id"])
+        writer.apply("Failed to parent child to parent shot.")
 
     def __prompt_user_with_recalculate(self, point_1: QgsFeature, point_2: QgsFeature) -> None:
         """Ask the user which points to include in the new average shot, then create it.
@@ -194,26 +200,26 @@ class FindGlobalSamePointShots:
         avg_shot["fieldwork_id"] = point_1["fieldwork_id"]
 
         # for geopackage testing, make sure we're not using a fid from a child point
-        idx = self.layer.fields().indexFromName("fid")
-        if idx is not None:
-            avg_shot[idx] = None
-
-        p1_matched_fr_shot = next(self.fieldrunshot_layer.getFeatures(f"matched_fieldwork_shot_id = '{point_1['id']}'"), None)
-        if p1_matched_fr_shot:
-            p1_matched_fr_shot["matched_fieldwork_shot_id"] = avg_shot["id"]
-            assert_true(self.fieldrunshot_layer.updateFeature(p1_matched_fr_shot), "Failed to update point 1's matched fieldrun shot.")
-        else:
-            p2_matched_fr_shot = next(self.fieldrunshot_layer.getFeatures(f"matched_fieldwork_shot_id = '{point_2['id']}'"), None)
-            if p2_matched_fr_shot:
-                p2_matched_fr_shot["matched_fieldwork_shot_id"] = avg_shot["id"]
-                assert_true(self.fieldrunshot_layer.updateFeature(p2_matched_fr_shot), "Failed to update point 1's matched fieldrun shot.")
+        if self.fw_schema.has_field("fid"):
+            self.fw_schema.column("fid").set(avg_shot, None)
+
+        matched_fr_shot = next(self.fieldrunshot_layer.getFeatures(f"matched_fieldwork_shot_id = '{point_1['id']}'"), None)
+        if not matched_fr_shot:
+            matched_fr_shot = next(self.fieldrunshot_layer.getFeatures(f"matched_fieldwork_shot_id = '{point_2['id']}'"), None)
+        if matched_fr_shot:
+            fr_writer = BulkAttributeWriter(self.fieldrunshot_layer, "Match fieldrun shot to average shot")
+            fr_writer.change(matched_fr_shot.id(), self.fr_schema.matched_fieldwork_shot_id.index, avg_shot["id"])
+            fr_writer.apply("Failed to update the matched fieldrun shot.")
 
         # parent children to new shot and save changes
         assert_true(self.layer.addFeature(avg_shot), "Failed to add average shot.")
         point_1["parent_point_id"] = avg_shot["id"]
         point_2["parent_point_id"] = avg_shot["id"]
-        assert_true(self.layer.updateFeature(point_1), "Failed to parent point 1 to average shot.")
-        assert_true(self.layer.updateFeature(point_2), "Failed to parent point 2 to average shot.")
+        writer = BulkAttributeWriter(self.layer, "Parent shots to average shot")
+        parent_point_id = self.fw_schema.parent_point_id
+        writer.change(point_1.id(), parent_point_id.index, avg_shot["id"])
+        writer.change(point_2.id(), parent_point_id.index, avg_shot["id"])
+        writer.apply("Failed to parent points to average shot.")
 
     def __prompt_user_with_same_point(self, point_1: QgsFeature, point_2: QgsFeature) -> None:
         """Prompt user with options on how to handle the merge.
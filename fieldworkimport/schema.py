@@ -0,0 +1,190 @@
+"""Field indexes of the plugin's tables, resolved once per layer.
+
+`QgsFeature["name"]` and `fields.indexFromName("name")` look the field up by name on every call.
+A schema resolves each field's index the first time it's used and keeps it until the layer's fields change.
+
+    shots = FieldworkShotSchema.of(fieldworkshot_layer)
+    easting = shots.easting  # resolve once, outside the loop
+    for shot in points:
+        easting.set(shot, easting.get(shot) + shift)
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, ClassVar, Generic, Optional, TypeVar, overload
+
+from PyQt5.QtCore import QDateTime
+
+if TYPE_CHECKING:
+    from qgis.core import QgsFeature, QgsVectorLayer
+
+_T = TypeVar("_T")
+_S = TypeVar("_S", bound="LayerSchema")
+
+
+class Column(Generic[_T]):
+    """Field of a layer, read and written by index."""
+
+    __slots__ = ("index", "name")
+
+    def __init__(self, name: str, index: int) -> None:  # noqa: D107
+        self.name = name
+        self.index = index
+
+    def get(self, feature: QgsFeature) -> _T:  # noqa: D102
+        return feature.attribute(self.index)
+
+    def set(self, feature: QgsFeature, value: _T) -> None:  # noqa: D102
+        feature.setAttribute(self.index, value)
+
+
+class ColumnDescriptor(Generic[_T]):
+    """Declares a field on a schema. Reading it from a schema instance returns the resolved `Column`."""
+
+    def __init__(self, name: str = "") -> None:  # noqa: D107
+        self.name = name
+
+    def __set_name__(self, owner: type, attr_name: str) -> None:
+        if not self.name:
+            self.name = attr_name
+
+    @overload
+    def __get__(self, schema: None, owner: type) -> ColumnDescriptor[_T]: ...
+    @overload
+    def __get__(self, schema: LayerSchema, owner: type) -> Column[_T]: ...
+    def __get__(self, schema: LayerSchema | None, owner: type) -> Any:  # noqa: ANN401
+        if schema is None:
+            return self
+        return schema.column(self.name)
+
+
+class LayerSchema:
+    """Field indexes of a layer, dropped whenever a field is added to or deleted from the layer.
+
+    Use `of(layer)` to get the shared schema of a layer.
+    """
+
+    _schemas: ClassVar[dict[tuple[type, str], LayerSchema]] = {}
+
+    layer: QgsVectorLayer
+
+    def __init__(self, layer: QgsVectorLayer) -> None:  # noqa: D107
+        self.layer = layer
+        self._columns: dict[str, Column] = {}
+        layer.attributeAdded.connect(self.invalidate)
+        layer.attributeDeleted.connect(self.invalidate)
+
+    @classmethod
+    def of(cls: type[_S], layer: QgsVectorLayer) -> _S:
+        """Return the schema of a layer, building it on first use."""  # noqa: DOC201
+        key = (cls, layer.id())
+        schema = LayerSchema._schemas.get(key)
+        if schema is None or schema.layer is not layer:
+            schema = cls(layer)
+            LayerSchema._schemas[key] = schema
+            layer.willBeDeleted.connect(lambda: LayerSchema._schemas.pop(key, None))
+        return schema  # type: ignore []
+
+    def invalidate(self, *_args: object) -> None:
+        """Forget the resolved indexes, they're resolved again on next use."""
+        self._columns.clear()
+
+    def column(self, name: str) -> Column:
+        """Return the column for a field name."""  # noqa: DOC201, DOC501
+        column = self._columns.get(name)
+        if column is None:
+            index = self.layer.fields().indexFromName(name)
+            if index < 0:
+                msg = f"Layer '{self.layer.name()}' has no field '{name}'."
+                raise ValueError(msg)
+            column = Column(name, index)
+            self._columns[name] = column
+        return column
+
+    def has_field(self, name: str) -> bool:  # noqa: D102
+        return self.layer.fields().indexFromName(name) >= 0
+
+
+class FieldworkSchema(LayerSchema):
+    """Fields of sites_fieldwork."""
+
+    id = ColumnDescriptor[str]()
+    field_run_id = ColumnDescriptor[Optional[int]]()
+    name = ColumnDescriptor[str]()
+    note = ColumnDescriptor[str]()
+    RW5_datetime = ColumnDescriptor[QDateTime]()
+    LOC_measured_easting = ColumnDescriptor[Optional[float]]()
+    LOC_measured_northing = ColumnDescriptor[Optional[float]]()
+    LOC_measured_elevation = ColumnDescriptor[Optional[float]]()
+    LOC_grid_easting = ColumnDescriptor[Optional[float]]()
+    LOC_grid_northing = ColumnDescriptor[Optional[float]]()
+    LOC_grid_elevation = ColumnDescriptor[Optional[float]]()
+    LOC_description = ColumnDescriptor[str]()
+    REF_easting = ColumnDescriptor[Optional[float]]()
+    REF_northing = ColumnDescriptor[Optional[float]]()
+    REF_elevation = ColumnDescriptor[Optional[float]]()
+    SUM_easting = ColumnDescriptor[Optional[float]]()
+    SUM_northing = ColumnDescriptor[Optional[float]]()
+    SUM_elevation = ColumnDescriptor[Optional[float]]()
+    SUM_orthometric_system = ColumnDescriptor[str]()
+    SUM_orthometric_model = ColumnDescriptor[str]()
+    SUM_geoid_seperation = ColumnDescriptor[Optional[float]]()
+    equipment_string = ColumnDescriptor[str]()
+    shift_type = ColumnDescriptor[str]()
+    shift_control_ids = ColumnDescriptor[str]()
+    easting_shift = ColumnDescriptor[Optional[float]]()
+    northing_shift = ColumnDescriptor[Optional[float]]()
+    elevation_shift = ColumnDescriptor[Optional[float]]()
+
+
+class FieldworkShotSchema(LayerSchema):
+    """Fields of sites_fieldworkshot."""
+
+    id = ColumnDescriptor[str]()
+    fieldwork_id = ColumnDescriptor[str]()
+    parent_point_id = ColumnDescriptor[Optional[str]]()
+    name = ColumnDescriptor[str]()
+    datetime = ColumnDescriptor[QDateTime]()
+    description = ColumnDescriptor[str]()
+    full_code = ColumnDescriptor[str]()
+    code = ColumnDescriptor[str]()
+    original_code = ColumnDescriptor[str]()
+    northing = ColumnDescriptor[float]()
+    easting = ColumnDescriptor[float]()
+    elevation = ColumnDescriptor[float]()
+    number_of_satellites = ColumnDescriptor[Optional[int]]()
+    age_of_corrections = ColumnDescriptor[Optional[float]]()
+    status = ColumnDescriptor[Optional[str]]()
+    HRMS = ColumnDescriptor[Optional[float]]()
+    VRMS = ColumnDescriptor[Optional[float]]()
+    PDOP = ColumnDescriptor[Optional[float]]()
+    HDOP = ColumnDescriptor[Optional[float]]()
+    VDOP = ColumnDescriptor[Optional[float]]()
+    TDOP = ColumnDescriptor[Optional[float]]()
+    GDOP = ColumnDescriptor[Optional[float]]()
+    rod_height = ColumnDescriptor[Optional[float]]()
+    instrument_height = ColumnDescriptor[Optional[float]]()
+    instrument_type = ColumnDescriptor[Optional[str]]()
+    was_overwritten_flag = ColumnDescriptor[bool]()
+    bad_hrms_flag = ColumnDescriptor[bool]()
+    bad_vrms_flag = ColumnDescriptor[bool]()
+    bad_fixed_status_flag = ColumnDescriptor[bool]()
+    bad_code_flag = ColumnDescriptor[bool]()
+    is_processed = ColumnDescriptor[bool]()
+
+
+class FieldrunShotSchema(LayerSchema):
+    """Fields of sites_fieldrunshot."""
+
+    id = ColumnDescriptor[str]()
+    field_run_id = ColumnDescriptor[Optional[int]]()
+    name = ColumnDescriptor[str]()
+    type = ColumnDescriptor[str]()
+    description = ColumnDescriptor[str]()
+    matched_fieldwork_shot_id = ColumnDescriptor[Optional[str]]()
+    control_coordinate_system_id = ColumnDescriptor[Optional[int]]()
+    control_easting = ColumnDescriptor[Optional[float]]()
+    control_northing = ColumnDescriptor[Optional[float]]()
+    control_elevation_system_id = ColumnDescriptor[Optional[int]]()
+    control_elevation = ColumnDescriptor[Optional[float]]()
+    control_published_by_fieldwork_id = ColumnDescriptor[Optional[str]]()
@@ -0,0 +1,330 @@
+"""Column-oriented copy of the fieldwork shots the import stages work on.
+
+The stages used to fetch every shot as a `QgsFeature` and read or write it one attribute at a time.
+A `ShotTable` reads the attributes the stages need in one pass over the layer, keeps them in NumPy
+arrays, and writes back only the values that changed.
+
+    table = ShotTable.load(fieldworkshot_layer, fieldwork_id)
+    table.set("bad_hrms_flag", table["HRMS"] > hrms_tolerance, True)
+    table.write(fieldworkshot_layer)
+
+Null numbers are NaN, null text is None.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+import numpy as np
+from qgis.core import Qgis, QgsFeature, QgsFeatureRequest, QgsVectorLayer
+
+from fieldworkimport.helpers import BulkAttributeWriter, assert_true, nullish
+from fieldworkimport.schema import FieldworkShotSchema
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+FLOAT_COLUMNS = (
+    "easting",
+    "northing",
+    "elevation",
+    "HRMS",
+    "VRMS",
+    "PDOP",
+    "HDOP",
+    "VDOP",
+    "TDOP",
+    "GDOP",
+)
+FLAG_COLUMNS = (
+    "bad_hrms_flag",
+    "bad_vrms_flag",
+    "bad_fixed_status_flag",
+    "bad_code_flag",
+)
+TEXT_COLUMNS = (
+    "id",
+    "parent_point_id",
+    "name",
+    "code",
+    "full_code",
+    "description",
+    "status",
+)
+COORDINATE_COLUMNS = ("northing", "easting", "elevation")
+QUALITY_COLUMNS = ("HRMS", "VRMS", "PDOP", "HDOP", "VDOP", "TDOP", "GDOP")
+AVERAGE_COLUMNS = (*COORDINATE_COLUMNS, *QUALITY_COLUMNS)
+RESIDUAL_COLUMNS = ("easting", "northing", "elevation")
+"""Order of the residuals, each the parent's coordinate minus the child's."""
+
+_NUMERIC_DTYPE = np.dtype(
+    [("fid", np.int64)]
+    + [(name, np.float64) for name in FLOAT_COLUMNS]
+    + [(name, np.bool_) for name in FLAG_COLUMNS],
+)
+_AVERAGE_DTYPE = np.dtype([(name, np.float64) for name in AVERAGE_COLUMNS])
+_IS_COORDINATE = np.array([name in COORDINATE_COLUMNS for name in AVERAGE_COLUMNS])
+_RESIDUAL_INDEXES = np.array([AVERAGE_COLUMNS.index(name) for name in RESIDUAL_COLUMNS])
+_ALL_ROWS = slice(None)
+
+
+def _to_float(value: Any) -> float:  # noqa: ANN401
+    return math.nan if nullish(value) else float(value)
+
+
+def _to_flag(value: Any) -> bool:  # noqa: ANN401
+    # flags come back as "true" from some providers
+    return value in {True, "true"}
+
+
+def _to_text(value: Any) -> str | None:  # noqa: ANN401
+    return None if nullish(value) else value
+
+
+def _to_attribute(value: Any) -> Any:  # noqa: ANN401
+    if isinstance(value, np.floating):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    return value
+
+
+class GroupAverages(NamedTuple):
+    """Averages of groups of shots, and how far each shot is from its group's average."""
+
+    averages: np.ndarray
+    """One record per group, with the coordinate and quality columns."""
+    rows: np.ndarray
+    """Table rows of the groups, one group after the other."""
+    starts: np.ndarray
+    """Where each group's rows start in rows, followed by the number of rows."""
+    residuals: np.ndarray
+    """Average minus shot easting, northing and elevation, one line per row of rows."""
+
+    def average(self, group: int) -> dict[str, float]:  # noqa: D102
+        record = self.averages[group]
+        return {name: float(record[name]) for name in self.averages.dtype.names}
+
+    def group_residuals(self, group: int) -> np.ndarray:  # noqa: D102
+        return self.residuals[self.starts[group]:self.starts[group + 1]]
+
+
+class RunningAverage:
+    """Average of a group of shots that changes as shots are added or removed, each in constant time.
+
+    Averages like `ShotTable.average_groups`, from lines of `ShotTable.average_values`. The sums and counts
+    are kept instead of the average, a shot's values are added to them or taken off.
+    """
+
+    count: int
+
+    def __init__(self, values: Iterable[np.ndarray] = ()) -> None:  # noqa: D107
+        self.count = 0
+        self._sums = np.zeros(len(AVERAGE_COLUMNS))
+        # coordinates always count, quality values only when they're set
+        self._set_counts = np.zeros(len(AVERAGE_COLUMNS), dtype=np.intp)
+        # a missing coordinate makes the average's missing too
+        self._nan_counts = np.zeros(len(AVERAGE_COLUMNS), dtype=np.intp)
+        for shot_values in values:
+            self.add(shot_values)
+
+    @staticmethod
+    def _split(values: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        is_nan = np.isnan(values)
+        is_set = _IS_COORDINATE | (~is_nan & (values != 0))
+        return np.where(is_set & ~is_nan, values, 0), is_set, is_nan & _IS_COORDINATE
+
+    def add(self, values: np.ndarray) -> None:
+        """Add a shot to the average."""
+        totals, is_set, is_nan = self._split(values)
+        self._sums += totals
+        self._set_counts += is_set
+        self._nan_counts += is_nan
+        self.count += 1
+
+    def remove(self, values: np.ndarray) -> None:
+        """Take a shot added before off the average."""
+        assert_true(self.count > 0, "Can't remove a shot from an empty average.")
+        totals, is_set, is_nan = self._split(values)
+        self._sums -= totals
+        self._set_counts -= is_set
+        self._nan_counts -= is_nan
+        self.count -= 1
+        if not self.count:
+            # don't carry rounding errors over to the next shots
+            self._sums[:] = 0
+
+    def _vector(self) -> np.ndarray:
+        assert_true(self.count > 0, "Can't average an empty group of shots.")
+        vector = self._sums / np.maximum(self._set_counts, 1)
+        vector[self._nan_counts > 0] = np.nan
+        return vector
+
+    def average(self) -> dict[str, float]:
+        """Return the average coordinates and quality values."""  # noqa: DOC201
+        return dict(zip(AVERAGE_COLUMNS, self._vector().tolist()))
+
+    def residuals(self, values: np.ndarray) -> list[float]:
+        """Return the average minus a shot's easting, northing and elevation."""  # noqa: DOC201
+        return (self._vector()[_RESIDUAL_INDEXES] - values[_RESIDUAL_INDEXES]).tolist()
+
+
+class ShotTable:
+    """Fieldwork shot attributes, one array per column and one row per shot.
+
+    Numbers and flags live in one structured array, text in object arrays.
+    Change values with `set` so `write` knows what to send back to the layer.
+    """
+
+    numeric: np.ndarray
+    text: dict[str, np.ndarray]
+
+    def __init__(self, numeric: np.ndarray, text: dict[str, np.ndarray]) -> None:  # noqa: D107
+        self.numeric = numeric
+        self.text = text
+        self._changed: dict[str, np.ndarray] = {}
+        self._row_by_fid: dict[int, int] | None = None
+
+    @classmethod
+    def from_features(cls, layer: QgsVectorLayer, features: Iterable[QgsFeature]) -> ShotTable:
+        """Build a table from features of the fieldwork shot layer."""  # noqa: DOC201
+        schema = FieldworkShotSchema.of(layer)
+        float_indexes = [schema.column(name).index for name in FLOAT_COLUMNS]
+        flag_indexes = [schema.column(name).index for name in FLAG_COLUMNS]
+        text_indexes = [schema.column(name).index for name in TEXT_COLUMNS]
+
+        numeric_rows: list[tuple] = []
+        text_rows: list[list[Any]] = []
+        for feature in features:
+            attributes = feature.attributes()
+            numeric_rows.append((
+                feature.id(),
+                *(_to_float(attributes[i]) for i in float_indexes),
+                *(_to_flag(attributes[i]) for i in flag_indexes),
+            ))
+            text_rows.append([_to_text(attributes[i]) for i in text_indexes])
+
+        numeric = np.array(numeric_rows, dtype=_NUMERIC_DTYPE)
+        text = {}
+        for column, name in enumerate(TEXT_COLUMNS):
+            values = np.empty(len(text_rows), dtype=object)
+            values[:] = [row[column] for row in text_rows]
+            text[name] = values
+        return cls(numeric, text)
+
+    @classmethod
+    def load(cls, layer: QgsVectorLayer, fieldwork_id: str | int, *, order_by: str | None = None) -> ShotTable:
+        """Read the shots of a fieldwork in one request, without geometries."""  # noqa: DOC201
+        schema = FieldworkShotSchema.of(layer)
+        request = (
+            QgsFeatureRequest()
+            .setFilterExpression(f"\"fieldwork_id\" = '{fieldwork_id}'")
+            .setFlags(Qgis.FeatureRequestFlag.NoGeometry)
+            .setSubsetOfAttributes(
+                [schema.column(name).index for name in (*FLOAT_COLUMNS, *FLAG_COLUMNS, *TEXT_COLUMNS)],
+            )
+        )
+        if order_by:
+            request.addOrderBy(order_by, ascending=True)
+        return cls.from_features(layer, layer.getFeatures(request))  # type: ignore []
+
+    def __len__(self) -> int:
+        return len(self.numeric)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Return a column. Numeric columns are views, don't write to them directly, use `set`."""  # noqa: DOC201
+        if name in self.text:
+            return self.text[name]
+        return self.numeric[name]
+
+    @property
+    def fids(self) -> np.ndarray:  # noqa: D102
+        return self.numeric["fid"]
+
+    def set(self, name: str, rows: Any, values: Any) -> None:  # noqa: ANN401
+        """Set a column's values on rows (indexes or a boolean mask) and remember them for `write`."""
+        self[name][rows] = values
+        changed = self._changed.get(name)
+        if changed is None:
+            changed = self._changed[name] = np.zeros(len(self), dtype=np.bool_)
+        changed[rows] = True
+
+    def row_of(self, fid: int) -> int:
+        """Return the row of a feature id."""  # noqa: DOC201
+        if self._row_by_fid is None:
+            self._row_by_fid = {int(fid): row for row, fid in enumerate(self.fids)}
+        row = self._row_by_fid.get(fid)
+        assert_true(row is not None, f"Fieldwork shot {fid} isn't in the shot table.")
+        return row  # type: ignore []
+
+    def rows_of(self, features: Iterable[QgsFeature]) -> np.ndarray:
+        """Return the rows of features, in the same order."""  # noqa: DOC201
+        return np.array([self.row_of(feature.id()) for feature in features], dtype=np.intp)
+
+    def features(self, layer: QgsVectorLayer, rows: Sequence[int] | np.ndarray) -> list[QgsFeature]:
+        """Fetch the full features of rows from the layer, in the same order."""  # noqa: DOC201
+        fids = [int(fid) for fid in self.fids[rows]]
+        by_fid = {feature.id(): feature for feature in layer.getFeatures(QgsFeatureRequest().setFilterFids(fids))}
+        return [by_fid[fid] for fid in fids]
+
+    def average_values(self, rows: Sequence[int] | np.ndarray | slice = _ALL_ROWS) -> np.ndarray:
+        """Return the coordinates and quality values of rows, one line per row, for a `RunningAverage`."""  # noqa: DOC201
+        return np.column_stack([self.numeric[name][rows] for name in AVERAGE_COLUMNS])
+
+    def average(self, rows: Sequence[int] | np.ndarray) -> dict[str, float]:
+        """Average coordinates and quality values of rows, see `average_groups`."""  # noqa: DOC201
+        return self.average_groups([rows]).average(0)
+
+    def average_groups(self, groups: Sequence[Sequence[int] | np.ndarray]) -> GroupAverages:
+        """Average coordinates and quality values of each group of rows, and the residuals of the rows.
+
+        Coordinates are a plain mean, quality values aren't always set so only the set (non-zero) ones count.
+        """  # noqa: DOC201
+        sizes = np.fromiter((len(group) for group in groups), dtype=np.intp, count=len(groups))
+        assert_true(bool(sizes.all()), "Can't average an empty group of shots.")
+        rows = (
+            np.concatenate([np.asarray(group, dtype=np.intp) for group in groups]) if groups else np.empty(0, np.intp)
+        )
+        starts = np.concatenate(([0], np.cumsum(sizes)))
+        numeric = self.numeric[rows]
+
+        averages = np.empty(len(groups), dtype=_AVERAGE_DTYPE)
+        if len(groups):
+            for name in COORDINATE_COLUMNS:
+                averages[name] = np.add.reduceat(numeric[name], starts[:-1]) / sizes
+            for name in QUALITY_COLUMNS:
+                values = numeric[name]
+                is_set = ~np.isnan(values) & (values != 0)
+                totals = np.add.reduceat(np.where(is_set, values, 0), starts[:-1])
+                averages[name] = totals / np.maximum(np.add.reduceat(is_set.astype(np.intp), starts[:-1]), 1)
+
+        group_of_row = np.repeat(np.arange(len(groups)), sizes)
+        residuals = np.column_stack([averages[name][group_of_row] - numeric[name] for name in RESIDUAL_COLUMNS])
+        return GroupAverages(averages, rows, starts, residuals)
+
+    def write(self, layer: QgsVectorLayer, description: str = "Update fieldwork shots") -> int:
+        """Write the values changed with `set` to the editable layer, in one edit command.
+
+        Returns the number of shots updated.
+        """  # noqa: DOC201
+        if not self._changed:
+            return 0
+        schema = FieldworkShotSchema.of(layer)
+        indexes = {name: schema.column(name).index for name in self._changed}
+        any_changed = np.logical_or.reduce(list(self._changed.values()))
+
+        writer = BulkAttributeWriter(layer, description)
+        rows = np.flatnonzero(any_changed)
+        for row in rows:
+            writer.change_values(
+                int(self.fids[row]),
+                {
+                    indexes[name]: _to_attribute(self[name][row])
+                    for name, changed in self._changed.items()
+                    if changed[row]
+                },
+            )
+        writer.apply("Failed to update fieldwork shots.")
+        self._changed.clear()
+        return len(rows)
@@ -0,0 +1,225 @@
+"""Process-wide cache of coordinate reference systems and transforms.
+
+Building a `QgsCoordinateTransform` means a proj lookup every time, so the stages share these
+instead of creating their own per shot. QGIS transforms aren't thread safe, so every thread gets
+its own cache.
+
+Also holds helpers to reproject many coordinates at once, see `transform_arrays`.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Union
+
+import numpy as np
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransform,
+    QgsCoordinateTransformContext,
+    QgsGeometry,
+    QgsProject,
+)
+
+LOCAL_SRID = 2953
+"""NAD83(CSRS) / New Brunswick Stereographic, the CRS of fieldwork eastings/northings."""
+LAT_LON_SRID = 4617
+"""NAD83(CSRS) lat/lon, the CRS of fieldwork shot geometries and RW5/SUM/LOC/REF coordinates."""
+WEB_MERCATOR_SRID = 3857
+
+WARM_UP_PAIRS: tuple[tuple[int, int], ...] = (
+    (LOCAL_SRID, LAT_LON_SRID),
+    (LAT_LON_SRID, LOCAL_SRID),
+)
+"""Transforms every import needs, built when a thread first uses the cache."""
+
+CrsLike = Union[int, str, QgsCoordinateReferenceSystem]
+
+_WKB_POINT = 1
+_WKB_MULTIPOINT = 4
+_WKB_Z_OFFSET = 1000
+"""ISO WKB adds 1000 to the geometry type for geometries with z values."""
+_WKB_LITTLE_ENDIAN = 1
+
+
+def _crs_key(crs: CrsLike) -> str:
+    if isinstance(crs, int):
+        return f"EPSG:{crs}"
+    if isinstance(crs, str):
+        return crs
+    # custom crs' don't have an authid
+    return crs.authid() or crs.toWkt()
+
+
+def _context_key(context: QgsCoordinateTransformContext) -> tuple:
+    return tuple(sorted(context.coordinateOperations().items()))
+
+
+class TransformCache:
+    """Cache of transforms keyed by (source crs, destination crs, transform context).
+
+    Use `transform_cache()` to get the instance for the current thread.
+    """
+
+    hits: int
+    misses: int
+
+    def __init__(self) -> None:  # noqa: D107
+        self._crs_by_key: dict[str, QgsCoordinateReferenceSystem] = {}
+        self._transform_by_key: dict[tuple[str, str, tuple], QgsCoordinateTransform] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def crs(self, crs: CrsLike) -> QgsCoordinateReferenceSystem:
+        """Return the crs for an EPSG code, authid or existing crs."""  # noqa: DOC201
+        if isinstance(crs, QgsCoordinateReferenceSystem):
+            return crs
+        key = _crs_key(crs)
+        if key not in self._crs_by_key:
+            self._crs_by_key[key] = QgsCoordinateReferenceSystem(key)
+        return self._crs_by_key[key]
+
+    def transform(
+        self,
+        src: CrsLike,
+        dst: CrsLike,
+        context: QgsCoordinateTransformContext | None = None,
+    ) -> QgsCoordinateTransform:
+        """Return a transform from src to dst.
+
+        If no context is given, the current project's transform context is used.
+        """  # noqa: DOC201
+        if context is None:
+            project = QgsProject.instance()
+            assert project is not None
+            context = project.transformContext()
+
+        key = (_crs_key(src), _crs_key(dst), _context_key(context))
+        transform = self._transform_by_key.get(key)
+        if transform is not None:
+            self.hits += 1
+            return transform
+
+        self.misses += 1
+        transform = QgsCoordinateTransform(self.crs(src), self.crs(dst), context)
+        self._transform_by_key[key] = transform
+        return transform
+
+    def warm_up(self, pairs: tuple[tuple[CrsLike, CrsLike], ...] = WARM_UP_PAIRS) -> None:
+        """Build the transforms for the given pairs ahead of time."""
+        for src, dst in pairs:
+            self.transform(src, dst)
+
+    def clear(self) -> None:
+        """Drop all cached crs' and transforms, and reset the counters."""
+        self._crs_by_key.clear()
+        self._transform_by_key.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        """Return hit/miss counters and the number of cached transforms."""  # noqa: DOC201
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._transform_by_key),
+        }
+
+
+_thread_local = threading.local()
+
+
+def transform_cache() -> TransformCache:
+    """Return the transform cache for the current thread, warming it up on first use."""  # noqa: DOC201
+    cache: TransformCache | None = getattr(_thread_local, "cache", None)
+    if cache is None:
+        cache = TransformCache()
+        _thread_local.cache = cache
+        cache.warm_up()
+    return cache
+
+
+def get_transform(
+    src: CrsLike,
+    dst: CrsLike,
+    context: QgsCoordinateTransformContext | None = None,
+) -> QgsCoordinateTransform:
+    """Shortcut for `transform_cache().transform(...)`."""  # noqa: DOC201
+    return transform_cache().transform(src, dst, context)
+
+
+def _point_dtype(*, has_z: bool, byte_order: str = "<") -> np.dtype:
+    fields = [("byte_order", "u1"), ("wkb_type", f"{byte_order}u4"), ("x", f"{byte_order}f8"), ("y", f"{byte_order}f8")]
+    if has_z:
+        fields.append(("z", f"{byte_order}f8"))
+    return np.dtype(fields)
+
+
+def _point_records(x: np.ndarray, y: np.ndarray, z: np.ndarray | None) -> np.ndarray:
+    has_z = z is not None
+    records = np.empty(len(x), dtype=_point_dtype(has_z=has_z))
+    records["byte_order"] = _WKB_LITTLE_ENDIAN
+    records["wkb_type"] = _WKB_POINT + (_WKB_Z_OFFSET if has_z else 0)
+    records["x"] = x
+    records["y"] = y
+    if has_z:
+        records["z"] = z
+    return records
+
+
+def transform_arrays(
+    transform: QgsCoordinateTransform,
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray | None = None,
+    *,
+    transform_z: bool = False,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray | None]:
+    """Transform arrays of coordinates in a single call.
+
+    The coordinates are packed into one multipoint so the whole batch is transformed in C++.
+    Like `QgsPoint.transform`, z values are passed through unless transform_z is set.
+    Returns new x, y and z arrays.
+    """  # noqa: DOC201
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    z = None if z is None else np.asarray(z, dtype=np.float64)
+    if len(x) == 0:
+        return x.copy(), y.copy(), None if z is None else z.copy()
+
+    has_z = z is not None
+    header = np.array(
+        [(_WKB_LITTLE_ENDIAN, _WKB_MULTIPOINT + (_WKB_Z_OFFSET if has_z else 0), len(x))],
+        dtype=[("byte_order", "u1"), ("wkb_type", "<u4"), ("n", "<u4")],
+    )
+    multipoint = QgsGeometry()
+    multipoint.fromWkb(header.tobytes() + _point_records(x, y, z).tobytes())
+    multipoint.transform(transform, transformZ=transform_z)
+
+    wkb = bytes(multipoint.asWkb())
+    # qgis writes wkb in the machine's byte order, check instead of assuming
+    byte_order = "<" if wkb[0] == _WKB_LITTLE_ENDIAN else ">"
+    header_size = header.dtype.itemsize
+    records = np.frombuffer(wkb, dtype=_point_dtype(has_z=has_z, byte_order=byte_order), offset=header_size)
+    return (
+        records["x"].astype(np.float64),
+        records["y"].astype(np.float64),
+        records["z"].astype(np.float64) if has_z else None,
+    )
+
+
+def point_geometries(
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray | None = None,
+) -> list[QgsGeometry]:
+    """Build point geometries from coordinate arrays, through one packed WKB buffer."""  # noqa: DOC201
+    records = _point_records(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64), z)
+    buffer = records.tobytes()
+    size = records.dtype.itemsize
+    geometries = []
+    for i in range(len(records)):
+        geometry = QgsGeometry()
+        geometry.fromWkb(buffer[i * size:(i + 1) * size])
+        geometries.append(geometry)
+    return geometries
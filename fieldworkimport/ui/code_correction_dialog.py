@@ -1,8 +1,9 @@
+from collections.abc import Sequence
 from typing import Optional
 
 from PyQt5.QtWidgets import QDialog, QMessageBox, QWidget
 
-from fieldworkimport.common import validate_code
+from fieldworkimport.common import ValidationConfig
 from fieldworkimport.ui.generated.code_correction_ui import Ui_CodeCorrectionDialog
 
 
@@ -10,22 +11,26 @@ class CodeCorrectionDialog(QDialog, Ui_CodeCorrectionDialog):
     def __init__(
         self,
         description: str,
-        valid_codes: list[str],
-        valid_special_chars: list[str],
-        parameterized_special_chars: list[str],
+        config: ValidationConfig,
+        suggestions: Sequence[str] = (),
         parent: Optional[QWidget] = None,
     ):
         super().__init__(parent)
         self.setupUi(self)
         self.description = description
         self.code = self.description_to_code(description)
-        self.valid_codes = valid_codes
-        self.valid_special_chars = valid_special_chars
-        self.parameterized_special_chars = parameterized_special_chars
+        self.config = config
 
         self.original_code_label.setText(description)
         self.correction_input.setText(description)
 
+        # closest valid descriptions, picking one fills in the correction
+        self.suggestions_input.addItems(suggestions)
+        self.suggestions_input.setCurrentIndex(-1)
+        self.suggestions_input.activated[str].connect(self.correction_input.setText)
+        self.suggestions_label.setVisible(bool(suggestions))
+        self.suggestions_input.setVisible(bool(suggestions))
+
     @staticmethod
     def description_to_code(description: str):
         return description.split("/")[0]
@@ -33,13 +38,14 @@ class CodeCorrectionDialog(QDialog, Ui_CodeCorrectionDialog):
     def accept(self) -> None:
         self.description = self.correction_input.text()
         self.code = self.description_to_code(self.description)
-        is_valid = validate_code(self.code, valid_codes=self.valid_codes, valid_special_characters=self.valid_special_chars, parameterized_special_characters=self.parameterized_special_chars)
+        code_check = self.config.check_code(self.code)
         # validate requried fields.
-        if not is_valid or not self.code:
+        if not code_check.valid or not self.code:
+            invalid_part = f" ('{code_check.failed_code}' isn't a valid code)" if code_check.failed_code and code_check.failed_code != self.code else ""
             msg = QMessageBox()
             msg.setIcon(QMessageBox.Warning)
             msg.setText("Invalid code correction.")
-            msg.setInformativeText(f"'{self.code}' is not valid. Please try again or click 'ignore' to ignore the exception.")
+            msg.setInformativeText(f"'{self.code}' is not valid{invalid_part}. Please try again or click 'ignore' to ignore the exception.")
             msg.setWindowTitle("Not so fast...")
             msg.exec()
             return None
@@ -14,7 +14,7 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 class Ui_CodeCorrectionDialog(object):
     def setupUi(self, CodeCorrectionDialog):
         CodeCorrectionDialog.setObjectName("CodeCorrectionDialog")
-        CodeCorrectionDialog.resize(392, 128)
+        CodeCorrectionDialog.resize(392, 156)
         self.verticalLayout = QtWidgets.QVBoxLayout(CodeCorrectionDialog)
         self.verticalLayout.setObjectName("verticalLayout")
         self.label = QtWidgets.QLabel(CodeCorrectionDialog)
@@ -31,6 +31,12 @@ class Ui_CodeCorrectionDialog(object):
         self.correction_input = QtWidgets.QLineEdit(CodeCorrectionDialog)
         self.correction_input.setObjectName("correction_input")
         self.formLayout.setWidget(1, QtWidgets.QFormLayout.FieldRole, self.correction_input)
+        self.suggestions_label = QtWidgets.QLabel(CodeCorrectionDialog)
+        self.suggestions_label.setObjectName("suggestions_label")
+        self.formLayout.setWidget(2, QtWidgets.QFormLayout.LabelRole, self.suggestions_label)
+        self.suggestions_input = QtWidgets.QComboBox(CodeCorrectionDialog)
+        self.suggestions_input.setObjectName("suggestions_input")
+        self.formLayout.setWidget(2, QtWidgets.QFormLayout.FieldRole, self.suggestions_input)
         self.original_code_label = QtWidgets.QLabel(CodeCorrectionDialog)
         font = QtGui.QFont()
         font.setBold(True)
@@ -63,6 +69,8 @@ class Ui_CodeCorrectionDialog(object):
         self.label_2.setText(_translate("CodeCorrectionDialog", "Original Code"))
         self.label_3.setText(_translate("CodeCorrectionDialog", "Correction"))
         self.correction_input.setPlaceholderText(_translate("CodeCorrectionDialog", "Correction"))
+        self.suggestions_label.setText(_translate("CodeCorrectionDialog", "Suggestions"))
+        self.suggestions_input.setToolTip(_translate("CodeCorrectionDialog", "Closest valid codes, pick one to use it as the correction."))
         self.original_code_label.setText(_translate("CodeCorrectionDialog", "CODE"))
         self.done.setText(_translate("CodeCorrectionDialog", "Done"))
         self.ignore.setText(_translate("CodeCorrectionDialog", "Ignore Exception"))
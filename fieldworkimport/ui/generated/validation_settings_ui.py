@@ -69,6 +69,9 @@ class Ui_ValidationSettingsDialog(object):
         self.debug_mode_checkbox = QtWidgets.QCheckBox(self.groupBox)
         self.debug_mode_checkbox.setObjectName("debug_mode_checkbox")
         self.widget2.setWidget(7, QtWidgets.QFormLayout.LabelRole, self.debug_mode_checkbox)
+        self.consecutive_merge_only_checkbox = QtWidgets.QCheckBox(self.groupBox)
+        self.consecutive_merge_only_checkbox.setObjectName("consecutive_merge_only_checkbox")
+        self.widget2.setWidget(8, QtWidgets.QFormLayout.SpanningRole, self.consecutive_merge_only_checkbox)
         self.verticalLayout.addWidget(self.groupBox)
         self.buttonBox = QtWidgets.QDialogButtonBox(ValidationSettingsDialog)
         self.buttonBox.setOrientation(QtCore.Qt.Horizontal)
@@ -93,3 +96,5 @@ class Ui_ValidationSettingsDialog(object):
         self.label_6.setText(_translate("ValidationSettingsDialog", "Parameterized Special Characters"))
         self.label_13.setText(_translate("ValidationSettingsDialog", "Control Point Codes"))
         self.debug_mode_checkbox.setText(_translate("ValidationSettingsDialog", "Debug mode"))
+        self.consecutive_merge_only_checkbox.setToolTip(_translate("ValidationSettingsDialog", "Only merge same-point shots that are next to each other in name order, like older versions did."))
+        self.consecutive_merge_only_checkbox.setText(_translate("ValidationSettingsDialog", "Only merge consecutive same-point shots"))
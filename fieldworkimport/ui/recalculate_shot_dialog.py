@@ -1,11 +1,12 @@
 
 from typing import Optional, cast
 
+import numpy as np
 from PyQt5.QtWidgets import QDialog, QTreeWidgetItem, QWidget
 from qgis.core import QgsFeature, QgsVectorLayer
 from qgis.PyQt import QtCore
 
-from fieldworkimport.common import calc_parent_child_residuals, get_average_point
+from fieldworkimport.shot_table import RunningAverage, ShotTable
 from fieldworkimport.ui.generated.recalculate_shot_ui import Ui_RecalculateShotDialog
 
 
@@ -13,10 +14,15 @@ class SameShotTreeWidgetItem(QTreeWidgetItem):
     """Individual shot row."""
 
     shot: QgsFeature
+    values: np.ndarray
 
-    def __init__(self, shot: QgsFeature) -> None:
+    last_checked_state = None
+
+    def __init__(self, shot: QgsFeature, values: np.ndarray) -> None:
+        """Values are the shot's line of `ShotTable.average_values`."""
         super().__init__()
         self.shot = shot
+        self.values = values
 
         # set special flags
         self.setCheckState(0, QtCore.Qt.Checked)
@@ -36,19 +42,24 @@ class SameShotTreeWidgetItem(QTreeWidgetItem):
         for i, text in enumerate(cols):
             self.setText(i, text)
 
+        self.last_checked_state = True
+
     def is_enabled(self) -> bool:
         return self.checkState(0) == QtCore.Qt.CheckState.Checked
 
-    def shot_residual_from_avg(self, avg: QgsFeature):
-        r = calc_parent_child_residuals(avg, self.shot)
+    def shot_residual_from_avg(self, average: RunningAverage):
+        r = average.residuals(self.values)
         self.setText(5, f"{r[0]:.3f}")
         self.setText(6, f"{r[1]:.3f}")
         self.setText(7, f"{r[2]:.3f}")
 
 
 class RecalculateShotDialog(QDialog, Ui_RecalculateShotDialog):
+    """Pick the shots to average. The average of the checked shots is a `RunningAverage`, updated as they're checked."""
+
     shots: list[QgsFeature]
     layer: QgsVectorLayer
+    average: RunningAverage
 
     def __init__(
         self,
@@ -60,11 +71,16 @@ class RecalculateShotDialog(QDialog, Ui_RecalculateShotDialog):
         self.shots = shots
         self.layer = layer
         self.setupUi(self)
+        # keep the placeholders, the label is filled in again on every change
+        self.avg_coord_template = self.avg_coord_text.text()
+
+        values = ShotTable.from_features(layer, shots).average_values()
+        self.average = RunningAverage(values)
 
         # setup rows
         items = []
-        for shot in shots:
-            parent_tree_item = SameShotTreeWidgetItem(shot)
+        for shot, shot_values in zip(shots, values):
+            parent_tree_item = SameShotTreeWidgetItem(shot, shot_values)
             items.append(parent_tree_item)
 
         self.treeWidget.addTopLevelItems(items)
@@ -77,26 +93,43 @@ class RecalculateShotDialog(QDialog, Ui_RecalculateShotDialog):
         self.treeWidget.itemChanged.connect(self.__on_tree_widget_item_changed)
         self.__recalculate_avg()
 
-    def __on_tree_widget_item_changed(self, _: QTreeWidgetItem) -> None:
-        """If a shot is checked/unchecked, recalculate the average."""
+    def __on_tree_widget_item_changed(self, item: QTreeWidgetItem) -> None:
+        """If a shot is checked/unchecked, add it to the average or take it off."""
+        if not isinstance(item, SameShotTreeWidgetItem):
+            return
+        item = cast("SameShotTreeWidgetItem", item)
+        # text changes emit itemChanged too
+        checked = item.is_enabled()
+        if checked == item.last_checked_state:
+            return
+        item.last_checked_state = checked
+        if checked:
+            self.average.add(item.values)
+        else:
+            self.average.remove(item.values)
         self.__recalculate_avg()
 
     def __recalculate_avg(self) -> None:
-        """Calculate the average shot and display it, and the individual shot residuals."""
-        included_shots: list[QgsFeature] = self.get_checked_shots()
-        avg_shot = get_average_point(self.layer, included_shots)
-
-        for i in range(self.treeWidget.topLevelItemCount()):
-            item = self.treeWidget.topLevelItem(i)
-            if isinstance(item, SameShotTreeWidgetItem):
-                item = cast("SameShotTreeWidgetItem", item)
-                item.shot_residual_from_avg(avg_shot)
+        """Display the average shot, and the individual shot residuals."""
+        if not self.average.count:
+            return
+        average = self.average.average()
+
+        was_blocked = self.treeWidget.blockSignals(True)  # noqa: FBT003
+        try:
+            for i in range(self.treeWidget.topLevelItemCount()):
+                item = self.treeWidget.topLevelItem(i)
+                if isinstance(item, SameShotTreeWidgetItem):
+                    item = cast("SameShotTreeWidgetItem", item)
+                    item.shot_residual_from_avg(self.average)
+        finally:
+            self.treeWidget.blockSignals(was_blocked)
 
         self.avg_coord_text.setText(
-            self.avg_coord_text.text()
-            .replace("{{easting}}", f"{avg_shot['easting']:.3f}")
-            .replace("{{northing}}", f"{avg_shot['northing']:.3f}")
-            .replace("{{elevation}}", f"{avg_shot['elevation']:.3f}"),
+            self.avg_coord_template
+            .replace("{{easting}}", f"{average['easting']:.3f}")
+            .replace("{{northing}}", f"{average['northing']:.3f}")
+            .replace("{{elevation}}", f"{average['elevation']:.3f}"),
         )
 
     def get_checked_shots(self) -> list[QgsFeature]:
@@ -1,12 +1,13 @@
 
 from typing import Optional, cast
 
+import numpy as np
 from PyQt5.QtWidgets import QDialog, QTreeWidgetItem, QWidget
-from qgis.core import Qgis, QgsFeature, QgsMessageLog, QgsSettings, QgsVectorLayer
+from qgis.core import Qgis, QgsFeature, QgsMessageLog, QgsVectorLayer
 from qgis.PyQt import QtCore, QtGui
 
-from fieldworkimport.common import calc_parent_child_residuals, get_average_point
-from fieldworkimport.helpers import settings_key
+from fieldworkimport.common import ValidationConfig, average_shot_groups, get_average_point, parent_point_name
+from fieldworkimport.shot_table import RunningAverage, ShotTable
 from fieldworkimport.ui.generated.same_point_shots_ui import Ui_SamePointShotsDialog
 
 PARENT_POINT_TREE_WIDGET_FONT = QtGui.QFont()
@@ -17,15 +18,21 @@ PARENT_POINT_TREE_WIDGET_FONT.setWeight(75)
 
 class ChildPointTreeWidgetItem(QTreeWidgetItem):
     point: QgsFeature
-    parent_point: QgsFeature
+    values: np.ndarray
     parent_point_widget_item: "ParentPointTreeWidgetItem"
 
     last_checked_state = None
 
-    def __init__(self, point: QgsFeature, parent_point: QgsFeature, parent_point_widget_item: "ParentPointTreeWidgetItem") -> None:
+    def __init__(
+        self,
+        point: QgsFeature,
+        values: np.ndarray,
+        parent_point_widget_item: "ParentPointTreeWidgetItem",
+    ) -> None:
+        """Values are the point's line of `ShotTable.average_values`."""
         super().__init__()
         self.point = point
-        self.parent_point = parent_point
+        self.values = values
         self.parent_point_widget_item = parent_point_widget_item
         self.show_point()
 
@@ -36,35 +43,53 @@ class ChildPointTreeWidgetItem(QTreeWidgetItem):
         self.last_checked_state = True
 
     def show_point(self):
-        residuals = calc_parent_child_residuals(parent_point=self.parent_point, child_point=self.point)
         cols = [
             self.point["name"],
             self.point["description"],
             f"{self.point['easting']:.3f}",
             f"{self.point['northing']:.3f}",
             f"{self.point['elevation']:.3f}",
-            f"{residuals[0]:.3f}",
-            f"{residuals[1]:.3f}",
-            f"{residuals[2]:.3f}",
         ]
         for i, text in enumerate(cols):
             self.setText(i, text)
+        self.show_residuals()
 
-    def update_parent(self, parent_point: QgsFeature):
-        self.parent_point = parent_point
-        self.show_point()
+    def show_residuals(self):
+        residuals = self.parent_point_widget_item.average.residuals(self.values)
+        for i, residual in enumerate(residuals, start=5):
+            self.setText(i, f"{residual:.3f}")
 
 
 class ParentPointTreeWidgetItem(QTreeWidgetItem):
+    """Average of a group of shots, with a row per shot.
+
+    The average is a `RunningAverage` of the checked shots, so checking or unchecking one only updates
+    the average and repaints this group's rows.
+    """
+
     parent_point: QgsFeature
     child_points: list[QgsFeature]
     fieldworkshot_layer: QgsVectorLayer
+    average: RunningAverage
 
-    def __init__(self, fieldworkshot_layer: QgsVectorLayer, child_points: list[QgsFeature]) -> None:
+    def __init__(
+        self,
+        fieldworkshot_layer: QgsVectorLayer,
+        child_points: list[QgsFeature],
+        parent_point: Optional[QgsFeature] = None,
+        values: Optional[np.ndarray] = None,
+        config: Optional[ValidationConfig] = None,
+    ) -> None:
+        """Pass the parent point and the child values if they were already computed, see `SamePointShotsDialog`."""
         super().__init__()
         self.fieldworkshot_layer = fieldworkshot_layer
         self.child_points = child_points
-        self.parent_point = get_average_point(self.fieldworkshot_layer, self.child_points)
+        if parent_point is None:
+            parent_point = get_average_point(self.fieldworkshot_layer, self.child_points, config=config)
+        self.parent_point = parent_point
+        if values is None:
+            values = ShotTable.from_features(self.fieldworkshot_layer, self.child_points).average_values()
+        self.average = RunningAverage(values)
 
         # set special font for parent
         for i in range(self.columnCount()):
@@ -78,8 +103,8 @@ class ParentPointTreeWidgetItem(QTreeWidgetItem):
         self.show_point()
 
         # generate rows for children
-        for point in self.child_points:
-            child_tree_item = ChildPointTreeWidgetItem(point, parent_point=self.parent_point, parent_point_widget_item=self)
+        for point, point_values in zip(self.child_points, values):
+            child_tree_item = ChildPointTreeWidgetItem(point, point_values, parent_point_widget_item=self)
 
             self.addChild(child_tree_item)
 
@@ -97,21 +122,37 @@ class ParentPointTreeWidgetItem(QTreeWidgetItem):
         for i, text in enumerate(cols):
             self.setText(i, text)
 
-    def recalc_point(self):
-        features = []
-        for i in range(self.childCount()):
-            child = cast("ChildPointTreeWidgetItem", self.child(i))
-            if child.checkState(0) == QtCore.Qt.CheckState.Checked:
-                features.append(child.point)
-        if not features:
+    def toggle_child(self, child: ChildPointTreeWidgetItem, checked: bool):  # noqa: FBT001
+        """Add a child to the average or take it off, and show the new average."""
+        if checked:
+            self.average.add(child.values)
+        else:
+            self.average.remove(child.values)
+        if not self.average.count:
             return
-        self.parent_point = get_average_point(self.fieldworkshot_layer, features)
-        self.show_point()
 
-        # update children with new point
-        for i in range(self.childCount()):
-            child = cast("ChildPointTreeWidgetItem", self.child(i))
-            child.update_parent(self.parent_point)
+        # the parent is named after the first checked child, like get_average_point
+        first_child = next(
+            cast("ChildPointTreeWidgetItem", self.child(i))
+            for i in range(self.childCount())
+            if self.child(i).checkState(0) == QtCore.Qt.CheckState.Checked
+        )
+        self.parent_point["name"] = parent_point_name(first_child.point["name"])
+        self.parent_point["code"] = first_child.point["code"]
+        self.parent_point["description"] = first_child.point["description"]
+        for name, value in self.average.average().items():
+            self.parent_point[name] = value
+
+        # the text changes would emit itemChanged for every row
+        tree_widget = self.treeWidget()
+        was_blocked = tree_widget.blockSignals(True) if tree_widget is not None else False  # noqa: FBT003
+        try:
+            self.show_point()
+            for i in range(self.childCount()):
+                cast("ChildPointTreeWidgetItem", self.child(i)).show_residuals()
+        finally:
+            if tree_widget is not None:
+                tree_widget.blockSignals(was_blocked)
 
     def get_checked_child_points(self) -> list[QgsFeature]:
         features = []
@@ -132,23 +173,31 @@ class SamePointShotsDialog(QDialog, Ui_SamePointShotsDialog):
         self,
         fieldworkshot_layer: QgsVectorLayer,
         groups: list[list[QgsFeature]],
+        config: ValidationConfig,
         parent: Optional[QWidget] = None,
     ):
         super().__init__(parent)
         self.final_groups = []
         self.setupUi(self)
 
-        s = QgsSettings()
-
-        same_point_tolerance = float(s.value(settings_key("same_point_tolerance")))
+        same_point_tolerance = config.same_point_tolerance
 
         # show actual tolerance in label
         self.tolerance_text.setText(self.tolerance_text.text().replace("{{same_point_tolerance}}", f"{same_point_tolerance:.2f}"))  # noqa: E501
 
-        # setup rows
+        # setup rows, averaging every group in one go
+        table = ShotTable.from_features(fieldworkshot_layer, [point for group in groups for point in group])
+        parent_points, averages = average_shot_groups(fieldworkshot_layer, groups, table, config)
+        values = table.average_values(averages.rows)
         items = []
-        for group in groups:
-            parent_tree_item = ParentPointTreeWidgetItem(fieldworkshot_layer, child_points=group)
+        for index, (group, parent_point) in enumerate(zip(groups, parent_points)):
+            parent_tree_item = ParentPointTreeWidgetItem(
+                fieldworkshot_layer,
+                child_points=group,
+                parent_point=parent_point,
+                values=values[averages.starts[index]:averages.starts[index + 1]],
+                config=config,
+            )
             items.append(parent_tree_item)
 
         self.tree_widget.addTopLevelItems(items)
@@ -163,7 +212,11 @@ class SamePointShotsDialog(QDialog, Ui_SamePointShotsDialog):
     def on_tree_widget_item_changed(self, item: QTreeWidgetItem):
         if isinstance(item, ChildPointTreeWidgetItem):
             item = cast("ChildPointTreeWidgetItem", item)
-            item.parent_point_widget_item.recalc_point()
+            # text changes emit itemChanged too, only a new check state changes the average
+            checked = item.checkState(0) == QtCore.Qt.CheckState.Checked
+            if checked != item.last_checked_state:
+                item.last_checked_state = checked
+                item.parent_point_widget_item.toggle_child(item, checked)
 
     def get_final_groups(self) -> list[list[QgsFeature]]:
         """Get the list of groups of points."""  # noqa: DOC201
@@ -3,6 +3,7 @@ from typing import Optional
 from PyQt5.QtWidgets import QDialog, QWidget
 from qgis.core import QgsSettings
 
+from fieldworkimport.common import refresh_validation_config
 from fieldworkimport.helpers import settings_key
 from fieldworkimport.ui.generated.validation_settings_ui import Ui_ValidationSettingsDialog
 
@@ -22,6 +23,7 @@ class ValidationSettingsDialog(QDialog, Ui_ValidationSettingsDialog):
         self.parameterized_special_chars_input.setText(s.value(settings_key("parameterized_special_chars"), ""))
         self.control_point_codes_input.setText(s.value(settings_key("control_point_codes"), ""))
         self.debug_mode_checkbox.setChecked(s.value(settings_key("debug_mode"), False, bool))  # noqa: FBT003
+        self.consecutive_merge_only_checkbox.setChecked(s.value(settings_key("consecutive_merge_only"), False, bool))  # noqa: FBT003
 
     def accept(self) -> None:
         s = QgsSettings()
@@ -41,5 +43,8 @@ class ValidationSettingsDialog(QDialog, Ui_ValidationSettingsDialog):
         s.setValue(key, self.control_point_codes_input.text())
         key = settings_key("debug_mode")
         s.setValue(key, self.debug_mode_checkbox.isChecked())
+        key = settings_key("consecutive_merge_only")
+        s.setValue(key, self.consecutive_merge_only_checkbox.isChecked())
+        refresh_validation_config()
 
         return super().accept()
@@ -13,3 +13,58 @@ fixtures:
   This should be used with tests that add stuff to QgsProject.
 
 """
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+import pytest
+from qgis.core import QgsFeature, QgsVectorLayer
+
+from fieldworkimport.shot_table import _NUMERIC_DTYPE, FLOAT_COLUMNS, TEXT_COLUMNS, ShotTable
+
+FIELDWORKSHOT_FIELDS = {
+    **{name: "string" for name in TEXT_COLUMNS},
+    "fieldwork_id": "string",
+    **{name: "double" for name in FLOAT_COLUMNS},
+    "bad_hrms_flag": "boolean",
+    "bad_vrms_flag": "boolean",
+    "bad_fixed_status_flag": "boolean",
+    "bad_code_flag": "boolean",
+}
+"""Fields of sites_fieldworkshot the shot table reads, with their memory provider types."""
+
+
+def make_shot_table(n: int, **columns: Any) -> ShotTable:  # noqa: ANN401
+    """Build a shot table of n shots without a layer. Columns not given are zero, False or None."""  # noqa: DOC201
+    numeric = np.zeros(n, dtype=_NUMERIC_DTYPE)
+    numeric["fid"] = np.arange(n)
+    text = {name: np.full(n, None, dtype=object) for name in TEXT_COLUMNS}
+    for name, values in columns.items():
+        if name in text:
+            text[name][:] = values
+        else:
+            numeric[name] = values
+    return ShotTable(numeric, text)
+
+
+@pytest.fixture
+def fieldworkshot_layer() -> QgsVectorLayer:
+    """Empty memory layer with the fields of sites_fieldworkshot the shot table reads."""  # noqa: DOC201
+    fields = "&".join(f"field={name}:{field_type}" for name, field_type in FIELDWORKSHOT_FIELDS.items())
+    layer = QgsVectorLayer(f"Point?crs=EPSG:4617&{fields}", "sites_fieldworkshot", "memory")
+    assert layer.isValid()
+    return layer
+
+
+def add_shots(layer: QgsVectorLayer, shots: list[dict[str, Any]]) -> list[QgsFeature]:
+    """Add shots, given as attribute dicts, to a memory layer and return them as stored."""  # noqa: DOC201
+    features = []
+    for shot in shots:
+        feature = QgsFeature(layer.fields())
+        for name, value in shot.items():
+            feature[name] = value
+        features.append(feature)
+    assert layer.dataProvider().addFeatures(features)
+    return list(layer.getFeatures())
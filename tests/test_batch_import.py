@@ -0,0 +1,161 @@
+import json
+from pathlib import Path
+from typing import Any, Optional
+
+import pytest
+from qgis.core import QgsFeature, QgsField, QgsFields
+from qgis.PyQt.QtCore import QVariant
+
+from fieldworkimport.batchimport.batch_import_process import RulesCoordinateShiftStage, find_jobs
+from fieldworkimport.batchimport.rules import BatchImportRules, load_rules
+from fieldworkimport.common import ValidationConfig
+from fieldworkimport.fwimport.stage_5_coordinate_shift import ControlShift, average_control_shift
+
+
+def write_rules(tmp_path: Path, rules: Any) -> Path:  # noqa: ANN401
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(rules), encoding="utf-8")
+    return path
+
+
+def make_job_folder(jobs_dir: Path, name: str, *file_names: str) -> Path:
+    folder = jobs_dir / name
+    folder.mkdir()
+    for file_name in file_names:
+        (folder / file_name).write_text("", encoding="utf-8")
+    return folder
+
+
+def make_feature(name: str) -> QgsFeature:
+    fields = QgsFields()
+    fields.append(QgsField("name", QVariant.String))
+    feature = QgsFeature(fields)
+    feature["name"] = name
+    return feature
+
+
+def make_shift_stage(shift: str) -> RulesCoordinateShiftStage:
+    config = ValidationConfig(
+        hrms_tolerance=0.05,
+        vrms_tolerance=0.05,
+        same_point_tolerance=0.1,
+        valid_codes=frozenset({"CP"}),
+        valid_special_chars=frozenset(),
+        parameterized_special_chars=frozenset(),
+        control_point_codes=frozenset({"CP"}),
+    )
+    return RulesCoordinateShiftStage(
+        BatchImportRules(shift=shift),  # type: ignore []
+        layers=None,  # type: ignore []
+        fieldwork=make_feature("job"),
+        fieldrun_id=None,
+        plugin_input=None,  # type: ignore []
+        config=config,
+    )
+
+
+def test_no_rules_file_gives_defaults():
+    assert load_rules(None) == BatchImportRules()
+
+
+def test_load_rules(tmp_path: Path):
+    rules = load_rules(write_rules(tmp_path, {
+        "duplicates": "import",
+        "code_corrections": {"CP1": "CP"},
+        "create_missing_controls": True,
+        "shift": "CONTROL",
+        "fieldrun_ids": {"job 1": 12},
+    }))
+
+    assert rules == BatchImportRules(
+        duplicates="import",
+        code_corrections={"CP1": "CP"},
+        create_missing_controls=True,
+        shift="CONTROL",
+        fieldrun_ids={"job 1": 12},
+    )
+
+
+@pytest.mark.parametrize(
+    ("rules", "error"),
+    [
+        ({"dupes": "skip"}, ValueError),
+        ({"shift": "LOCAL"}, ValueError),
+        ([], TypeError),
+        ({"create_missing_controls": "false"}, TypeError),
+        ({"code_corrections": {"CP1": 5}}, TypeError),
+        ({"code_corrections": ["CP1", "CP"]}, TypeError),
+        ({"fieldrun_ids": []}, TypeError),
+        ({"fieldrun_ids": {"job 1": "12"}}, TypeError),
+        ({"fieldrun_ids": {"job 1": True}}, TypeError),
+    ],
+)
+def test_load_rules_rejects_invalid_rules(tmp_path: Path, rules: Any, error: type[Exception]):  # noqa: ANN401
+    with pytest.raises(error):
+        load_rules(write_rules(tmp_path, rules))
+
+
+@pytest.mark.parametrize(
+    ("description", "corrected"),
+    [
+        ("BAD/description", "GOOD/description"),
+        ("CP1/other note", "CP/other note"),
+        ("CP1", "CP"),
+        ("BAD/other note", None),
+        ("TR/note", None),
+    ],
+)
+def test_correct_description(description: str, corrected: Optional[str]):
+    rules = BatchImportRules(code_corrections={"CP1": "CP", "BAD/description": "GOOD/description"})
+
+    assert rules.correct_description(description) == corrected
+
+
+def test_find_jobs(tmp_path: Path):
+    make_job_folder(tmp_path, "b job", "job.crdb", "job.rw5")
+    make_job_folder(tmp_path, "a job", "job.CRDB", "job.RW5", "job.sum", "job.ref", "job.loc", "notes.txt")
+    make_job_folder(tmp_path, "no rw5", "job.crdb")
+    make_job_folder(tmp_path, "two crdbs", "job.crdb", "other.crdb", "job.rw5")
+    make_job_folder(tmp_path, "two sums", "job.crdb", "job.rw5", "job.sum", "other.sum")
+    (tmp_path / "loose.rw5").write_text("", encoding="utf-8")
+
+    jobs = find_jobs(tmp_path)
+
+    assert [job.name for job in jobs] == ["a job", "b job"]
+    a_job, b_job = jobs
+    assert Path(a_job.crdb_path) == tmp_path / "a job" / "job.CRDB"
+    assert Path(a_job.rw5_path) == tmp_path / "a job" / "job.RW5"
+    assert Path(a_job.sum_path) == tmp_path / "a job" / "job.sum"  # type: ignore []
+    assert Path(a_job.ref_path) == tmp_path / "a job" / "job.ref"  # type: ignore []
+    assert Path(a_job.loc_path) == tmp_path / "a job" / "job.loc"  # type: ignore []
+    assert (b_job.sum_path, b_job.ref_path, b_job.loc_path) == (None, None, None)
+
+
+def test_average_control_shift_skips_missing_components():
+    fieldworkshot, fieldrunshot = make_feature("1"), make_feature("1")
+    control_shifts: list[ControlShift] = [
+        (fieldworkshot, fieldrunshot, (1.0, 2.0, None)),
+        (fieldworkshot, fieldrunshot, (3.0, 4.0, 0.5)),
+    ]
+
+    assert average_control_shift(control_shifts) == (2.0, 3.0, 0.5)
+
+
+def test_average_control_shift_of_nothing_is_zero():
+    assert average_control_shift([]) == (0, 0, 0)
+
+
+def test_choose_shift():
+    fieldrunshot = make_feature("CP1")
+    control_shifts: list[ControlShift] = [(make_feature("1"), fieldrunshot, (0.1, 0.2, 0.3))]
+    hpn_shift = (1.0, 2.0, 3.0)
+
+    assert make_shift_stage("HPN").choose_shift(hpn_shift, control_shifts) == ("HPN", hpn_shift, None)
+    control_result = ("CONTROL", (0.1, 0.2, 0.3), [fieldrunshot])
+    assert make_shift_stage("CONTROL").choose_shift(hpn_shift, control_shifts) == control_result
+    assert make_shift_stage("NONE").choose_shift(hpn_shift, control_shifts) == ("NONE", None, None)
+
+
+@pytest.mark.parametrize("shift", ["HPN", "CONTROL"])
+def test_choose_shift_falls_back_to_no_shift(shift: str):
+    assert make_shift_stage(shift).choose_shift(None, []) == ("NONE", None, None)
@@ -0,0 +1,115 @@
+import sqlite3
+from collections.abc import Sequence
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from fieldworkimport.common import ValidationConfig
+from fieldworkimport.fwimport.code_corrections import CodeCorrectionStore
+from fieldworkimport.fwimport.stage_2_validate_points import PointValidationStage
+from tests.conftest import make_shot_table
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> CodeCorrectionStore:
+    return CodeCorrectionStore(tmp_path / "corrections" / "code_corrections.sqlite")
+
+
+def uses(store: CodeCorrectionStore) -> dict[str, tuple[str, int]]:
+    """Return the good code and use count of each stored correction."""  # noqa: DOC201
+    with closing(sqlite3.connect(store.path)) as connection:
+        rows = connection.execute("SELECT bad_code, good_code, uses FROM code_correction")
+        return {bad: (good, n) for bad, good, n in rows}
+
+
+def test_empty_store_has_no_corrections(store: CodeCorrectionStore):
+    assert store.lookup({"TRE", "CP1"}) == {}
+
+
+def test_lookup_recorded_corrections(store: CodeCorrectionStore):
+    store.record({"TRE": "TREE", "CP1": "CP"})
+
+    assert store.lookup(["TRE", "FH", "TRE"]) == {"TRE": "TREE"}
+    assert store.lookup({"TRE", "CP1"}) == {"TRE": "TREE", "CP1": "CP"}
+
+
+def test_record_counts_uses(store: CodeCorrectionStore):
+    store.record({"TRE": "TREE"})
+    store.record({}, {"TRE": 3})
+    store.record({"TRE": "TREE"})
+    # uses of unknown codes are ignored
+    store.record({}, {"FHH": 2})
+
+    assert uses(store) == {"TRE": ("TREE", 5)}
+
+
+def test_record_replaces_correction(store: CodeCorrectionStore):
+    store.record({"TRE": "TREE"}, {"TRE": 3})
+
+    store.record({"TRE": "TR"})
+
+    assert uses(store) == {"TRE": ("TR", 1)}
+    assert store.lookup({"TRE"}) == {"TRE": "TR"}
+
+
+def test_forget(store: CodeCorrectionStore):
+    store.record({"TRE": "TREE", "CP1": "CP"})
+
+    store.forget("TRE")
+
+    assert store.lookup({"TRE", "CP1"}) == {"CP1": "CP"}
+
+
+def test_clear(store: CodeCorrectionStore):
+    store.record({"TRE": "TREE", "CP1": "CP"})
+
+    store.clear()
+
+    assert store.lookup({"TRE", "CP1"}) == {}
+
+
+def test_unreadable_store_is_empty(tmp_path: Path):
+    path = tmp_path / "code_corrections.sqlite"
+    path.write_bytes(b"not a database" * 100)
+    store = CodeCorrectionStore(path)
+
+    store.record({"TRE": "TREE"})
+
+    assert store.lookup({"TRE"}) == {}
+
+
+def test_correct_codes_applies_known_corrections(store: CodeCorrectionStore):
+    config = ValidationConfig(
+        hrms_tolerance=0.05,
+        vrms_tolerance=0.05,
+        same_point_tolerance=0.1,
+        valid_codes=frozenset({"CP", "TREE", "FH"}),
+        valid_special_chars=frozenset(),
+        parameterized_special_chars=frozenset(),
+        control_point_codes=frozenset({"CP"}),
+    )
+    store.record({"TRE": "TREE", "XYZ": "NOTACODE"})
+    descriptions = ["TRE/big oak", "CP/north corner", "TRE/pine/dead", "XYZ", "TRE"]
+    table = make_shot_table(
+        len(descriptions),
+        description=descriptions,
+        full_code=[description.split("/")[0] for description in descriptions],
+        code=[description.split("/")[0].split(" ")[0] for description in descriptions],
+    )
+    asked: list[str] = []
+
+    def ask_correction(description: str, suggestions: Sequence[str], config: ValidationConfig) -> Optional[str]:  # noqa: ARG001
+        asked.append(description)
+        return None
+
+    stage = PointValidationStage(None, "fieldwork", config, ask_correction=ask_correction, corrections=store)  # type: ignore []
+    stage.correct_codes(table)
+
+    assert table["description"].tolist() == ["TREE/big oak", "CP/north corner", "TREE/pine/dead", "XYZ", "TREE"]
+    assert table["full_code"].tolist() == ["TREE", "CP", "TREE", "XYZ", "TREE"]
+    assert table["code"].tolist() == ["TREE", "CP", "TREE", "XYZ", "TREE"]
+    # the learned correction to an invalid code isn't applied, the user is asked instead
+    assert asked == ["XYZ"]
+    assert uses(store) == {"TRE": ("TREE", 4), "XYZ": ("NOTACODE", 1)}
@@ -0,0 +1,157 @@
+import random
+import string
+from typing import Optional
+
+import pytest
+
+from fieldworkimport.common import CodeMatcher, ValidationConfig, validate_code
+
+VALID_CODES = ["WV", "WVMH", "CP", "MON", "TR", "SMH", "DMH", "CB", "FH", "EP"]
+VALID_SPECIAL_CHARACTERS = ["B", "E", "V", "C", "PC", "PT"]
+PARAMETERIZED_SPECIAL_CHARACTERS = ["V"]
+
+
+def _legacy_validate_single_code(
+    code: str,
+    previous_code: Optional[str],
+    valid_codes: list[str],
+    valid_special_characters: list[str],
+    parameterized_special_characters: list[str],
+) -> bool:
+    if code.upper() in valid_special_characters and previous_code is not None:
+        return True
+    if previous_code and previous_code.upper() in parameterized_special_characters:
+        try:
+            float(code)
+        except ValueError:
+            pass
+        else:
+            return True
+
+    prefix = None
+    for curr_code in valid_codes:
+        if code.upper().startswith(curr_code) and (prefix is None or len(prefix) < len(curr_code)):
+            prefix = curr_code
+
+    if prefix is None:
+        return False
+
+    suffix = code.removeprefix(prefix)
+    return len(suffix) == 0 or suffix[0].isdigit()
+
+
+def legacy_validate_code(
+    mutlicode: str,
+    valid_codes: list[str],
+    valid_special_characters: list[str],
+    parameterized_special_characters: list[str],
+) -> bool:
+    """Multicode validation as it was before the trie, a loop over every valid code."""  # noqa: DOC201
+    previous_code: Optional[str] = None
+    for code in mutlicode.strip().upper().split(" "):
+        if not _legacy_validate_single_code(
+            code,
+            previous_code,
+            valid_codes,
+            valid_special_characters,
+            parameterized_special_characters,
+        ):
+            return False
+        previous_code = code
+    return True
+
+
+def random_valid_codes(rng: random.Random, n: int) -> list[str]:
+    codes = set(VALID_CODES)
+    while len(codes) < n:
+        codes.add("".join(rng.choices(string.ascii_uppercase, k=rng.randint(1, 5))))
+    return sorted(codes)
+
+
+def random_descriptions(rng: random.Random, valid_codes: list[str], n: int) -> list[str]:
+    """Multicodes like the ones in CRDB files, mostly valid with typos, numbers and special characters mixed in."""  # noqa: DOC201
+    descriptions = []
+    for _ in range(n):
+        tokens = []
+        for _ in range(rng.choice((1, 1, 2, 3))):
+            code = rng.choice(valid_codes)
+            roll = rng.random()
+            if roll < 0.2:  # noqa: PLR2004
+                code += str(rng.randint(1, 99))
+            elif roll < 0.3:  # noqa: PLR2004
+                code += rng.choice(string.ascii_uppercase + "." + string.digits)
+            elif roll < 0.4:  # noqa: PLR2004
+                code = code[:-1]
+            tokens.append(code)
+            roll = rng.random()
+            if roll < 0.1:  # noqa: PLR2004
+                tokens.extend(("V", rng.choice([f"{rng.uniform(0, 2):.2f}", "x", "-1", "1e3"])))
+            elif roll < 0.2:  # noqa: PLR2004
+                tokens.append(rng.choice(VALID_SPECIAL_CHARACTERS))
+        description = " ".join(tokens)
+        descriptions.append(description.lower() if rng.random() < 0.1 else description)  # noqa: PLR2004
+    return descriptions
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matcher_matches_legacy_loop(seed: int):
+    rng = random.Random(seed)
+    valid_codes = random_valid_codes(rng, 150)
+    settings = (valid_codes, VALID_SPECIAL_CHARACTERS, PARAMETERIZED_SPECIAL_CHARACTERS)
+    matcher = CodeMatcher(*settings)
+
+    mismatches = [
+        description
+        for description in random_descriptions(rng, valid_codes, 5000)
+        if matcher.validate(description) != legacy_validate_code(description, *settings)
+    ]
+
+    assert mismatches == []
+
+
+@pytest.mark.parametrize(
+    ("description", "valid"),
+    [
+        ("WV", True),
+        ("WVMH", True),
+        ("WVMH12", True),
+        ("WVX", False),
+        ("wvmh3b", True),
+        ("WVMH 3", False),
+        ("CP V 0.15", True),
+        ("CP V X", False),
+        ("V", False),
+        ("CP PC", True),
+        ("CP E B", True),
+        ("XX", False),
+        ("CP XX", False),
+    ],
+)
+def test_matcher_matches_legacy_loop_on_known_codes(description: str, valid: bool):  # noqa: FBT001
+    settings = (VALID_CODES, VALID_SPECIAL_CHARACTERS, PARAMETERIZED_SPECIAL_CHARACTERS)
+
+    assert CodeMatcher(*settings).validate(description) is valid
+    assert validate_code(description, *settings) is valid
+    assert legacy_validate_code(description, *settings) is valid
+
+
+def test_check_finds_failed_code():
+    matcher = CodeMatcher(VALID_CODES, VALID_SPECIAL_CHARACTERS, PARAMETERIZED_SPECIAL_CHARACTERS)
+
+    assert matcher.check("CP TRX FH").failed_code == "TRX"
+    assert matcher.check("CP TR2 FH").failed_code is None
+
+
+def test_config_compiles_matcher_once():
+    config = ValidationConfig(
+        hrms_tolerance=0.05,
+        vrms_tolerance=0.05,
+        same_point_tolerance=0.1,
+        valid_codes=frozenset(VALID_CODES),
+        valid_special_chars=frozenset(VALID_SPECIAL_CHARACTERS),
+        parameterized_special_chars=frozenset(PARAMETERIZED_SPECIAL_CHARACTERS),
+        control_point_codes=frozenset({"CP"}),
+    )
+
+    assert config.code_matcher is config.code_matcher
+    assert config.code_matcher.validate("WVMH3 V 0.1")
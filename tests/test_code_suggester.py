@@ -0,0 +1,85 @@
+import random
+import string
+
+import pytest
+
+from fieldworkimport.common import CodeMatcher, CodeSuggester, EditDistanceIndex, edit_distance
+
+MAX_DISTANCE = 2
+SUGGESTION_COUNT = 5
+
+
+def random_codes(rng: random.Random, n: int) -> list[str]:
+    codes: set[str] = set()
+    while len(codes) < n:
+        codes.add("".join(rng.choices(string.ascii_uppercase, k=rng.randint(1, 6))))
+    return sorted(codes)
+
+
+def typo(rng: random.Random, code: str) -> str:
+    """Insert, delete or replace up to three letters of code."""  # noqa: DOC201
+    chars = list(code)
+    for _ in range(rng.randint(1, 3)):
+        i = rng.randrange(len(chars) + 1)
+        edit = rng.choice(("insert", "delete", "replace"))
+        if edit == "insert" or not chars:
+            chars.insert(i, rng.choice(string.ascii_uppercase))
+        elif edit == "delete":
+            del chars[min(i, len(chars) - 1)]
+        else:
+            chars[min(i, len(chars) - 1)] = rng.choice(string.ascii_uppercase)
+    return "".join(chars)
+
+
+def random_queries(rng: random.Random, valid_codes: list[str], n: int) -> list[str]:
+    queries = []
+    for _ in range(n):
+        if rng.random() < 0.8:  # noqa: PLR2004
+            code = typo(rng, rng.choice(valid_codes))
+        else:
+            code = "".join(rng.choices(string.ascii_uppercase, k=4))
+        queries.append(code + rng.choice(["", "", str(rng.randint(1, 99))]))
+    return queries
+
+
+def brute_force_suggest(code: str, valid_codes: list[str], matcher: CodeMatcher) -> list[str]:
+    """Suggestions for a single code from the distance to every valid code."""  # noqa: DOC201
+    if matcher.validate(code):
+        return []
+    letters = code.rstrip(string.digits + ".")
+    number = code[len(letters):]
+    if not letters:
+        return []
+    max_distance = min(MAX_DISTANCE, max(len(letters) - 1, 1))
+    ranked = sorted((edit_distance(letters, valid_code), valid_code) for valid_code in valid_codes)
+    return [valid_code + number for distance, valid_code in ranked if 0 < distance <= max_distance][:SUGGESTION_COUNT]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_index_search_matches_brute_force(seed: int):
+    rng = random.Random(seed)
+    words = random_codes(rng, 300)
+    index = EditDistanceIndex(words, MAX_DISTANCE)
+
+    for query in random_queries(rng, words, 200):
+        distances = sorted((edit_distance(query, word), word) for word in words)
+        for max_distance in range(MAX_DISTANCE + 1):
+            expected = [(distance, word) for distance, word in distances if distance <= max_distance]
+            assert index.search(query, max_distance) == expected, query
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_suggest_matches_brute_force(seed: int):
+    rng = random.Random(seed)
+    valid_codes = random_codes(rng, 200)
+    matcher = CodeMatcher(valid_codes, [], [])
+    suggester = CodeSuggester(matcher, valid_codes, MAX_DISTANCE)
+
+    for query in random_queries(rng, valid_codes, 300):
+        assert suggester.suggest(query, SUGGESTION_COUNT) == brute_force_suggest(query, valid_codes, matcher), query
+
+
+def test_suggest_keeps_number():
+    matcher = CodeMatcher(["TREE", "CP", "FH"], [], [])
+
+    assert CodeSuggester(matcher, ["TREE", "CP", "FH"]).suggest("TRE12") == ["TREE12"]
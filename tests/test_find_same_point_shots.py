@@ -0,0 +1,72 @@
+from qgis.core import QgsFeature, QgsVectorLayer
+
+from fieldworkimport.helpers import nullish
+from fieldworkimport.samepointshots.findsamepointshots_process import FindGlobalSamePointShots
+from fieldworkimport.schema import FieldrunShotSchema, FieldworkShotSchema
+from tests.conftest import add_shots
+
+
+def make_fieldrunshot_layer() -> QgsVectorLayer:
+    layer = QgsVectorLayer(
+        "Point?crs=EPSG:4617&field=id:string&field=matched_fieldwork_shot_id:string",
+        "sites_fieldrunshot",
+        "memory",
+    )
+    assert layer.isValid()
+    return layer
+
+
+def make_process(fieldworkshot_layer: QgsVectorLayer, fieldrunshot_layer: QgsVectorLayer) -> FindGlobalSamePointShots:
+    # skip __init__, it reads the active layer and the project's layers
+    process = FindGlobalSamePointShots.__new__(FindGlobalSamePointShots)
+    process.layer = fieldworkshot_layer
+    process.fieldrunshot_layer = fieldrunshot_layer
+    process.distance_threshold = 0.075
+    process.do_nothing_ids = set()
+    process.fw_schema = FieldworkShotSchema.of(fieldworkshot_layer)
+    process.fr_schema = FieldrunShotSchema.of(fieldrunshot_layer)
+    return process
+
+
+def parent_child_to_shot(process: FindGlobalSamePointShots, parent: QgsFeature, child: QgsFeature) -> None:
+    process._FindGlobalSamePointShots__parent_child_to_shot(parent, child)  # type: ignore  # noqa: SLF001
+
+
+def test_parent_child_to_shot_propagates_fieldrun_match(fieldworkshot_layer: QgsVectorLayer):
+    fieldrunshot_layer = make_fieldrunshot_layer()
+    parent, child = add_shots(fieldworkshot_layer, [
+        {"id": "parent", "name": "100", "code": "MH"},
+        {"id": "child", "name": "101", "code": "MH"},
+    ])
+    add_shots(fieldrunshot_layer, [
+        {"id": "fr-1", "matched_fieldwork_shot_id": "child"},
+        {"id": "fr-2", "matched_fieldwork_shot_id": "other"},
+    ])
+    fieldworkshot_layer.startEditing()
+    fieldrunshot_layer.startEditing()
+
+    parent_child_to_shot(make_process(fieldworkshot_layer, fieldrunshot_layer), parent, child)
+
+    assert fieldworkshot_layer.commitChanges()
+    assert fieldrunshot_layer.commitChanges()
+    parent_ids = {f["id"]: f["parent_point_id"] for f in fieldworkshot_layer.getFeatures()}
+    assert parent_ids["child"] == "parent"
+    assert nullish(parent_ids["parent"])
+    matches = {f["id"]: f["matched_fieldwork_shot_id"] for f in fieldrunshot_layer.getFeatures()}
+    assert matches == {"fr-1": "parent", "fr-2": "other"}
+
+
+def test_parent_child_to_shot_without_fieldrun_match(fieldworkshot_layer: QgsVectorLayer):
+    fieldrunshot_layer = make_fieldrunshot_layer()
+    parent, child = add_shots(fieldworkshot_layer, [
+        {"id": "parent", "name": "100", "code": "MH"},
+        {"id": "child", "name": "101", "code": "MH"},
+    ])
+    fieldworkshot_layer.startEditing()
+    fieldrunshot_layer.startEditing()
+
+    parent_child_to_shot(make_process(fieldworkshot_layer, fieldrunshot_layer), parent, child)
+
+    assert fieldworkshot_layer.commitChanges()
+    child_feature = next(fieldworkshot_layer.getFeatures("id = 'child'"))
+    assert child_feature["parent_point_id"] == "parent"
@@ -0,0 +1,69 @@
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+
+from fieldworkimport.fwimport.fingerprint import crdb_fingerprint, rw5_fingerprint
+
+RW5_PATH = Path(__file__).parent / "data" / "job.rw5"
+
+CRDB_ROWS = [
+    ("100", 7345678.123, 2534567.456, -10.123, "CP/north corner"),
+    ("101", 7345679.223, 2534568.556, -10.223, "TREE"),
+    ("102a", 7345680.323, 2534569.656, -10.323, "FH"),
+]
+
+
+def write_rw5(tmp_path: Path, text: str) -> Path:
+    path = tmp_path / "job.rw5"
+    path.write_text(text, encoding="iso8859-1")
+    return path
+
+
+def write_crdb(directory: Path, rows: list[tuple[str, float, float, float, str]]) -> Path:
+    directory.mkdir()
+    path = directory / "job.crdb"
+    with closing(sqlite3.connect(path)) as connection, connection:
+        connection.execute("CREATE TABLE Coordinates (P TEXT, N REAL, E REAL, Z REAL, D TEXT)")
+        connection.executemany("INSERT INTO Coordinates VALUES (?, ?, ?, ?, ?)", rows)
+    return path
+
+
+@pytest.mark.parametrize(
+    "jb_record",
+    [
+        "JB,NMJOB1 COPY,DT05-17-2024,TM08:00:00",
+        "JB,NMJOB1,DT05-18-2024,TM14:30:00",
+    ],
+)
+def test_rw5_fingerprint_ignores_jb_record(tmp_path: Path, jb_record: str):
+    text = RW5_PATH.read_text(encoding="iso8859-1")
+    copy = write_rw5(tmp_path, text.replace("JB,NMJOB1,DT05-17-2024,TM08:00:00", jb_record))
+
+    assert copy.read_text(encoding="iso8859-1") != text
+    assert rw5_fingerprint(copy) == rw5_fingerprint(RW5_PATH)
+
+
+def test_rw5_fingerprint_changes_with_records(tmp_path: Path):
+    text = RW5_PATH.read_text(encoding="iso8859-1")
+    copy = write_rw5(tmp_path, text.replace("EL-13.412712", "EL-13.412713"))
+
+    assert rw5_fingerprint(copy) != rw5_fingerprint(RW5_PATH)
+
+
+def test_crdb_fingerprint_ignores_row_order_and_name_case(tmp_path: Path):
+    original = write_crdb(tmp_path / "original", CRDB_ROWS)
+    reordered = write_crdb(tmp_path / "reordered", [(p.upper(), n, e, z, d) for p, n, e, z, d in reversed(CRDB_ROWS)])
+
+    assert crdb_fingerprint(reordered) == crdb_fingerprint(original)
+
+
+@pytest.mark.parametrize("column", [1, 2, 3])
+def test_crdb_fingerprint_changes_with_coordinates(tmp_path: Path, column: int):
+    moved_row = list(CRDB_ROWS[1])
+    moved_row[column] += 0.001  # type: ignore []
+    original = write_crdb(tmp_path / "original", CRDB_ROWS)
+    moved = write_crdb(tmp_path / "moved", [CRDB_ROWS[0], tuple(moved_row), CRDB_ROWS[2]])  # type: ignore []
+
+    assert crdb_fingerprint(moved) != crdb_fingerprint(original)
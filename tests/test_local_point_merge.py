@@ -0,0 +1,158 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from fieldworkimport.common import ValidationConfig
+from fieldworkimport.fwimport.stage_3_local_point_merge import find_groups_within_tolerance, should_be_averaged_together
+from fieldworkimport.shot_table import ShotTable
+from tests.conftest import make_shot_table
+
+CONTROL_CODE = "CP"
+
+
+def make_config(tolerance: float) -> ValidationConfig:
+    return ValidationConfig(
+        hrms_tolerance=0.05,
+        vrms_tolerance=0.05,
+        same_point_tolerance=tolerance,
+        valid_codes=frozenset({"CP", "TREE", "FH"}),
+        valid_special_chars=frozenset(),
+        parameterized_special_chars=frozenset(),
+        control_point_codes=frozenset({CONTROL_CODE}),
+    )
+
+
+def brute_force_groups(table: ShotTable, config: ValidationConfig) -> list[list[int]]:
+    """Single-linkage groups from comparing every pair of shots."""  # noqa: DOC201
+    rows_1, rows_2 = np.triu_indices(len(table), k=1)
+    has_position = ~np.isnan(table["easting"]) & ~np.isnan(table["northing"])
+    together = should_be_averaged_together(
+        table,
+        rows_1,
+        rows_2,
+        config.same_point_tolerance,
+        config.control_point_codes,
+    )
+    together &= has_position[rows_1] & has_position[rows_2]
+
+    roots = list(range(len(table)))
+
+    def find_root(row: int) -> int:
+        while roots[row] != row:
+            row = roots[row]
+        return row
+
+    for row_1, row_2 in zip(rows_1[together].tolist(), rows_2[together].tolist()):
+        roots[find_root(row_1)] = find_root(row_2)
+
+    groups: dict[int, list[int]] = {}
+    for row in range(len(table)):
+        groups.setdefault(find_root(row), []).append(row)
+    return sorted((rows for rows in groups.values() if len(rows) > 1), key=lambda rows: rows[0])
+
+
+def assert_same_groups(table: ShotTable, config: ValidationConfig) -> None:
+    groups = [group.tolist() for group in find_groups_within_tolerance(table, config)]
+    assert groups == brute_force_groups(table, config)
+
+
+@pytest.mark.parametrize("tolerance", [0.0, 0.02, 0.1, 0.5, 3.0])
+@pytest.mark.parametrize("seed", range(3))
+def test_random_points_match_brute_force(tolerance: float, seed: int):
+    rng = random.Random(seed)
+    n = 300
+    # clustered, so there are groups at every tolerance
+    centres = [(rng.uniform(0, 50), rng.uniform(0, 50)) for _ in range(40)]
+    easting, northing = [], []
+    for _ in range(n):
+        x, y = rng.choice(centres)
+        easting.append(x + rng.gauss(0, 0.3))
+        northing.append(y + rng.gauss(0, 0.3))
+    table = make_shot_table(
+        n,
+        easting=easting,
+        northing=northing,
+        elevation=[rng.uniform(100, 101) for _ in range(n)],
+        code=[rng.choice([CONTROL_CODE, "TREE", "FH"]) for _ in range(n)],
+        parent_point_id=[rng.choice([None] * 9 + ["averaged"]) for _ in range(n)],
+    )
+
+    assert_same_groups(table, make_config(tolerance))
+
+
+@pytest.mark.parametrize("tolerance", [0.1, 0.25, 1.0, 2.0])
+def test_points_on_cell_edges(tolerance: float):
+    # every point on a cell corner, neighbours exactly one tolerance apart
+    steps = [(i, j) for i in range(-3, 4) for j in range(-3, 4)]
+    table = make_shot_table(
+        len(steps),
+        easting=[i * tolerance for i, _ in steps],
+        northing=[j * tolerance for _, j in steps],
+        code=["TREE"] * len(steps),
+    )
+
+    assert_same_groups(table, make_config(tolerance))
+
+
+def test_points_on_cell_edges_with_offsets():
+    tolerance = 0.1
+    rng = random.Random(7)
+    easting, northing = [], []
+    for _ in range(200):
+        # on an edge, or just either side of it
+        easting.append(rng.randrange(-20, 20) * tolerance + rng.choice([0, 1e-12, -1e-12, tolerance / 2]))
+        northing.append(rng.randrange(-20, 20) * tolerance + rng.choice([0, 1e-12, -1e-12, tolerance / 2]))
+    table = make_shot_table(len(easting), easting=easting, northing=northing, code=["FH"] * len(easting))
+
+    assert_same_groups(table, make_config(tolerance))
+
+
+def test_chain_across_cells_is_one_group():
+    tolerance = 1.0
+    # each shot within tolerance of the next only, the chain crosses several cells diagonally
+    chain = [(0.2 + 0.6 * i, 0.3 + 0.6 * i) for i in range(10)]
+    other = [(20.0, 20.0), (20.5, 20.0)]
+    points = chain + other
+    order = list(range(len(points)))
+    random.Random(3).shuffle(order)
+    table = make_shot_table(
+        len(points),
+        easting=[points[i][0] for i in order],
+        northing=[points[i][1] for i in order],
+        code=["TREE"] * len(points),
+    )
+
+    groups = [group.tolist() for group in find_groups_within_tolerance(table, make_config(tolerance))]
+
+    assert sorted(len(group) for group in groups) == [2, len(chain)]
+    assert groups == brute_force_groups(table, make_config(tolerance))
+
+
+def test_control_points_use_elevation():
+    table = make_shot_table(
+        4,
+        easting=[0.0, 0.01, 0.0, 0.01],
+        northing=[0.0, 0.0, 0.0, 0.0],
+        elevation=[0.0, 0.5, 0.0, 0.5],
+        code=[CONTROL_CODE, CONTROL_CODE, "TREE", "TREE"],
+    )
+
+    groups = [group.tolist() for group in find_groups_within_tolerance(table, make_config(0.05))]
+
+    assert groups == [[2, 3]]
+
+
+def test_unpositioned_and_averaged_shots_are_left_out():
+    table = make_shot_table(
+        4,
+        easting=[0.0, 0.0, math.nan, 0.0],
+        northing=[0.0, 0.0, 0.0, 0.0],
+        code=["TREE"] * 4,
+        parent_point_id=[None, None, None, "averaged"],
+    )
+
+    groups = [group.tolist() for group in find_groups_within_tolerance(table, make_config(0.1))]
+
+    assert groups == [[0, 1]]
@@ -0,0 +1,156 @@
+import os
+from pathlib import Path
+
+from fieldworkimport.fwimport.parse_cache import ENTRY_SUFFIX, ParseCache
+
+
+class CountingParser:
+    """Parser returning the file's text, counting how often it ran."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.calls = 0
+
+    def __call__(self) -> str:
+        self.calls += 1
+        return self.path.read_text(encoding="utf-8")
+
+
+def write_input(tmp_path: Path, name: str, text: str) -> Path:
+    path = tmp_path / "inputs" / name
+    path.parent.mkdir(exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def entries(cache: ParseCache) -> list[Path]:
+    return sorted(cache.directory.glob(f"*{ENTRY_SUFFIX}"))
+
+
+def test_hit_after_parse(tmp_path: Path):
+    cache = ParseCache(directory=tmp_path / "cache")
+    path = write_input(tmp_path, "job.rw5", "first")
+    parse = CountingParser(path)
+
+    assert cache.get_or_parse("rw5", path, parse) == "first"
+    assert cache.get_or_parse("rw5", path, parse) == "first"
+    assert parse.calls == 1
+
+
+def test_content_change_misses(tmp_path: Path):
+    cache = ParseCache(directory=tmp_path / "cache")
+    path = write_input(tmp_path, "job.rw5", "first")
+    parse = CountingParser(path)
+    cache.get_or_parse("rw5", path, parse)
+
+    path.write_text("second version", encoding="utf-8")
+
+    assert cache.get_or_parse("rw5", path, parse) == "second version"
+    assert parse.calls == 2
+
+
+def test_same_content_in_another_file_hits(tmp_path: Path):
+    cache = ParseCache(directory=tmp_path / "cache")
+    path = write_input(tmp_path, "job.rw5", "same")
+    copy = write_input(tmp_path, "copy.rw5", "same")
+    cache.get_or_parse("rw5", path, CountingParser(path))
+    parse_copy = CountingParser(copy)
+
+    assert cache.get_or_parse("rw5", copy, parse_copy) == "same"
+    assert parse_copy.calls == 0
+
+
+def test_kind_and_key_args_are_part_of_the_key(tmp_path: Path):
+    cache = ParseCache(directory=tmp_path / "cache")
+    path = write_input(tmp_path, "job.sum", "text")
+    parse = CountingParser(path)
+
+    cache.get_or_parse("sum", path, parse, "EPSG:2953")
+    cache.get_or_parse("sum", path, parse, "EPSG:2953")
+    cache.get_or_parse("sum", path, parse, "EPSG:4617")
+    cache.get_or_parse("loc", path, parse, "EPSG:2953")
+
+    assert parse.calls == 3
+    assert len(entries(cache)) == 3
+
+
+def test_evicts_least_recently_used_over_max_entries(tmp_path: Path):
+    cache = ParseCache(directory=tmp_path / "cache", max_entries=2)
+    paths = [write_input(tmp_path, f"job{i}.rw5", f"job {i}") for i in range(3)]
+    cache.get_or_parse("rw5", paths[0], CountingParser(paths[0]))
+    [first_entry] = entries(cache)
+    cache.get_or_parse("rw5", paths[1], CountingParser(paths[1]))
+    [second_entry] = set(entries(cache)) - {first_entry}
+    for entry in (first_entry, second_entry):
+        os.utime(entry, (1, 1))
+    # a hit marks the first entry as recently used
+    cache.get_or_parse("rw5", paths[0], CountingParser(paths[0]))
+
+    cache.get_or_parse("rw5", paths[2], CountingParser(paths[2]))
+
+    remaining = entries(cache)
+    assert len(remaining) == 2
+    assert first_entry in remaining
+    assert second_entry not in remaining
+
+
+def test_evicts_over_max_bytes(tmp_path: Path):
+    cache = ParseCache(directory=tmp_path / "cache", max_bytes=1)
+    path = write_input(tmp_path, "job.rw5", "text")
+    parse = CountingParser(path)
+
+    assert cache.get_or_parse("rw5", path, parse) == "text"
+    assert entries(cache) == []
+    cache.get_or_parse("rw5", path, parse)
+    assert parse.calls == 2
+
+
+def test_corrupt_entry_is_discarded(tmp_path: Path):
+    cache = ParseCache(directory=tmp_path / "cache")
+    path = write_input(tmp_path, "job.rw5", "text")
+    parse = CountingParser(path)
+    cache.get_or_parse("rw5", path, parse)
+    [entry] = entries(cache)
+    entry.write_bytes(b"not a compressed pickle")
+
+    assert cache.get_or_parse("rw5", path, parse) == "text"
+    assert parse.calls == 2
+    # parsed again and rewritten
+    assert cache.get_or_parse("rw5", path, parse) == "text"
+    assert parse.calls == 2
+
+
+def test_failed_write_is_not_an_error(tmp_path: Path):
+    cache = ParseCache(directory=tmp_path / "cache")
+    path = write_input(tmp_path, "job.rw5", "text")
+
+    def parse_unpicklable() -> object:
+        return lambda: None
+
+    result = cache.get_or_parse("rw5", path, parse_unpicklable)
+
+    assert callable(result)
+    assert entries(cache) == []
+    assert list(cache.directory.glob("*.tmp")) == []
+
+
+def test_unwritable_directory_is_not_an_error(tmp_path: Path):
+    not_a_directory = tmp_path / "cache"
+    not_a_directory.write_text("", encoding="utf-8")
+    cache = ParseCache(directory=not_a_directory)
+    path = write_input(tmp_path, "job.rw5", "text")
+
+    assert cache.get_or_parse("rw5", path, CountingParser(path)) == "text"
+
+
+def test_clear(tmp_path: Path):
+    cache = ParseCache(directory=tmp_path / "cache")
+    path = write_input(tmp_path, "job.rw5", "text")
+    parse = CountingParser(path)
+    cache.get_or_parse("rw5", path, parse)
+
+    cache.clear()
+
+    assert entries(cache) == []
+    cache.get_or_parse("rw5", path, parse)
+    assert parse.calls == 2
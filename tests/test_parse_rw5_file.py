@@ -0,0 +1,25 @@
+import importlib
+from pathlib import Path
+
+from fieldworkimport.fwimport.parse_rw5_file import parse_rw5_file
+
+# importing parse_rw5_file puts the plugin's bundled rw5_to_csv wheel on the path
+rw5_to_csv = importlib.import_module("rw5_to_csv")
+RW5_PATH = Path(__file__).parent / "data" / "job.rw5"
+
+
+def test_matches_rw5_to_csv():
+    result = parse_rw5_file(RW5_PATH)
+
+    assert result == {"prelude": rw5_to_csv.prelude(RW5_PATH), "rows": rw5_to_csv.convert(RW5_PATH, None)}
+    # G0-G3 lines don't split records, PointID 100 is shot twice
+    assert [row["PointID"] for row in result["rows"]] == ["100", "101", "100"]
+
+
+def test_prelude_only_matches_rw5_to_csv():
+    result = parse_rw5_file(RW5_PATH, prelude_only=True)
+    expected = rw5_to_csv.prelude(RW5_PATH)
+
+    assert result["rows"] == []
+    assert result["prelude"]["JobName"] == expected["JobName"]
+    assert result["prelude"]["ISODateTime"] == expected["ISODateTime"]
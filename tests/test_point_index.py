@@ -0,0 +1,80 @@
+import math
+
+import numpy as np
+import pytest
+
+from fieldworkimport.point_index import RadiusIndex
+
+
+def brute_force_query(x: np.ndarray, y: np.ndarray, radius: float, query_x: float, query_y: float) -> set[int]:
+    distances = np.hypot(x - query_x, y - query_y)
+    return set(np.flatnonzero(distances <= radius).tolist())
+
+
+@pytest.mark.parametrize("radius", [0.5, 2.0, 10.0])
+def test_query_matches_brute_force(radius: float):
+    rng = np.random.default_rng(4)
+    x = rng.uniform(-50, 50, 500)
+    y = rng.uniform(-50, 50, 500)
+    # include queries on cell edges
+    query_x = np.concatenate((rng.uniform(-60, 60, 100), np.arange(-5, 5) * radius))
+    query_y = np.concatenate((rng.uniform(-60, 60, 100), np.arange(-5, 5) * radius))
+
+    neighbours, distances = RadiusIndex(x, y, radius).query(query_x, query_y)
+
+    assert len(neighbours) == len(distances) == len(query_x)
+    for i in range(len(query_x)):
+        assert set(neighbours[i].tolist()) == brute_force_query(x, y, radius, query_x[i], query_y[i])
+        np.testing.assert_allclose(distances[i], np.hypot(x[neighbours[i]] - query_x[i], y[neighbours[i]] - query_y[i]))
+
+
+def test_query_is_nearest_first():
+    x = np.array([3.0, 1.0, 0.0, 2.0, 20.0])
+    y = np.zeros(5)
+
+    neighbours, distances = RadiusIndex(x, y, radius=5).query(np.array([0.2]), np.array([0.0]))
+
+    assert neighbours[0].tolist() == [2, 1, 3, 0]
+    np.testing.assert_allclose(distances[0], [0.2, 0.8, 1.8, 2.8])
+
+
+def test_points_on_the_radius_are_included():
+    neighbours, _ = RadiusIndex(np.array([0.0, 1.0, 1.5]), np.zeros(3), radius=1).query(np.array([0.0]), np.array([0.0]))
+
+    assert neighbours[0].tolist() == [0, 1]
+
+
+def test_nan_points_are_left_out():
+    x = np.array([0.0, math.nan, 1.0, 0.5])
+    y = np.array([0.0, 0.0, math.nan, 0.5])
+
+    index = RadiusIndex(x, y, radius=2)
+    neighbours, _ = index.query(np.array([0.0]), np.array([0.0]))
+
+    assert len(index) == 2
+    assert neighbours[0].tolist() == [0, 3]
+
+
+def test_nan_queries_find_nothing():
+    index = RadiusIndex(np.array([0.0, 1.0]), np.array([0.0, 0.0]), radius=2)
+
+    neighbours, distances = index.query(np.array([math.nan, 0.0, 1.0]), np.array([0.0, 0.0, math.nan]))
+
+    assert [n.tolist() for n in neighbours] == [[], [0, 1], []]
+    assert [len(d) for d in distances] == [0, 2, 0]
+
+
+def test_empty_index():
+    index = RadiusIndex(np.array([]), np.array([]), radius=1)
+
+    neighbours, distances = index.query(np.array([0.0, 5.0]), np.array([0.0, 5.0]))
+
+    assert len(index) == 0
+    assert [n.tolist() for n in neighbours] == [[], []]
+    assert [d.tolist() for d in distances] == [[], []]
+
+
+def test_empty_query():
+    index = RadiusIndex(np.array([0.0]), np.array([0.0]), radius=1)
+
+    assert index.query(np.array([]), np.array([])) == ([], [])
@@ -0,0 +1,54 @@
+import pytest
+from qgis.core import QgsField, QgsVectorLayer
+from qgis.PyQt.QtCore import QVariant
+
+from fieldworkimport.schema import FieldrunShotSchema, FieldworkShotSchema
+
+
+def test_of_shares_the_schema_of_a_layer(fieldworkshot_layer: QgsVectorLayer):
+    schema = FieldworkShotSchema.of(fieldworkshot_layer)
+
+    assert FieldworkShotSchema.of(fieldworkshot_layer) is schema
+    assert FieldrunShotSchema.of(fieldworkshot_layer) is not schema
+
+
+def test_column_resolves_the_field_index(fieldworkshot_layer: QgsVectorLayer):
+    schema = FieldworkShotSchema.of(fieldworkshot_layer)
+
+    assert schema.status.name == "status"
+    assert schema.status.index == fieldworkshot_layer.fields().indexFromName("status")
+    assert schema.column("status") is schema.status
+
+
+def test_columns_are_resolved_again_after_a_field_is_deleted(fieldworkshot_layer: QgsVectorLayer):
+    schema = FieldworkShotSchema.of(fieldworkshot_layer)
+    status = schema.status
+    fieldworkshot_layer.startEditing()
+
+    assert fieldworkshot_layer.deleteAttribute(fieldworkshot_layer.fields().indexFromName("code"))
+
+    assert schema.status is not status
+    assert schema.status.index == status.index - 1
+    assert schema.status.index == fieldworkshot_layer.fields().indexFromName("status")
+    with pytest.raises(ValueError, match="no field 'code'"):
+        schema.column("code")
+
+
+def test_columns_are_resolved_again_after_a_field_is_added(fieldworkshot_layer: QgsVectorLayer):
+    schema = FieldworkShotSchema.of(fieldworkshot_layer)
+    status = schema.status
+    fieldworkshot_layer.startEditing()
+
+    assert fieldworkshot_layer.addAttribute(QgsField("is_processed", QVariant.Bool))
+
+    assert schema.status is not status
+    assert schema.status.index == status.index
+    assert schema.is_processed.index == fieldworkshot_layer.fields().indexFromName("is_processed")
+
+
+def test_missing_field_raises(fieldworkshot_layer: QgsVectorLayer):
+    schema = FieldworkShotSchema.of(fieldworkshot_layer)
+
+    assert not schema.has_field("is_processed")
+    with pytest.raises(ValueError, match="has no field 'is_processed'"):
+        schema.is_processed  # noqa: B018
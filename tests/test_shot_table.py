@@ -0,0 +1,230 @@
+import math
+import random
+from typing import Optional
+
+import numpy as np
+import pytest
+
+from fieldworkimport import shot_table
+from fieldworkimport.helpers import nullish
+from fieldworkimport.shot_table import AVERAGE_COLUMNS, COORDINATE_COLUMNS, QUALITY_COLUMNS, RunningAverage, ShotTable
+from tests.conftest import add_shots, make_shot_table
+
+
+def baseline_average(shots: list[dict[str, Optional[float]]]) -> dict[str, float]:
+    """Average like get_average_point did before the shot table, unset (None or zero) quality values left out."""  # noqa: DOC201
+    average = {name: sum(shot[name] for shot in shots) / len(shots) for name in COORDINATE_COLUMNS}  # type: ignore []
+    for name in QUALITY_COLUMNS:
+        values = [shot[name] for shot in shots if shot[name]]
+        average[name] = sum(values) / max(len(values), 1)  # type: ignore []
+    return average
+
+
+def random_shots(rng: random.Random, n: int) -> list[dict[str, Optional[float]]]:
+    shots = []
+    for _ in range(n):
+        shot: dict[str, Optional[float]] = {name: rng.uniform(1000, 2000) for name in COORDINATE_COLUMNS}
+        for name in QUALITY_COLUMNS:
+            shot[name] = rng.choice([None, 0.0, rng.uniform(0.005, 0.05)])
+        shots.append(shot)
+    return shots
+
+
+def table_of(shots: list[dict[str, Optional[float]]]) -> ShotTable:
+    # the table reads null numbers as NaN
+    return make_shot_table(
+        len(shots),
+        **{name: [math.nan if shot[name] is None else shot[name] for shot in shots] for name in AVERAGE_COLUMNS},
+    )
+
+
+def assert_same_average(actual: dict[str, float], expected: dict[str, float]) -> None:
+    for name in AVERAGE_COLUMNS:
+        assert actual[name] == pytest.approx(expected[name], rel=1e-12, abs=1e-12, nan_ok=True), name
+
+
+def test_average_groups_matches_baseline():
+    rng = random.Random(1)
+    shots = random_shots(rng, 60)
+    table = table_of(shots)
+    groups = [list(range(7)), list(range(7, 8)), list(range(8, 60, 3)), [59, 2, 31]]
+
+    averages = table.average_groups(groups)
+
+    for index, group in enumerate(groups):
+        assert_same_average(averages.average(index), baseline_average([shots[row] for row in group]))
+        expected_residuals = [
+            [averages.average(index)[name] - shots[row][name] for name in ("easting", "northing", "elevation")]
+            for row in group
+        ]
+        np.testing.assert_allclose(averages.group_residuals(index), expected_residuals)
+
+
+def test_average_of_empty_group_raises():
+    table = make_shot_table(2)
+    with pytest.raises(ValueError, match="empty group"):
+        table.average_groups([[0, 1], []])
+
+
+def test_quality_values_unset_or_zero_are_left_out():
+    table = make_shot_table(
+        3,
+        HRMS=[0.02, math.nan, 0.04],
+        VRMS=[0.0, 0.0, 0.03],
+        PDOP=[math.nan, math.nan, math.nan],
+        easting=[0.0, 0.0, 3.0],
+    )
+
+    average = table.average([0, 1, 2])
+
+    assert average["HRMS"] == pytest.approx(0.03)
+    assert average["VRMS"] == pytest.approx(0.03)
+    # nothing set averages to zero, like the baseline
+    assert average["PDOP"] == 0
+    # zero is a real coordinate
+    assert average["easting"] == pytest.approx(1.0)
+
+
+def test_unset_coordinate_makes_average_unset():
+    table = make_shot_table(3, easting=[1.0, math.nan, 3.0], northing=[1.0, 2.0, 3.0])
+
+    averages = table.average_groups([[0, 1, 2], [0, 2]])
+
+    assert math.isnan(averages.average(0)["easting"])
+    assert averages.average(0)["northing"] == pytest.approx(2.0)
+    assert averages.average(1)["easting"] == pytest.approx(2.0)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_running_average_toggles_match_average_groups(seed: int):
+    rng = random.Random(seed)
+    shots = random_shots(rng, 25)
+    table = table_of(shots)
+    values = table.average_values()
+    running = RunningAverage(values)
+    included = set(range(len(shots)))
+
+    for _ in range(500):
+        row = rng.randrange(len(shots))
+        if row in included and len(included) > 1:
+            running.remove(values[row])
+            included.remove(row)
+        elif row not in included:
+            running.add(values[row])
+            included.add(row)
+
+        rows = sorted(included)
+        assert running.count == len(rows)
+        assert_same_average(running.average(), table.average(rows))
+        expected_residuals = table.average_groups([rows]).residuals
+        np.testing.assert_allclose([running.residuals(values[row]) for row in rows], expected_residuals, atol=1e-9)
+
+
+def test_running_average_handles_unset_values():
+    table = make_shot_table(
+        3,
+        easting=[1.0, math.nan, 3.0],
+        northing=[1.0, 2.0, 3.0],
+        HRMS=[0.0, 0.02, math.nan],
+    )
+    values = table.average_values()
+    running = RunningAverage(values)
+
+    assert math.isnan(running.average()["easting"])
+    assert running.average()["HRMS"] == pytest.approx(0.02)
+
+    running.remove(values[1])
+    assert_same_average(running.average(), table.average([0, 2]))
+    assert running.average()["HRMS"] == 0
+
+    running.add(values[1])
+    assert math.isnan(running.average()["easting"])
+
+
+def test_running_average_empty():
+    running = RunningAverage()
+    values = make_shot_table(1, easting=[5.0]).average_values()
+
+    with pytest.raises(ValueError, match="empty"):
+        running.average()
+    with pytest.raises(ValueError, match="empty"):
+        running.remove(values[0])
+
+    running.add(values[0])
+    running.remove(values[0])
+    assert running.count == 0
+    running.add(values[0])
+    assert running.average()["easting"] == 5.0
+
+
+def test_set_only_queues_changed_columns(monkeypatch: pytest.MonkeyPatch, fieldworkshot_layer):
+    add_shots(fieldworkshot_layer, [
+        {"id": f"shot{i}", "fieldwork_id": "fw", "code": "CP", "easting": float(i), "HRMS": 0.01}
+        for i in range(4)
+    ])
+    table = ShotTable.load(fieldworkshot_layer, "fw")
+
+    queued: dict[int, dict[int, object]] = {}
+
+    class RecordingWriter:
+        def __init__(self, layer, description):  # noqa: ANN001, ANN204, ARG002
+            pass
+
+        def change_values(self, fid: int, attributes: dict[int, object]) -> None:
+            queued[fid] = attributes
+
+        def apply(self, fail_msg=None) -> int:  # noqa: ANN001, ARG002
+            return 0
+
+    monkeypatch.setattr(shot_table, "BulkAttributeWriter", RecordingWriter)
+
+    # nothing set, nothing written
+    assert table.write(fieldworkshot_layer) == 0
+    assert queued == {}
+
+    table.set("bad_hrms_flag", [1, 3], True)  # noqa: FBT003
+    table.set("description", 3, "CP/new")
+    assert table.write(fieldworkshot_layer) == 2
+
+    fields = fieldworkshot_layer.fields()
+    flag_index = fields.indexFromName("bad_hrms_flag")
+    description_index = fields.indexFromName("description")
+    fids = table.fids.tolist()
+    assert queued == {
+        fids[1]: {flag_index: True},
+        fids[3]: {flag_index: True, description_index: "CP/new"},
+    }
+
+    # written changes are forgotten
+    queued.clear()
+    assert table.write(fieldworkshot_layer) == 0
+    assert queued == {}
+
+
+def test_load_and_write_round_trip(fieldworkshot_layer):
+    add_shots(fieldworkshot_layer, [
+        {"id": "a", "fieldwork_id": "fw", "name": "1", "easting": 1.0, "HRMS": None},
+        {"id": "b", "fieldwork_id": "fw", "name": "2", "easting": 2.0, "HRMS": 0.02},
+        {"id": "c", "fieldwork_id": "other", "name": "3", "easting": 3.0, "HRMS": 0.03},
+    ])
+
+    table = ShotTable.load(fieldworkshot_layer, "fw", order_by="name")
+
+    assert table["id"].tolist() == ["a", "b"]
+    assert table["easting"].tolist() == [1.0, 2.0]
+    assert math.isnan(table["HRMS"][0])
+    assert table["parent_point_id"].tolist() == [None, None]
+
+    fieldworkshot_layer.startEditing()
+    table.set("parent_point_id", [0, 1], "parent")
+    table.set("bad_vrms_flag", 1, True)  # noqa: FBT003
+    table.write(fieldworkshot_layer)
+    assert fieldworkshot_layer.commitChanges()
+
+    by_id = {feature["id"]: feature for feature in fieldworkshot_layer.getFeatures()}
+    assert by_id["a"]["parent_point_id"] == "parent"
+    assert by_id["b"]["parent_point_id"] == "parent"
+    assert by_id["b"]["bad_vrms_flag"] in {True, "true"}
+    assert nullish(by_id["c"]["parent_point_id"])
+    # untouched columns are left as they were
+    assert by_id["a"]["easting"] == 1.0